@@ -16,6 +16,9 @@ from core.http_server import SimpleHttpServer
 from core.websocket_server import WebSocketServer
 from core.utils.util import check_ffmpeg_installed
 from core.utils.gc_manager import get_gc_manager
+from core.utils.audioRateController import close_pacing_schedulers
+from core.utils.tts_io import close_http_sessions
+from core.utils.opus_assets import compile_assets
 from ElderCare import init_eldercare_api
 
 TAG = __name__
@@ -54,6 +57,10 @@ async def main():
     check_ffmpeg_installed()
     config = load_config()
 
+    # 预编译提示音，播放时不再调用ffmpeg
+    if str(config.get("precompile_assets", True)).lower() == "true":
+        await asyncio.to_thread(compile_assets)
+
     # 初始化ElderCare API
     manager_api_config = config.get("manager-api", {})
     db_config = {
@@ -178,6 +185,12 @@ async def main():
         # 停止全局GC管理器
         await gc_manager.stop()
 
+        # 停止音频发送节拍调度器
+        close_pacing_schedulers()
+
+        # 关闭TTS共享的HTTP会话
+        close_http_sessions()
+
         # 取消所有任务（关键修复点）
         stdin_task.cancel()
         ws_task.cancel()
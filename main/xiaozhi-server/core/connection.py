@@ -26,8 +26,29 @@ from core.utils.modules_initialize import (
 )
 from core.handle.reportHandle import report
 from core.providers.tts.default import DefaultTTS
-from concurrent.futures import ThreadPoolExecutor
 from core.utils.dialogue import Message, Dialogue
+from core.utils.dialogue_budget import (
+    DialogueBudget,
+    can_summarize,
+    summarize_with_llm,
+)
+from core.utils.audio_ingest import (
+    PcmIngestBuffer,
+    AudioPacketBuffer,
+    get_ingest_stats,
+    pre_roll_packets,
+)
+from core.utils.audio_frame import DEFAULT_FRAME_DURATION
+from core.utils.speculation import get_speculation_stats
+from core.utils.async_pipeline import (
+    LoopQueue,
+    BoundedLoopQueue,
+    get_shared_executor,
+    get_tts_executor,
+    get_speculation_executor,
+)
+from core.utils.jitter_buffer import JitterBuffer
+from core.utils.link_quality import LinkQuality, get_link_stats
 from core.providers.asr.dto.dto import InterfaceType
 from core.handle.textHandle import handleTextMessage
 from core.providers.tools.unified_tool_handler import UnifiedToolHandler
@@ -36,6 +57,7 @@ from plugins_func.register import Action
 from core.auth import AuthenticationError
 from config.config_loader import get_private_config_from_api
 from core.providers.tts.dto.dto import ContentType, TTSMessageDTO, SentenceType
+from core.providers.tts.dto.dto import InterfaceType as TTSInterfaceType
 from config.logger import setup_logging, build_module_string, create_connection_logger
 from config.manage_api_client import DeviceNotFoundException, DeviceBindException
 from core.utils.prompt_manager import PromptManager
@@ -92,6 +114,8 @@ class ConnectionHandler:
         self.max_output_size = 0
         self.chat_history_conf = 0
         self.audio_format = "opus"
+        # 与设备协商的音频帧时长（毫秒），在hello消息中更新
+        self.audio_frame_duration = DEFAULT_FRAME_DURATION
 
         # 客户端状态相关
         self.client_abort = False
@@ -104,11 +128,17 @@ class ConnectionHandler:
         # 线程任务相关
         self.loop = None  # 在 handle_connection 中获取运行中的事件循环
         self.stop_event = threading.Event()
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        # 所有连接共用有界线程池，空闲连接不占用线程；TTS合成单独使用一个线程池
+        server_config = self.config.get("server", {})
+        self.executor = get_shared_executor(server_config.get("executor_max_workers"))
+        self.tts_executor = get_tts_executor(server_config.get("tts_executor_max_workers"))
+        self.speculation_executor = get_speculation_executor(
+            server_config.get("speculation_executor_max_workers")
+        )
 
-        # 添加上报线程池
-        self.report_queue = queue.Queue()
-        self.report_thread = None
+        # 聊天记录上报队列，由事件循环中的上报任务消费
+        self.report_queue = LoopQueue()
+        self.report_task = None
         # 未来可以通过修改此处，调节asr的上报和tts的上报，目前默认都开启
         self.report_asr_enable = self.read_config_from_api
         self.report_tts_enable = self.read_config_from_api
@@ -127,25 +157,41 @@ class ConnectionHandler:
         self.voiceprint_provider = None
 
         # vad相关变量
-        self.client_audio_buffer = bytearray()
+        # 上行音频只解码一次，VAD、ASR、声纹识别共用解码后的PCM
+        self.audio_ingest = PcmIngestBuffer()
         self.client_have_voice = False
         self.client_voice_window = deque(maxlen=5)
         self.first_activity_time = 0.0  # 记录首次活动的时间（毫秒）
         self.last_activity_time = 0.0  # 统一的活动时间戳（毫秒）
         self.client_voice_stop = False
+        self.client_voice_pause = False  # 短暂停顿，可用于推测回复
         self.last_is_voice = False
 
         # asr相关变量
         # 因为实际部署时可能会用到公共的本地ASR，不能把变量暴露给公共ASR
         # 所以涉及到ASR的变量，需要在这里定义，属于connection的私有变量
-        self.asr_audio = []
-        self.asr_audio_queue = queue.Queue()
+        self.asr_audio = AudioPacketBuffer()
+        # 有界队列：ASR或事件循环卡顿时优先丢弃最早的静音包，说话中的包不丢弃
+        self._audio_queue_max_packets = int(
+            self.config.get("server", {}).get("audio_queue_max_packets") or 50
+        )
+        self.asr_audio_queue = BoundedLoopQueue(self._audio_queue_max_packets)
+        self.asr_priority_task = None
+        # MQTT网关转发的音频经抖动缓冲后再送入ASR队列
+        self.jitter_buffer = None
+        self._jitter_timer = None
+        # 下行链路RTT和抖动估计，用于选择TTS音频的预缓冲包数
+        self.link_quality = LinkQuality(self.config)
         self.current_speaker = None  # 存储当前说话人
         self.current_language_tag = None  # 存储当前ASR识别的语言标签
 
         # llm相关变量
         self.llm_finish_task = True
         self.dialogue = Dialogue()
+        # 推测回复：当前等待确认的推测，以及最近一次推测chat的Future
+        self.speculative_turn = None
+        self._chat_local = threading.local()
+        self._speculative_future = None
 
         # tts相关变量
         self.sentence_id = None
@@ -203,9 +249,12 @@ class ConnectionHandler:
             )
 
             self.device_id = self.headers.get("device-id", None)
+            get_ingest_stats().add(self.session_id, self.asr_audio_queue)
+            get_link_stats().add(self.session_id, self.link_quality)
 
             # 认证通过,继续处理
             self.websocket = ws
+            self.link_quality.maybe_probe(ws)
 
             # 检查是否来自MQTT连接
             request_path = ws.request.path
@@ -342,7 +391,7 @@ class ConnectionHandler:
                     return
 
             # 不需要头部处理或没有头部时，直接处理原始消息
-            self.asr_audio_queue.put(message)
+            self._enqueue_asr_audio(message)
 
     async def _process_mqtt_audio_message(self, message):
         """
@@ -363,13 +412,14 @@ class ConnectionHandler:
             if audio_length > 0 and len(message) >= 16 + audio_length:
                 # 有指定长度，提取精确的音频数据
                 audio_data = message[16 : 16 + audio_length]
+                self.link_quality.observe_transit(timestamp, time.monotonic() * 1000)
                 # 基于时间戳进行排序处理
                 self._process_websocket_audio(audio_data, timestamp)
                 return True
             elif len(message) > 16:
                 # 没有指定长度或长度无效，去掉头部后处理剩余数据
                 audio_data = message[16:]
-                self.asr_audio_queue.put(audio_data)
+                self._enqueue_asr_audio(audio_data)
                 return True
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"解析WebSocket音频包失败: {e}")
@@ -377,30 +427,55 @@ class ConnectionHandler:
         # 处理失败，返回False表示需要继续处理
         return False
 
+    def set_audio_frame_duration(self, frame_duration: int):
+        """应用与设备协商的音频帧时长，上行按包计数的缓冲按时长换算，下行TTS按新的帧时长编码"""
+        self.audio_frame_duration = frame_duration
+        self.audio_ingest.set_frame_duration(frame_duration)
+        self.asr_audio.pre_roll = pre_roll_packets(frame_duration)
+        # audio_queue_max_packets 按60ms一包配置
+        self.asr_audio_queue.maxsize = max(
+            1,
+            round(self._audio_queue_max_packets * DEFAULT_FRAME_DURATION / frame_duration),
+        )
+        if self.jitter_buffer is not None:
+            self.jitter_buffer.frame_ms = frame_duration
+        if self.tts is not None:
+            self.tts.set_audio_frame_duration(frame_duration)
+
+    def _enqueue_asr_audio(self, audio):
+        # 按入队时的VAD状态判断：说话中或手动模式下的音频不可丢弃
+        in_speech = self.client_have_voice or self.client_listen_mode == "manual"
+        self.asr_audio_queue.put(audio, droppable=not in_speech)
+
     def _process_websocket_audio(self, audio_data, timestamp):
-        """处理WebSocket格式的音频包"""
-        # 初始化时间戳序列管理
-        if not hasattr(self, "audio_timestamp_buffer"):
-            self.audio_timestamp_buffer = {}
-            self.last_processed_timestamp = 0
-            self.max_timestamp_buffer_size = 20
-
-        # 存储音频包
-        self.audio_timestamp_buffer[timestamp] = audio_data
-
-        # 清理过大的缓冲区
-        if len(self.audio_timestamp_buffer) > self.max_timestamp_buffer_size:
-            oldest_timestamp = min(self.audio_timestamp_buffer.keys())
-            del self.audio_timestamp_buffer[oldest_timestamp]
-
-        # 按时间戳顺序处理音频包
-        sorted_timestamps = sorted(self.audio_timestamp_buffer.keys())
-        for ts in sorted_timestamps:
-            if ts > self.last_processed_timestamp:
-                self.asr_audio_queue.put(self.audio_timestamp_buffer[ts])
-                self.last_processed_timestamp = ts
-                del self.audio_timestamp_buffer[ts]
-    
+        """处理WebSocket格式的音频包，经抖动缓冲按时间戳排序后送入ASR队列"""
+        if self.jitter_buffer is None:
+            jitter_config = self.config.get("server", {}).get("mqtt_jitter_buffer") or {}
+            self.jitter_buffer = JitterBuffer(
+                playout_delay_ms=int(jitter_config.get("playout_delay_ms", 120)),
+                frame_ms=self.audio_frame_duration,
+                max_packets=int(jitter_config.get("max_packets", 32)),
+                max_conceal_frames=int(jitter_config.get("max_conceal_frames", 5)),
+            )
+        self.jitter_buffer.push(timestamp, audio_data, time.monotonic() * 1000)
+        self._drain_jitter_buffer()
+
+    def _drain_jitter_buffer(self):
+        """输出已到时间的音频包，并为下一个包设置定时器，避免停止说话后尾包滞留"""
+        now_ms = time.monotonic() * 1000
+        for audio in self.jitter_buffer.pop_ready(now_ms):
+            # None 表示丢失的帧，由解码器做丢包补偿
+            self._enqueue_asr_audio(audio)
+
+        if self._jitter_timer is not None:
+            self._jitter_timer.cancel()
+            self._jitter_timer = None
+        due_ms = self.jitter_buffer.next_due_ms()
+        if due_ms is not None:
+            self._jitter_timer = self.loop.call_later(
+                max(due_ms - now_ms, 0) / 1000, self._drain_jitter_buffer
+            )
+
     async def _handle_eldercare_message(self, message):
         """处理ElderCare相关消息"""
         if not self.eldercare_enabled:
@@ -530,6 +605,7 @@ class ConnectionHandler:
         try:
             if self.tts is None:
                 self.tts = self._initialize_tts()
+            self._initialize_tts_hedge()
             # 打开语音合成通道
             asyncio.run_coroutine_threadsafe(
                 self.tts.open_audio_channels(self), self.loop
@@ -567,10 +643,12 @@ class ConnectionHandler:
 
             """加载记忆"""
             self._initialize_memory()
+            """对话上下文预算"""
+            self._initialize_dialogue_budget()
             """加载意图识别"""
             self._initialize_intent()
-            """初始化上报线程"""
-            self._init_report_threads()
+            """初始化上报任务"""
+            self._init_report_task()
             """更新系统提示词"""
             self._init_prompt_enhancement()
 
@@ -588,18 +666,18 @@ class ConnectionHandler:
             self.change_system_prompt(enhanced_prompt)
             self.logger.bind(tag=TAG).debug("系统提示词已增强更新")
 
-    def _init_report_threads(self):
-        """初始化ASR和TTS上报线程"""
+    def _init_report_task(self):
+        """初始化ASR和TTS上报任务"""
         if not self.read_config_from_api or self.need_bind:
             return
         if self.chat_history_conf == 0:
             return
-        if self.report_thread is None or not self.report_thread.is_alive():
-            self.report_thread = threading.Thread(
-                target=self._report_worker, daemon=True
+        if self.report_task is None or self.report_task.done():
+            self.report_queue.bind(self.loop)
+            self.report_task = asyncio.run_coroutine_threadsafe(
+                self._report_worker(), self.loop
             )
-            self.report_thread.start()
-            self.logger.bind(tag=TAG).info("TTS上报线程已启动")
+            self.logger.bind(tag=TAG).info("TTS上报任务已启动")
 
     def _initialize_tts(self):
         """初始化TTS"""
@@ -619,6 +697,32 @@ class ConnectionHandler:
 
         return tts
 
+    def _initialize_tts_hedge(self):
+        """配置了备用TTS时，每轮首句与其竞速"""
+        hedge_config = self.config.get("tts_hedge") or {}
+        secondary = hedge_config.get("secondary")
+        if self.need_bind or not secondary:
+            return
+        if secondary not in self.config.get("TTS", {}):
+            self.logger.bind(tag=TAG).warning(f"首句竞速的备用TTS不存在: {secondary}")
+            return
+        try:
+            hedge_tts = initialize_tts(self.config, secondary)
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"初始化首句竞速的备用TTS失败: {e}")
+            return
+        # 竞速需要两方都按句请求并直接返回音频数据
+        for provider in (self.tts, hedge_tts):
+            if (
+                provider.interface_type != TTSInterfaceType.NON_STREAM
+                or not provider.delete_audio_file
+            ):
+                self.logger.bind(tag=TAG).warning(
+                    f"{type(provider).__module__} 不支持首句竞速，已跳过"
+                )
+                return
+        self.tts.set_hedge_provider(hedge_tts, float(hedge_config.get("delay_ms", 500)))
+
     def _initialize_asr(self):
         """初始化ASR"""
         if (
@@ -792,6 +896,17 @@ class ConnectionHandler:
         if modules.get("memory", None) is not None:
             self.memory = modules["memory"]
 
+    def _initialize_dialogue_budget(self):
+        """按 dialogue_budget 限制每次发给LLM的历史，旧轮次由后台任务折叠为摘要"""
+        def summarize(previous, transcript, max_chars):
+            return summarize_with_llm(self.llm, previous, transcript, max_chars)
+
+        self.dialogue.budget = DialogueBudget.from_config(
+            self.config,
+            summarize=summarize if can_summarize(self.llm) else None,
+            submit=self.executor.submit,
+        )
+
     def _initialize_memory(self):
         if self.memory is None:
             return
@@ -888,16 +1003,84 @@ class ConnectionHandler:
         # 更新系统prompt至上下文
         self.dialogue.update_system_message(self.prompt)
 
+    def _put_tts_text(self, message):
+        """推测回复期间TTS文本先由SpeculativeTurn缓存，否则直接送入TTS队列"""
+        turn = getattr(self._chat_local, "turn", None)
+        if turn is not None:
+            turn.put(self.tts.tts_text_queue, message)
+        else:
+            self.tts.tts_text_queue.put(message)
+
+    def submit_chat(self, query):
+        """提交一轮对话；被取消的推测回复尚未退出时，等它回滚对话后再提交，避免两轮对话交错写入"""
+        future = self._speculative_future
+        if future is None or future.done():
+            self.executor.submit(self.chat, query)
+        else:
+            # 回调中提交，不占用线程等待
+            future.add_done_callback(lambda _: self.executor.submit(self.chat, query))
+
+    def submit_speculative_chat(self, turn, query) -> bool:
+        """在推测回复线程池中执行chat，线程都被占用时放弃本次推测"""
+        if self.speculation_executor.is_saturated():
+            return False
+        turn.query = query
+        self._speculative_future = self.speculation_executor.submit(
+            self.speculative_chat, turn, query
+        )
+        return True
+
+    def speculative_chat(self, turn, query):
+        """推测执行chat，被取消时回滚本轮写入的对话"""
+        self._chat_local.turn = turn
+        dialogue_len = len(self.dialogue.dialogue)
+        try:
+            if turn.cancelled:
+                return
+            turn.llm_start_time = time.monotonic()
+            get_speculation_stats().llm_started += 1
+            self.chat(query)
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"推测回复出错: {e}")
+        finally:
+            self._chat_local.turn = None
+            if turn.cancelled:
+                del self.dialogue.dialogue[dialogue_len:]
+
+    def release_speculation(self, query) -> bool:
+        """确认本轮结束，识别文本与推测一致时释放缓存的回复"""
+        turn = self.speculative_turn
+        if turn is None:
+            return False
+        if turn.query is None or turn.query != query:
+            self.cancel_speculation("识别文本与推测不一致")
+            return False
+        self.speculative_turn = None
+        if not turn.release(self.tts.tts_text_queue):
+            return False
+        get_speculation_stats().on_confirmed(turn)
+        return True
+
+    def cancel_speculation(self, reason="用户继续说话"):
+        turn = self.speculative_turn
+        if turn is None:
+            return
+        self.speculative_turn = None
+        if turn.cancel():
+            get_speculation_stats().on_cancelled(turn, reason)
+
     def chat(self, query, depth=0):
         if query is not None:
             self.logger.bind(tag=TAG).info(f"大模型收到用户消息: {query}")
 
+        speculative_turn = getattr(self._chat_local, "turn", None)
+
         # 为最顶层时新建会话ID和发送FIRST请求
         if depth == 0:
             self.llm_finish_task = False
             self.sentence_id = str(uuid.uuid4().hex)
             self.dialogue.put(Message(role="user", content=query))
-            self.tts.tts_text_queue.put(
+            self._put_tts_text(
                 TTSMessageDTO(
                     sentence_id=self.sentence_id,
                     sentence_type=SentenceType.FIRST,
@@ -993,6 +1176,8 @@ class ConnectionHandler:
         for response in llm_responses:
             if self.client_abort:
                 break
+            if speculative_turn is not None and speculative_turn.cancelled:
+                break
             if self.intent_type == "function_call" and functions is not None:
                 content, tools_call = response
                 if "content" in response:
@@ -1022,7 +1207,7 @@ class ConnectionHandler:
             if content is not None and len(content) > 0:
                 if not tool_call_flag:
                     response_message.append(content)
-                    self.tts.tts_text_queue.put(
+                    self._put_tts_text(
                         TTSMessageDTO(
                             sentence_id=self.sentence_id,
                             sentence_type=SentenceType.MIDDLE,
@@ -1060,6 +1245,17 @@ class ConnectionHandler:
                         f"function call error: {content_arguments}"
                     )
 
+            if (
+                not bHasError
+                and len(tool_calls_list) > 0
+                and speculative_turn is not None
+                and not speculative_turn.wait_decided(10)
+            ):
+                # 工具调用可能有副作用，推测回复必须等本轮确认后才能执行；
+                # 推测回复运行在单独的线程池中，这里的等待不占用对话线程池
+                speculative_turn.cancel()
+                return None
+
             if not bHasError and len(tool_calls_list) > 0:
                 # 如需要大模型先处理一轮，添加相关处理后的日志情况
                 if len(response_message) > 0:
@@ -1103,7 +1299,7 @@ class ConnectionHandler:
             self.tts_MessageText = text_buff
             self.dialogue.put(Message(role="assistant", content=text_buff))
         if depth == 0:
-            self.tts.tts_text_queue.put(
+            self._put_tts_text(
                 TTSMessageDTO(
                     sentence_id=self.sentence_id,
                     sentence_type=SentenceType.LAST,
@@ -1174,39 +1370,20 @@ class ConnectionHandler:
 
             self.chat(None, depth=depth + 1)
 
-    def _report_worker(self):
-        """聊天记录上报工作线程"""
+    async def _report_worker(self):
+        """聊天记录上报任务，上报请求本身是异步的，直接在事件循环中执行"""
         while not self.stop_event.is_set():
             try:
-                # 从队列获取数据，设置超时以便定期检查停止事件
-                item = self.report_queue.get(timeout=1)
+                item = await self.report_queue.get()
                 if item is None:  # 检测毒丸对象
                     break
-                try:
-                    # 检查线程池状态
-                    if self.executor is None:
-                        continue
-                    # 提交任务到线程池
-                    self.executor.submit(self._process_report, *item)
-                except Exception as e:
-                    self.logger.bind(tag=TAG).error(f"聊天记录上报线程异常: {e}")
-            except queue.Empty:
-                continue
+                await report(self, *item)
+            except asyncio.CancelledError:
+                break
             except Exception as e:
-                self.logger.bind(tag=TAG).error(f"聊天记录上报工作线程异常: {e}")
-
-        self.logger.bind(tag=TAG).info("聊天记录上报线程已退出")
+                self.logger.bind(tag=TAG).error(f"聊天记录上报任务异常: {e}")
 
-    def _process_report(self, type, text, audio_data, report_time):
-        """处理上报任务"""
-        try:
-            # 执行异步上报（在事件循环中运行）
-            asyncio.run(report(self, type, text, audio_data, report_time))
-        except Exception as e:
-            self.logger.bind(tag=TAG).error(f"上报处理异常: {e}")
-        finally:
-            # 标记任务完成
-            self.report_queue.task_done()
+        self.logger.bind(tag=TAG).info("聊天记录上报任务已退出")
 
     def clearSpeakStatus(self):
         self.client_is_speaking = False
@@ -1282,15 +1459,12 @@ class ConnectionHandler:
             if self.tts:
                 await self.tts.close()
 
-            # 最后关闭线程池（避免阻塞）
-            if self.executor:
-                try:
-                    self.executor.shutdown(wait=False)
-                except Exception as executor_error:
-                    self.logger.bind(tag=TAG).error(
-                        f"关闭线程池时出错: {executor_error}"
-                    )
-                self.executor = None
+            # 释放VAD中该连接的推理状态
+            if self.vad:
+                self.vad.release_conn(self)
+
+            # 最后取消本连接的队列消费任务，共享线程池不随连接关闭
+            self._cancel_pipeline_tasks()
             self.logger.bind(tag=TAG).info("连接资源已释放")
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"关闭连接时出错: {e}")
@@ -1299,6 +1473,35 @@ class ConnectionHandler:
             if self.stop_event:
                 self.stop_event.set()
 
+    def _cancel_pipeline_tasks(self):
+        get_ingest_stats().remove(self.session_id)
+        if self.asr_audio_queue.dropped or self.asr_audio_queue.over_limit:
+            self.logger.bind(tag=TAG).info(
+                f"ASR音频队列统计: {self.asr_audio_queue.get_stats()}"
+            )
+        if self._jitter_timer is not None:
+            self._jitter_timer.cancel()
+            self._jitter_timer = None
+        if self.jitter_buffer is not None:
+            self.logger.bind(tag=TAG).info(
+                f"音频抖动缓冲统计: {self.jitter_buffer.summary()}"
+            )
+        get_link_stats().remove(self.session_id)
+        self.link_quality.close()
+        if self.link_quality.pre_buffer is not None:
+            self.logger.bind(tag=TAG).info(
+                f"下行链路质量统计: {self.link_quality.summary()}"
+            )
+        tasks = [
+            self.asr_priority_task,
+            self.report_task,
+            getattr(self.tts, "tts_priority_task", None),
+            getattr(self.tts, "audio_play_priority_task", None),
+        ]
+        for task in tasks:
+            if task is not None and not task.done():
+                task.cancel()
+
     def clear_queues(self):
         """清空所有任务队列"""
         if self.tts:
@@ -1306,6 +1509,9 @@ class ConnectionHandler:
                 f"开始清理: TTS队列大小={self.tts.tts_text_queue.qsize()}, 音频队列大小={self.tts.tts_audio_queue.qsize()}"
             )
 
+            # 取消流水线中正在合成的分段
+            self.tts.cancel_pending_synthesis()
+
             # 使用非阻塞方式清空队列
             for q in [
                 self.tts.tts_text_queue,
@@ -1330,9 +1536,10 @@ class ConnectionHandler:
             )
 
     def reset_vad_states(self):
-        self.client_audio_buffer = bytearray()
+        self.audio_ingest.reset_vad()
         self.client_have_voice = False
         self.client_voice_stop = False
+        self.client_voice_pause = False
         self.logger.bind(tag=TAG).debug("VAD states reset.")
 
     def chat_and_close(self, text):
@@ -7,6 +7,7 @@ from core.utils.dialogue import Message
 from core.utils.util import audio_to_data
 from core.providers.tts.dto.dto import SentenceType
 from core.utils.wakeup_word import WakeupWordsConfig
+from core.utils.audio_frame import DEFAULT_FRAME_DURATION, negotiate_frame_duration
 from core.handle.sendAudioHandle import sendAudioMessage, send_tts_message
 from core.utils.util import remove_punctuation_and_length, opus_datas_to_wav_bytes
 from core.providers.tools.device_mcp import (
@@ -46,7 +47,18 @@ async def handleHelloMessage(conn, msg_json):
         format = audio_params.get("format")
         conn.logger.bind(tag=TAG).debug(f"客户端音频格式: {format}")
         conn.audio_format = format
-        conn.welcome_msg["audio_params"] = audio_params
+        # 协商帧时长，不支持的值退回默认值，并在回复中告知设备实际使用的帧时长
+        requested = audio_params.get("frame_duration", DEFAULT_FRAME_DURATION)
+        frame_duration = negotiate_frame_duration(requested)
+        if str(frame_duration) != str(requested):
+            conn.logger.bind(tag=TAG).warning(
+                f"不支持的音频帧时长 {requested}ms，使用 {frame_duration}ms"
+            )
+        conn.logger.bind(tag=TAG).debug(f"音频帧时长: {frame_duration}ms")
+        conn.set_audio_frame_duration(frame_duration)
+        conn.welcome_msg["audio_params"] = dict(
+            audio_params, frame_duration=frame_duration
+        )
     features = msg_json.get("features")
     if features:
         conn.logger.bind(tag=TAG).debug(f"客户端特性: {features}")
@@ -102,7 +114,11 @@ async def checkWakeupWords(conn, text):
         }
 
     # 获取音频数据
-    opus_packets = await audio_to_data(response.get("file_path"), use_cache=False)
+    opus_packets = await audio_to_data(
+        response.get("file_path"),
+        use_cache=False,
+        frame_duration=conn.audio_frame_duration,
+    )
     # 播放唤醒词回复
     conn.client_abort = False
 
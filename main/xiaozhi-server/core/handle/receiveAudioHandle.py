@@ -11,13 +11,20 @@ TAG = __name__
 
 
 async def handleAudioMessage(conn, audio):
+    if audio is None:
+        # 抖动缓冲判定丢失的帧：只在PCM中补偿，保持VAD和识别的时间轴连续
+        conn.audio_ingest.conceal()
+        return
+    # 音频包只在这里解码一次，VAD和ASR共用解码结果
+    conn.audio_ingest.push(audio, conn.audio_format)
     # 当前片段是否有人说话
-    have_voice = conn.vad.is_vad(conn, audio)
+    have_voice = await conn.vad.is_vad_async(conn, audio)
     # 如果设备刚刚被唤醒，短暂忽略VAD检测
     if hasattr(conn, "just_woken_up") and conn.just_woken_up:
         have_voice = False
         # 设置一个短暂延迟后恢复VAD检测
         conn.asr_audio.clear()
+        conn.audio_ingest.clear_segment()
         if not hasattr(conn, "vad_resume_task") or conn.vad_resume_task.done():
             conn.vad_resume_task = asyncio.create_task(resume_vad_detection(conn))
         return
@@ -29,6 +36,9 @@ async def handleAudioMessage(conn, audio):
     await no_voice_close_connect(conn, have_voice)
     # 接收音频
     await conn.asr.receive_audio(conn, audio, have_voice)
+    if not conn.asr.reads_audio_ingest:
+        # 该ASR自行处理音频包，PCM只供VAD使用，处理过的部分不再保留
+        conn.audio_ingest.discard_vad_read()
 
 
 async def resume_vad_detection(conn):
@@ -94,7 +104,10 @@ async def startToChat(conn, text):
 
     # 意图未被处理，继续常规聊天流程，使用实际文本内容
     await send_stt_message(conn, actual_text)
-    conn.executor.submit(conn.chat, actual_text)
+    if conn.release_speculation(actual_text):
+        # 停顿期间已推测启动大模型，直接播放缓存的回复
+        return
+    conn.submit_chat(actual_text)
 
 
 async def no_voice_close_connect(conn, have_voice):
@@ -130,7 +143,7 @@ async def max_out_size(conn):
     text = "不好意思，我现在有点事情要忙，明天这个时候我们再聊，约好了哦！明天不见不散，拜拜！"
     await send_stt_message(conn, text)
     file_path = "config/assets/max_output_size.wav"
-    opus_packets = await audio_to_data(file_path)
+    opus_packets = await audio_to_data(file_path, frame_duration=conn.audio_frame_duration)
     conn.tts.tts_audio_queue.put((SentenceType.LAST, opus_packets, text))
     conn.close_after_chat = True
 
@@ -149,7 +162,7 @@ async def check_bind_device(conn):
 
         # 播放提示音
         music_path = "config/assets/bind_code.wav"
-        opus_packets = await audio_to_data(music_path)
+        opus_packets = await audio_to_data(music_path, frame_duration=conn.audio_frame_duration)
         conn.tts.tts_audio_queue.put((SentenceType.FIRST, opus_packets, text))
 
         # 逐个播放数字
@@ -157,7 +170,7 @@ async def check_bind_device(conn):
             try:
                 digit = conn.bind_code[i]
                 num_path = f"config/assets/bind_code/{digit}.wav"
-                num_packets = await audio_to_data(num_path)
+                num_packets = await audio_to_data(num_path, frame_duration=conn.audio_frame_duration)
                 conn.tts.tts_audio_queue.put((SentenceType.MIDDLE, num_packets, None))
             except Exception as e:
                 conn.logger.bind(tag=TAG).error(f"播放数字音频失败: {e}")
@@ -169,5 +182,5 @@ async def check_bind_device(conn):
         text = f"没有找到该设备的版本信息，请正确配置 OTA地址，然后重新编译固件。"
         await send_stt_message(conn, text)
         music_path = "config/assets/bind_not_found.wav"
-        opus_packets = await audio_to_data(music_path)
+        opus_packets = await audio_to_data(music_path, frame_duration=conn.audio_frame_duration)
         conn.tts.tts_audio_queue.put((SentenceType.LAST, opus_packets, text))
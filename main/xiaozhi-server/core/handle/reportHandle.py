@@ -2,17 +2,19 @@
 TTS上报功能已集成到ConnectionHandler类中。
 
 上报功能包括：
-1. 每个连接对象拥有自己的上报队列和处理线程
-2. 上报线程的生命周期与连接对象绑定
+1. 每个连接对象拥有自己的上报队列，由事件循环中的上报任务消费
+2. 上报任务的生命周期与连接对象绑定
 3. 使用ConnectionHandler.enqueue_tts_report方法进行上报
 
 具体实现请参考core/connection.py中的相关代码。
 """
 
 import time
+import asyncio
 import opuslib_next
 
 from config.manage_api_client import report as manage_report
+from core.utils.audio_frame import max_decode_samples
 
 TAG = __name__
 
@@ -29,7 +31,10 @@ async def report(conn, type, text, opus_data, report_time):
     """
     try:
         if opus_data:
-            audio_data = opus_to_wav(conn, opus_data)
+            # Opus解码为CPU计算，放到共享线程池中执行，避免阻塞事件循环
+            audio_data = await asyncio.get_running_loop().run_in_executor(
+                conn.executor, opus_to_wav, conn, opus_data
+            )
         else:
             audio_data = None
         # 执行异步上报
@@ -62,7 +67,8 @@ def opus_to_wav(conn, opus_data):
 
         for opus_packet in opus_data:
             try:
-                pcm_frame = decoder.decode(opus_packet, 960)  # 960 samples = 60ms
+                # 包自带时长，按最长帧分配缓冲区，兼容任意帧时长
+                pcm_frame = decoder.decode(opus_packet, max_decode_samples())
                 pcm_data.append(pcm_frame)
             except opuslib_next.OpusError as e:
                 conn.logger.bind(tag=TAG).error(f"Opus解码错误: {e}", exc_info=True)
@@ -7,9 +7,7 @@ from core.providers.tts.dto.dto import SentenceType
 from core.utils.audioRateController import AudioRateController
 
 TAG = __name__
-# 音频帧时长（毫秒）
-AUDIO_FRAME_DURATION = 60
-# 预缓冲包数量，直接发送以减少延迟
+# 预缓冲包数量，直接发送以减少延迟；尚未测得链路质量时的默认值，实际按连接的RTT和抖动调整
 PRE_BUFFER_COUNT = 5
 
 
@@ -17,6 +15,8 @@ async def sendAudioMessage(conn, sentenceType, audios, text):
     if conn.tts.tts_audio_first_sentence:
         conn.logger.bind(tag=TAG).info(f"发送第一段语音: {text}")
         conn.tts.tts_audio_first_sentence = False
+        # 每轮回复开始时更新链路RTT，供后续句子选择预缓冲包数
+        conn.link_quality.maybe_probe(conn.websocket)
         await send_tts_message(conn, "start", None)
 
     if sentenceType == SentenceType.FIRST:
@@ -64,7 +64,10 @@ async def _wait_for_audio_completion(conn):
         # 等待预缓冲包播放完成
         # 前N个包直接发送，增加2个网络抖动包，需要额外等待它们在客户端播放完成
         frame_duration_ms = rate_controller.frame_duration
-        pre_buffer_playback_time = (PRE_BUFFER_COUNT + 2) * frame_duration_ms / 1000.0
+        pre_buffer = getattr(conn, "audio_flow_control", {}).get(
+            "pre_buffer", PRE_BUFFER_COUNT
+        )
+        pre_buffer_playback_time = (pre_buffer + 2) * frame_duration_ms / 1000.0
         await asyncio.sleep(pre_buffer_playback_time)
 
         conn.logger.bind(tag=TAG).debug("音频发送完成")
@@ -92,17 +95,19 @@ async def _send_to_mqtt_gateway(conn, opus_packet, timestamp, sequence):
     await conn.websocket.send(complete_packet)
 
 
-async def sendAudio(conn, audios, frame_duration=AUDIO_FRAME_DURATION):
+async def sendAudio(conn, audios, frame_duration=None):
     """
     发送音频包，使用 AudioRateController 进行精确的流量控制
 
     Args:
         conn: 连接对象
         audios: 单个opus包(bytes) 或 opus包列表
-        frame_duration: 帧时长（毫秒），默认使用全局常量AUDIO_FRAME_DURATION
+        frame_duration: 帧时长（毫秒），默认使用与设备协商的帧时长
     """
     if audios is None or len(audios) == 0:
         return
+    if frame_duration is None:
+        frame_duration = conn.audio_frame_duration
 
     send_delay = conn.config.get("tts_audio_send_delay", -1) / 1000.0
     is_single_packet = isinstance(audios, bytes)
@@ -142,11 +147,11 @@ def _get_or_create_rate_controller(conn, frame_duration, is_single_packet):
     else:
         rate_controller = conn.audio_rate_controller
 
-        # 后台发送任务已停止, 则需要重置
-        if (
-            not rate_controller.pending_send_task
-            or rate_controller.pending_send_task.done()
-        ):
+        # 发送已停止（中止或发送失败）, 则需要重置
+        if not rate_controller.is_sending():
+            need_reset = True
+        # 帧时长变化，需要按新的节拍发送
+        elif rate_controller.frame_duration != frame_duration:
             need_reset = True
         # 当sentence_id 变化，需要重置
         elif (
@@ -161,15 +166,19 @@ def _get_or_create_rate_controller(conn, frame_duration, is_single_packet):
             conn.audio_rate_controller = AudioRateController(frame_duration)
         else:
             conn.audio_rate_controller.reset()
+            if conn.audio_rate_controller.frame_duration != frame_duration:
+                conn.audio_rate_controller = AudioRateController(frame_duration)
 
         # 初始化 flow_control
         conn.audio_flow_control = {
             "packet_count": 0,
             "sequence": 0,
             "sentence_id": conn.sentence_id,
+            # 本句直接发送的包数，设备上报欠载时会增加
+            "pre_buffer": conn.link_quality.pre_buffer_packets(frame_duration),
         }
 
-        # 启动后台发送循环
+        # 交给节拍调度器发送
         _start_background_sender(
             conn, conn.audio_rate_controller, conn.audio_flow_control
         )
@@ -179,7 +188,7 @@ def _get_or_create_rate_controller(conn, frame_duration, is_single_packet):
 
 def _start_background_sender(conn, rate_controller, flow_control):
     """
-    启动后台发送循环任务
+    开始由节拍调度器按时发送流控队列中的音频
 
     Args:
         conn: 连接对象
@@ -196,7 +205,6 @@ def _start_background_sender(conn, rate_controller, flow_control):
         await _do_send_audio(conn, packet, flow_control)
         conn.client_is_speaking = True
 
-    # 使用 start_sending 启动后台循环
     rate_controller.start_sending(send_callback)
 
 
@@ -220,7 +228,7 @@ async def _send_audio_with_rate_control(
         conn.last_activity_time = time.time() * 1000
 
         # 预缓冲：前N个包直接发送
-        if flow_control["packet_count"] < PRE_BUFFER_COUNT:
+        if flow_control["packet_count"] < flow_control["pre_buffer"]:
             await _do_send_audio(conn, packet, flow_control)
             conn.client_is_speaking = True
         elif send_delay > 0:
@@ -229,7 +237,7 @@ async def _send_audio_with_rate_control(
             await _do_send_audio(conn, packet, flow_control)
             conn.client_is_speaking = True
         else:
-            # 动态流控模式：仅添加到队列，由后台循环负责发送
+            # 动态流控模式：仅添加到队列，由节拍调度器负责发送
             rate_controller.add_audio(packet)
 
 
@@ -270,7 +278,11 @@ async def send_tts_message(conn, state, text=None):
             stop_tts_notify_voice = conn.config.get(
                 "stop_tts_notify_voice", "config/assets/tts_notify.mp3"
             )
-            audios = await audio_to_data(stop_tts_notify_voice, is_opus=True)
+            audios = await audio_to_data(
+                stop_tts_notify_voice,
+                is_opus=True,
+                frame_duration=conn.audio_frame_duration,
+            )
             await sendAudio(conn, audios)
         # 等待所有音频包发送完成
         await _wait_for_audio_completion(conn)
@@ -39,13 +39,17 @@ class ListenTextMessageHandler(TextMessageHandler):
                 if len(conn.asr_audio) > 0:
                     asr_audio_task = conn.asr_audio.copy()
                     conn.asr_audio.clear()
+                    pcm_data = conn.audio_ingest.take_segment()
                     conn.reset_vad_states()
 
                     if len(asr_audio_task) > 0:
-                        await conn.asr.handle_voice_stop(conn, asr_audio_task)
+                        await conn.asr.handle_voice_stop(
+                            conn, asr_audio_task, pcm_data
+                        )
         elif msg_json["state"] == "detect":
             conn.client_have_voice = False
             conn.asr_audio.clear()
+            conn.audio_ingest.clear_segment()
             if "text" in msg_json:
                 conn.last_activity_time = time.time() * 1000
                 original_text = msg_json["text"]  # 保留原始文本
@@ -0,0 +1,44 @@
+from typing import Dict, Any
+
+from core.handle.textMessageHandler import TextMessageHandler
+from core.handle.textMessageType import TextMessageType
+
+TAG = __name__
+
+# 单条上报最多计入的欠载次数
+MAX_UNDERRUN_COUNT = 5
+
+
+class PlaybackMessageHandler(TextMessageHandler):
+    """设备播放状态上报处理器"""
+
+    @property
+    def message_type(self) -> TextMessageType:
+        return TextMessageType.PLAYBACK
+
+    async def handle(self, conn, msg_json: Dict[str, Any]) -> None:
+        """
+        处理设备上报的播放欠载（播放缓冲区已空但本句音频尚未结束）
+        消息格式：{"type": "playback", "state": "underrun", "count": 1}
+        """
+        if msg_json.get("state") != "underrun":
+            return
+        try:
+            count = int(msg_json.get("count", 1))
+        except (TypeError, ValueError):
+            count = 1
+        count = min(max(count, 1), MAX_UNDERRUN_COUNT)
+        conn.link_quality.on_underrun(count)
+        conn.logger.bind(tag=TAG).info(
+            f"设备播放欠载 {count} 次，后续每句多缓冲 {conn.link_quality.extra_packets} 帧"
+        )
+
+        # 正在播放的句子立即多发送count帧，增加设备端缓冲
+        rate_controller = getattr(conn, "audio_rate_controller", None)
+        flow_control = getattr(conn, "audio_flow_control", None)
+        if rate_controller is not None and rate_controller.is_sending():
+            rate_controller.advance(count)
+            if flow_control is not None:
+                flow_control["pre_buffer"] = (
+                    flow_control.get("pre_buffer", 0) + count
+                )
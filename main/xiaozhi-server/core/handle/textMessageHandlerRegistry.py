@@ -8,6 +8,7 @@ from core.handle.textHandler.mcpMessageHandler import McpTextMessageHandler
 from core.handle.textMessageHandler import TextMessageHandler
 from core.handle.textHandler.serverMessageHandler import ServerTextMessageHandler
 from core.handle.textHandler.pingMessageHandler import PingMessageHandler
+from core.handle.textHandler.playbackMessageHandler import PlaybackMessageHandler
 
 TAG = __name__
 
@@ -29,6 +30,7 @@ class TextMessageHandlerRegistry:
             McpTextMessageHandler(),
             ServerTextMessageHandler(),
             PingMessageHandler(),
+            PlaybackMessageHandler(),
         ]
 
         for handler in handlers:
@@ -10,6 +10,7 @@ sys.path.insert(0, project_root)
 from config.logger import setup_logging
 from core.api.ota_handler import OTAHandler
 from core.api.vision_handler import VisionHandler
+from core.api.metrics_handler import MetricsHandler
 from ElderCare.routes import setup_routes as setup_eldercare_routes
 
 TAG = __name__
@@ -21,6 +22,7 @@ class SimpleHttpServer:
         self.logger = setup_logging()
         self.ota_handler = OTAHandler(config)
         self.vision_handler = VisionHandler(config)
+        self.metrics_handler = MetricsHandler(config)
 
     def _get_websocket_url(self, local_ip: str, port: int) -> str:
         """获取websocket地址
@@ -80,6 +82,8 @@ class SimpleHttpServer:
                         web.options(
                             "/mcp/vision/explain", self.vision_handler.handle_options
                         ),
+                        # 运行指标，用于评估节点负载
+                        web.get("/xiaozhi/metrics", self.metrics_handler.handle_get),
                     ]
                 )
 
@@ -13,6 +13,7 @@ from datetime import datetime
 from config.logger import setup_logging
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.audio_frame import max_decode_samples
 
 TAG = __name__
 logger = setup_logging()
@@ -65,6 +66,8 @@ class AccessToken:
 
 
 class ASRProvider(ASRProviderBase):
+    reads_audio_ingest = False
+
     def __init__(self, config, delete_audio_file):
         super().__init__()
         self.interface_type = InterfaceType.STREAM
@@ -135,7 +138,7 @@ class ASRProvider(ASRProviderBase):
             conn.asr_audio_for_voiceprint.append(audio)
         
         conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
+        conn.asr_audio.keep_last()
 
         # 只在有声音且没有连接时建立连接（排除正在停止的情况）
         if audio_have_voice and not self.is_processing and not self.asr_ws:
@@ -148,7 +151,7 @@ class ASRProvider(ASRProviderBase):
 
         if self.asr_ws and self.is_processing and self.server_ready:
             try:
-                pcm_frame = self.decoder.decode(audio, 960)
+                pcm_frame = self.decoder.decode(audio, max_decode_samples())
                 await self.asr_ws.send(pcm_frame)
             except Exception as e:
                 logger.bind(tag=TAG).warning(f"发送音频失败: {str(e)}")
@@ -234,9 +237,9 @@ class ASRProvider(ASRProviderBase):
 
                         # 发送缓存音频
                         if conn.asr_audio:
-                            for cached_audio in conn.asr_audio[-10:]:
+                            for cached_audio in conn.asr_audio[-conn.asr_audio.pre_roll :]:
                                 try:
-                                    pcm_frame = self.decoder.decode(cached_audio, 960)
+                                    pcm_frame = self.decoder.decode(cached_audio, max_decode_samples())
                                     await self.asr_ws.send(pcm_frame)
                                 except Exception as e:
                                     logger.bind(tag=TAG).warning(f"发送缓存音频失败: {e}")
@@ -293,7 +296,7 @@ class ASRProvider(ASRProviderBase):
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
                 if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
 
     async def _send_stop_request(self):
         """发送停止识别请求（不关闭连接）"""
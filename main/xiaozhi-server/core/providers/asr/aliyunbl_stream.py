@@ -7,12 +7,15 @@ from typing import List
 from config.logger import setup_logging
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.audio_frame import max_decode_samples
 
 TAG = __name__
 logger = setup_logging()
 
 
 class ASRProvider(ASRProviderBase):
+    reads_audio_ingest = False
+
     def __init__(self, config, delete_audio_file):
         super().__init__()
         self.interface_type = InterfaceType.STREAM
@@ -61,7 +64,7 @@ class ASRProvider(ASRProviderBase):
             conn.asr_audio_for_voiceprint.append(audio)
 
         conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
+        conn.asr_audio.keep_last()
 
         # 只在有声音且没有连接时建立连接
         if audio_have_voice and not self.is_processing and not self.asr_ws:
@@ -75,7 +78,7 @@ class ASRProvider(ASRProviderBase):
         # 发送音频数据
         if self.asr_ws and self.is_processing and self.server_ready:
             try:
-                pcm_frame = self.decoder.decode(audio, 960)
+                pcm_frame = self.decoder.decode(audio, max_decode_samples())
                 # 直接发送PCM音频数据(二进制)
                 await self.asr_ws.send(pcm_frame)
             except Exception as e:
@@ -181,9 +184,9 @@ class ASRProvider(ASRProviderBase):
 
                         # 发送缓存音频
                         if conn.asr_audio:
-                            for cached_audio in conn.asr_audio[-10:]:
+                            for cached_audio in conn.asr_audio[-conn.asr_audio.pre_roll :]:
                                 try:
-                                    pcm_frame = self.decoder.decode(cached_audio, 960)
+                                    pcm_frame = self.decoder.decode(cached_audio, max_decode_samples())
                                     await self.asr_ws.send(pcm_frame)
                                 except Exception as e:
                                     logger.bind(tag=TAG).warning(f"发送缓存音频失败: {e}")
@@ -261,7 +264,7 @@ class ASRProvider(ASRProviderBase):
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
                 if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
 
     async def _send_stop_request(self):
         """发送停止请求(用于手动模式停止录音)"""
@@ -4,10 +4,8 @@ import wave
 import uuid
 import json
 import time
-import queue
 import asyncio
 import traceback
-import threading
 import opuslib_next
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
@@ -15,6 +13,9 @@ from typing import Optional, Tuple, List
 from core.handle.receiveAudioHandle import startToChat
 from core.handle.reportHandle import enqueue_asr_report
 from core.utils.util import remove_punctuation_and_length
+from core.utils.audio_frame import max_decode_samples
+from core.utils.speculation import SpeculativeTurn, get_speculation_stats
+from core.providers.asr.dto.dto import InterfaceType
 from core.handle.receiveAudioHandle import handleAudioMessage
 
 TAG = __name__
@@ -22,28 +23,25 @@ logger = setup_logging()
 
 
 class ASRProviderBase(ABC):
+    # 是否从 conn.audio_ingest 读取解码后的PCM，自行处理音频包的流式ASR设为 False
+    reads_audio_ingest = True
+
     def __init__(self):
         pass
 
     # 打开音频通道
     async def open_audio_channels(self, conn):
-        conn.asr_priority_thread = threading.Thread(
-            target=self.asr_text_priority_thread, args=(conn,), daemon=True
-        )
-        conn.asr_priority_thread.start()
+        conn.asr_audio_queue.bind(conn.loop)
+        conn.asr_priority_task = asyncio.create_task(self.asr_audio_priority_task(conn))
 
     # 有序处理ASR音频
-    def asr_text_priority_thread(self, conn):
+    async def asr_audio_priority_task(self, conn):
         while not conn.stop_event.is_set():
             try:
-                message = conn.asr_audio_queue.get(timeout=1)
-                future = asyncio.run_coroutine_threadsafe(
-                    handleAudioMessage(conn, message),
-                    conn.loop,
-                )
-                future.result()
-            except queue.Empty:
-                continue
+                message = await conn.asr_audio_queue.get()
+                await handleAudioMessage(conn, message)
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理ASR文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
@@ -61,92 +59,54 @@ class ASRProviderBase(ABC):
 
             conn.asr_audio.append(audio)
             if not have_voice and not conn.client_have_voice:
-                conn.asr_audio = conn.asr_audio[-10:]
+                conn.asr_audio.keep_last()
+                conn.audio_ingest.keep_last_packets(conn.asr_audio.pre_roll)
                 return
 
+            if have_voice and conn.speculative_turn is not None:
+                # 停顿后继续说话，之前的推测作废
+                conn.cancel_speculation()
+            elif (
+                # 流式ASR的识别结果在 speech_to_text 中取出后即清空，不能在说话中途提前取
+                self.interface_type != InterfaceType.STREAM
+                and conn.client_voice_pause
+                and not conn.client_voice_stop
+                and conn.speculative_turn is None
+                and len(conn.asr_audio) > 15
+            ):
+                self._start_speculation(conn)
+
             # 自动模式下通过VAD检测到语音停止时触发识别
             if conn.client_voice_stop:
                 asr_audio_task = conn.asr_audio.copy()
                 conn.asr_audio.clear()
+                pcm_data = conn.audio_ingest.take_segment()
                 conn.reset_vad_states()
 
                 if len(asr_audio_task) > 15:
-                    await self.handle_voice_stop(conn, asr_audio_task)
+                    await self.handle_voice_stop(conn, asr_audio_task, pcm_data)
+                else:
+                    conn.cancel_speculation("语音过短")
 
     # 处理语音停止
-    async def handle_voice_stop(self, conn, asr_audio_task: List[bytes]):
-        """并行处理ASR和声纹识别"""
+    async def handle_voice_stop(
+        self, conn, asr_audio_task: List[bytes], pcm_data: Optional[bytes] = None
+    ):
+        """并行处理ASR和声纹识别
+
+        pcm_data 为接入时已解码好的整段PCM，传入时不再重复解码 asr_audio_task
+        """
         try:
             total_start_time = time.monotonic()
 
-            # 准备音频数据
-            if conn.audio_format == "pcm":
-                pcm_data = asr_audio_task
-            else:
-                pcm_data = self.decode_opus(asr_audio_task)
-
-            combined_pcm_data = b"".join(pcm_data)
-
-            # 预先准备WAV数据
-            wav_data = None
-            if conn.voiceprint_provider and combined_pcm_data:
-                wav_data = self._pcm_to_wav(combined_pcm_data)
-
-            # 定义ASR任务
-            asr_task = self.speech_to_text(asr_audio_task, conn.session_id, conn.audio_format)
-
-            if conn.voiceprint_provider and wav_data:
-                voiceprint_task = conn.voiceprint_provider.identify_speaker(wav_data, conn.session_id)
-                # 并发等待两个结果
-                asr_result, voiceprint_result = await asyncio.gather(
-                    asr_task, voiceprint_task, return_exceptions=True
-                )
-            else:
-                asr_result = await asr_task
-                voiceprint_result = None
-
-            # 记录识别结果 - 检查是否为异常
-            if isinstance(asr_result, Exception):
-                logger.bind(tag=TAG).error(f"ASR识别失败: {asr_result}")
-                raw_text = ""
-            else:
-                raw_text, _ = asr_result
-
-            if isinstance(voiceprint_result, Exception):
-                logger.bind(tag=TAG).error(f"声纹识别失败: {voiceprint_result}")
-                speaker_name = ""
-            else:
-                speaker_name = voiceprint_result
-
-            # 判断 ASR 结果类型
-            if isinstance(raw_text, dict):
-                # FunASR 返回的 dict 格式
-                if speaker_name:
-                    raw_text["speaker"] = speaker_name
-
-                # 记录识别结果
-                if raw_text.get("language"):
-                    logger.bind(tag=TAG).info(f"识别语言: {raw_text['language']}")
-                if raw_text.get("emotion"):
-                    logger.bind(tag=TAG).info(f"识别情绪: {raw_text['emotion']}")
-                if raw_text.get("content"):
-                    logger.bind(tag=TAG).info(f"识别文本: {raw_text['content']}")
-                if speaker_name:
-                    logger.bind(tag=TAG).info(f"识别说话人: {speaker_name}")
-
-                # 转换为 JSON 字符串用于下游
-                enhanced_text = json.dumps(raw_text, ensure_ascii=False)
-                content_for_length_check = raw_text.get("content", "")
-            else:
-                # 其他 ASR 返回的纯文本
-                if raw_text:
-                    logger.bind(tag=TAG).info(f"识别文本: {raw_text}")
-                if speaker_name:
-                    logger.bind(tag=TAG).info(f"识别说话人: {speaker_name}")
-
-                # 构建包含说话人信息的JSON字符串
-                enhanced_text = self._build_enhanced_text(raw_text, speaker_name)
-                content_for_length_check = raw_text
+            recognized = None
+            turn = conn.speculative_turn
+            if turn is not None and not turn.cancelled and turn.asr_task is not None:
+                # 停顿期间已提前识别，直接复用结果
+                recognized = await turn.asr_task
+            if recognized is None:
+                recognized = await self._recognize(conn, asr_audio_task, pcm_data)
+            enhanced_text, content_for_length_check = recognized
 
             # 性能监控
             total_time = time.monotonic() - total_start_time
@@ -165,6 +125,112 @@ class ASRProviderBase(ABC):
             logger.bind(tag=TAG).error(f"处理语音停止失败: {e}")
             import traceback
             logger.bind(tag=TAG).debug(f"异常详情: {traceback.format_exc()}")
+        finally:
+            # 推测回复未被采用（文本为空、意图已处理等）则丢弃
+            conn.cancel_speculation("本轮未进入对话")
+
+    async def _recognize(
+        self, conn, asr_audio_task: List[bytes], pcm_data: Optional[bytes] = None
+    ) -> Tuple[str, str]:
+        """识别一段语音，返回 (下游使用的文本, 用于长度判断的纯文本)"""
+        # 准备音频数据
+        combined_pcm_data = pcm_data
+        if combined_pcm_data is None and conn.voiceprint_provider:
+            if conn.audio_format == "pcm":
+                combined_pcm_data = b"".join(asr_audio_task)
+            else:
+                combined_pcm_data = b"".join(self.decode_opus(asr_audio_task))
+
+        # 预先准备WAV数据
+        wav_data = None
+        if conn.voiceprint_provider and combined_pcm_data:
+            wav_data = self._pcm_to_wav(combined_pcm_data)
+
+        # 定义ASR任务
+        if pcm_data is not None:
+            asr_task = self.speech_to_text([pcm_data], conn.session_id, "pcm")
+        else:
+            asr_task = self.speech_to_text(
+                asr_audio_task, conn.session_id, conn.audio_format
+            )
+
+        if conn.voiceprint_provider and wav_data:
+            voiceprint_task = conn.voiceprint_provider.identify_speaker(wav_data, conn.session_id)
+            # 并发等待两个结果
+            asr_result, voiceprint_result = await asyncio.gather(
+                asr_task, voiceprint_task, return_exceptions=True
+            )
+        else:
+            asr_result = await asr_task
+            voiceprint_result = None
+
+        # 记录识别结果 - 检查是否为异常
+        if isinstance(asr_result, Exception):
+            logger.bind(tag=TAG).error(f"ASR识别失败: {asr_result}")
+            raw_text = ""
+        else:
+            raw_text, _ = asr_result
+
+        if isinstance(voiceprint_result, Exception):
+            logger.bind(tag=TAG).error(f"声纹识别失败: {voiceprint_result}")
+            speaker_name = ""
+        else:
+            speaker_name = voiceprint_result
+
+        # 判断 ASR 结果类型
+        if isinstance(raw_text, dict):
+            # FunASR 返回的 dict 格式
+            if speaker_name:
+                raw_text["speaker"] = speaker_name
+
+            # 记录识别结果
+            if raw_text.get("language"):
+                logger.bind(tag=TAG).info(f"识别语言: {raw_text['language']}")
+            if raw_text.get("emotion"):
+                logger.bind(tag=TAG).info(f"识别情绪: {raw_text['emotion']}")
+            if raw_text.get("content"):
+                logger.bind(tag=TAG).info(f"识别文本: {raw_text['content']}")
+            if speaker_name:
+                logger.bind(tag=TAG).info(f"识别说话人: {speaker_name}")
+
+            # 转换为 JSON 字符串用于下游
+            enhanced_text = json.dumps(raw_text, ensure_ascii=False)
+            content_for_length_check = raw_text.get("content", "")
+        else:
+            # 其他 ASR 返回的纯文本
+            if raw_text:
+                logger.bind(tag=TAG).info(f"识别文本: {raw_text}")
+            if speaker_name:
+                logger.bind(tag=TAG).info(f"识别说话人: {speaker_name}")
+
+            # 构建包含说话人信息的JSON字符串
+            enhanced_text = self._build_enhanced_text(raw_text, speaker_name)
+            content_for_length_check = raw_text
+
+        return enhanced_text, content_for_length_check
+
+    def _start_speculation(self, conn):
+        """短暂停顿时提前识别，识别出文本后推测启动LLM"""
+        turn = SpeculativeTurn()
+        conn.speculative_turn = turn
+        get_speculation_stats().started += 1
+        asr_audio_task = conn.asr_audio.copy()
+        pcm_data, _ = conn.audio_ingest.read_since(conn.audio_ingest.segment_start)
+        turn.asr_task = asyncio.create_task(
+            self._speculate(conn, turn, asr_audio_task, pcm_data)
+        )
+
+    async def _speculate(self, conn, turn, asr_audio_task, pcm_data):
+        try:
+            recognized = await self._recognize(conn, asr_audio_task, pcm_data)
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"推测识别失败: {e}")
+            return None
+        enhanced_text, content_for_length_check = recognized
+        text_len, _ = remove_punctuation_and_length(content_for_length_check)
+        if text_len > 0 and not turn.cancelled:
+            conn.submit_speculative_chat(turn, enhanced_text)
+        return recognized
 
     def _build_enhanced_text(self, text: str, speaker_name: Optional[str]) -> str:
         """构建包含说话人信息的文本（仅用于纯文本ASR）"""
@@ -234,7 +300,8 @@ class ASRProviderBase(ABC):
         try:
             decoder = opuslib_next.Decoder(16000, 1)
             pcm_data = []
-            buffer_size = 960  # 每次处理960个采样点 (60ms at 16kHz)
+            # Opus包自带时长，按最长帧分配缓冲区，任意帧时长都能解码
+            buffer_size = max_decode_samples()
             
             for i, opus_packet in enumerate(opus_data):
                 try:
@@ -0,0 +1,188 @@
+"""
+本地ASR动态批处理调度器
+本地模型(InterfaceType.LOCAL)由所有连接共用，各连接的整句识别请求先进入队列，
+按音频时长分桶，在有限等待时间内攒成一批后执行一次批量解码，再把结果分发给各调用方
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from config.logger import setup_logging
+from core.utils.metrics import Histogram
+
+TAG = __name__
+logger = setup_logging()
+
+# 解码线程为进程级，更新配置重建提供者时不会每次新建线程
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="asr-batch"
+            )
+        return _batch_executor
+
+
+class _Request:
+    __slots__ = ("audio", "duration", "future", "enqueue_time")
+
+    def __init__(self, audio, duration, future):
+        self.audio = audio
+        self.duration = duration
+        self.future = future
+        self.enqueue_time = time.monotonic()
+
+
+class ASRBatchScheduler:
+    """
+    - 音频按时长分桶，同一批次内长度相近，减少padding带来的无效计算
+    - 任一桶攒满 max_batch_size 立即解码，否则最早的请求等待超过 max_wait_ms 后解码其所在桶
+    - 解码在单独的单线程中串行执行，避免多个请求同时抢占模型导致CPU线程超额订阅
+    """
+
+    def __init__(
+        self,
+        decode_batch: Callable[[List], List],
+        max_wait_ms: float = 30,
+        max_batch_size: int = 8,
+        bucket_bounds_s=(2, 4, 8, 16),
+    ):
+        self.decode_batch = decode_batch
+        self.max_wait = max(float(max_wait_ms), 0) / 1000.0
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.bucket_bounds = sorted(bucket_bounds_s)
+        self._buckets = [deque() for _ in range(len(self.bucket_bounds) + 1)]
+        self._pending = 0
+        self._flush_handle = None
+        self._inflight = False
+        self._executor = _get_batch_executor()
+
+        self.queue_depth_hist = Histogram([0, 1, 2, 4, 8, 16, 32, 64])
+        self.batch_size_hist = Histogram(list(range(1, self.max_batch_size + 1)))
+        self.wait_ms_hist = Histogram([5, 10, 20, 30, 50, 100, 200, 500])
+        self.decode_errors = 0
+
+    async def submit(self, audio, duration: float):
+        """
+        提交一句话的音频，等待批量解码后返回该句的识别结果
+
+        Args:
+            audio: 传给 decode_batch 的单条音频数据
+            duration: 音频时长（秒），用于分桶
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # 记录请求到达时队列中已有的请求数
+        self.queue_depth_hist.observe(self._pending)
+        bucket = self._buckets[bisect_left(self.bucket_bounds, duration)]
+        bucket.append(_Request(audio, duration, future))
+        self._pending += 1
+        self._schedule(loop)
+        return await future
+
+    def get_stats(self) -> dict:
+        return {
+            "queue_depth": self._pending,
+            "queue_depth_hist": self.queue_depth_hist.snapshot(),
+            "batch_size_hist": self.batch_size_hist.snapshot(),
+            "wait_ms_hist": self.wait_ms_hist.snapshot(),
+            "decode_errors": self.decode_errors,
+        }
+
+    def _schedule(self, loop):
+        if self._inflight:
+            # 解码进行中，完成后会继续处理队列
+            return
+        delay = self._next_delay()
+        if delay is None:
+            return
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if delay <= 0:
+            loop.create_task(self._flush())
+        else:
+            self._flush_handle = loop.call_later(
+                delay, lambda: loop.create_task(self._flush())
+            )
+
+    def _next_delay(self):
+        """距离下一次应当解码的时间，队列为空返回None"""
+        if self._pending == 0:
+            return None
+        oldest = None
+        for bucket in self._buckets:
+            if len(bucket) >= self.max_batch_size:
+                return 0
+            if bucket and (oldest is None or bucket[0].enqueue_time < oldest):
+                oldest = bucket[0].enqueue_time
+        return oldest + self.max_wait - time.monotonic()
+
+    def _take_batch(self):
+        """优先取已攒满的桶，否则取队首请求最早的桶"""
+        target = None
+        for bucket in self._buckets:
+            if len(bucket) >= self.max_batch_size:
+                target = bucket
+                break
+            if bucket and (
+                target is None or bucket[0].enqueue_time < target[0].enqueue_time
+            ):
+                target = bucket
+        batch = []
+        now = time.monotonic()
+        while target and len(batch) < self.max_batch_size:
+            request = target.popleft()
+            self._pending -= 1
+            if request.future.cancelled():
+                continue
+            self.wait_ms_hist.observe((now - request.enqueue_time) * 1000)
+            batch.append(request)
+        return batch
+
+    async def _flush(self):
+        self._flush_handle = None
+        if self._inflight:
+            return
+        delay = self._next_delay()
+        if delay is None:
+            return
+        loop = asyncio.get_running_loop()
+        if delay > 0:
+            self._schedule(loop)
+            return
+
+        self._inflight = True
+        try:
+            batch = self._take_batch()
+            if batch:
+                self.batch_size_hist.observe(len(batch))
+                try:
+                    results = await loop.run_in_executor(
+                        self._executor,
+                        self.decode_batch,
+                        [request.audio for request in batch],
+                    )
+                except Exception as e:
+                    self.decode_errors += 1
+                    logger.bind(tag=TAG).error(f"ASR批量解码失败: {e}")
+                    for request in batch:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                else:
+                    for request, result in zip(batch, results):
+                        if not request.future.done():
+                            request.future.set_result(result)
+        finally:
+            self._inflight = False
+        self._schedule(loop)
@@ -7,12 +7,15 @@ import opuslib_next
 from core.providers.asr.base import ASRProviderBase
 from config.logger import setup_logging
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.audio_frame import max_decode_samples
 
 TAG = __name__
 logger = setup_logging()
 
 
 class ASRProvider(ASRProviderBase):
+    reads_audio_ingest = False
+
     def __init__(self, config, delete_audio_file):
         super().__init__()
         self.interface_type = InterfaceType.STREAM
@@ -61,7 +64,7 @@ class ASRProvider(ASRProviderBase):
 
     async def receive_audio(self, conn, audio, audio_have_voice):
         conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
+        conn.asr_audio.keep_last()
         # 存储音频数据
         if not hasattr(conn, 'asr_audio_for_voiceprint'):
             conn.asr_audio_for_voiceprint = []
@@ -123,9 +126,9 @@ class ASRProvider(ASRProviderBase):
 
                 # 发送缓存的音频数据
                 if conn.asr_audio and len(conn.asr_audio) > 0:
-                    for cached_audio in conn.asr_audio[-10:]:
+                    for cached_audio in conn.asr_audio[-conn.asr_audio.pre_roll :]:
                         try:
-                            pcm_frame = self.decoder.decode(cached_audio, 960)
+                            pcm_frame = self.decoder.decode(cached_audio, max_decode_samples())
                             payload = gzip.compress(pcm_frame)
                             audio_request = bytearray(
                                 self.generate_audio_default_header()
@@ -151,7 +154,7 @@ class ASRProvider(ASRProviderBase):
         # 发送当前音频数据
         if self.asr_ws and self.is_processing:
             try:
-                pcm_frame = self.decoder.decode(audio, 960)
+                pcm_frame = self.decoder.decode(audio, max_decode_samples())
                 payload = gzip.compress(pcm_frame)
                 audio_request = bytearray(self.generate_audio_default_header())
                 audio_request.extend(len(payload).to_bytes(4, "big"))
@@ -266,7 +269,7 @@ class ASRProvider(ASRProviderBase):
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
                 if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
 
     def stop_ws_connection(self):
         if self.asr_ws:
@@ -442,4 +445,4 @@ class ASRProvider(ASRProviderBase):
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
                 if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
@@ -12,6 +12,9 @@ from typing import Optional, Tuple, List
 from core.providers.asr.utils import lang_tag_filter
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
+from core.providers.asr.batch_scheduler import ASRBatchScheduler
+from core.utils.metrics import register_stats
+from core.utils.model_worker_pool import get_model_worker_pool
 
 TAG = __name__
 logger = setup_logging()
@@ -37,6 +40,34 @@ class CaptureOutput:
             logger.bind(tag=TAG).info(self.output.strip())
 
 
+def _load_model(model_dir):
+    with CaptureOutput():
+        return AutoModel(
+            model=model_dir,
+            vad_kwargs={"max_single_segment_time": 30000},
+            disable_update=True,
+            hub="hf",
+            # device="cuda:0",  # 启用GPU加速
+        )
+
+
+def create_worker_model(config: dict):
+    """模型工作进程内调用，加载一次模型，返回识别函数"""
+    model = _load_model(config.get("model_dir"))
+
+    def recognize(pcm_view):
+        result = model.generate(
+            input=bytes(pcm_view),
+            cache={},
+            language="auto",
+            use_itn=True,
+            batch_size_s=60,
+        )
+        return lang_tag_filter(result[0]["text"])
+
+    return recognize
+
+
 class ASRProvider(ASRProviderBase):
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
@@ -54,15 +85,47 @@ class ASRProvider(ASRProviderBase):
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
-        with CaptureOutput():
-            self.model = AutoModel(
-                model=self.model_dir,
-                vad_kwargs={"max_single_segment_time": 30000},
-                disable_update=True,
-                hub="hf",
-                # device="cuda:0",  # 启用GPU加速
+
+        # 模型工作进程池：识别在独立进程中执行，不与事件循环争抢GIL，主进程不再加载模型
+        self.worker_pool = None
+        self.model = None
+        process_workers = int(config.get("process_workers", 0) or 0)
+        if process_workers > 0:
+            self.worker_pool = get_model_worker_pool(
+                "asr", f"{__name__}:create_worker_model", config, process_workers
+            )
+            register_stats("asr_worker_pool", self.worker_pool.get_stats)
+        else:
+            self.model = _load_model(self.model_dir)
+
+        # 动态批处理：多个连接的识别请求合并为一次批量解码
+        self.batch_scheduler = None
+        if (
+            self.worker_pool is None
+            and str(config.get("batch_enabled", False)).lower() == "true"
+        ):
+            self.batch_scheduler = ASRBatchScheduler(
+                self._generate_batch,
+                max_wait_ms=float(config.get("batch_max_wait_ms", 30) or 30),
+                max_batch_size=int(config.get("batch_max_size", 8) or 8),
+            )
+            register_stats("asr_batch", self.batch_scheduler.get_stats)
+            logger.bind(tag=TAG).info(
+                f"FunASR动态批处理已启用: max_wait={self.batch_scheduler.max_wait * 1000}ms, "
+                f"max_batch={self.batch_scheduler.max_batch_size}"
             )
 
+    def _generate_batch(self, batch: List[bytes]) -> List[dict]:
+        """一次推理识别多段PCM音频，返回与输入顺序一致的结果"""
+        results = self.model.generate(
+            input=batch,
+            cache={},
+            language="auto",
+            use_itn=True,
+            batch_size=len(batch),
+        )
+        return [lang_tag_filter(result["text"]) for result in results]
+
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
     ) -> Tuple[Optional[str], Optional[str]]:
@@ -94,15 +157,22 @@ class ASRProvider(ASRProviderBase):
 
                 # 语音识别 - 使用线程池避免阻塞事件循环
                 start_time = time.time()
-                result = await asyncio.to_thread(
-                    self.model.generate,
-                    input=combined_pcm_data,
-                    cache={},
-                    language="auto",
-                    use_itn=True,
-                    batch_size_s=60,
-                )
-                text = lang_tag_filter(result[0]["text"])
+                if self.worker_pool is not None:
+                    text = await self.worker_pool.run(combined_pcm_data)
+                elif self.batch_scheduler is not None:
+                    text = await self.batch_scheduler.submit(
+                        combined_pcm_data, len(combined_pcm_data) / 32000
+                    )
+                else:
+                    result = await asyncio.to_thread(
+                        self.model.generate,
+                        input=combined_pcm_data,
+                        cache={},
+                        language="auto",
+                        use_itn=True,
+                        batch_size_s=60,
+                    )
+                    text = lang_tag_filter(result[0]["text"])
                 logger.bind(tag=TAG).debug(
                     f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text['content']}"
                 )
@@ -7,6 +7,9 @@ from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.batch_scheduler import ASRBatchScheduler
+from core.utils.metrics import register_stats
+from core.utils.model_worker_pool import get_model_worker_pool
 
 import numpy as np
 import sherpa_onnx
@@ -34,6 +37,50 @@ class CaptureOutput:
             logger.bind(tag=TAG).info(self.output.strip())
 
 
+def _create_recognizer(model_path, tokens_path, model_type):
+    with CaptureOutput():
+        if model_type == "paraformer":
+            return sherpa_onnx.OfflineRecognizer.from_paraformer(
+                paraformer=model_path,
+                tokens=tokens_path,
+                num_threads=2,
+                sample_rate=16000,
+                feature_dim=80,
+                decoding_method="greedy_search",
+                debug=False,
+            )
+        # sense_voice
+        return sherpa_onnx.OfflineRecognizer.from_sense_voice(
+            model=model_path,
+            tokens=tokens_path,
+            num_threads=2,
+            sample_rate=16000,
+            feature_dim=80,
+            decoding_method="greedy_search",
+            debug=False,
+            use_itn=True,
+        )
+
+
+def create_worker_model(config: dict):
+    """模型工作进程内调用，加载一次模型，返回识别函数"""
+    model_dir = config.get("model_dir")
+    recognizer = _create_recognizer(
+        os.path.join(model_dir, "model.int8.onnx"),
+        os.path.join(model_dir, "tokens.txt"),
+        config.get("model_type", "sense_voice"),
+    )
+
+    def recognize(pcm_view):
+        samples = np.frombuffer(pcm_view, dtype=np.int16).astype(np.float32) / 32768
+        s = recognizer.create_stream()
+        s.accept_waveform(16000, samples)
+        recognizer.decode_stream(s)
+        return s.result.text
+
+    return recognize
+
+
 class ASRProvider(ASRProviderBase):
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
@@ -73,28 +120,46 @@ class ASRProvider(ASRProviderBase):
             logger.bind(tag=TAG).error(f"模型文件处理失败: {str(e)}")
             raise
 
-        with CaptureOutput():
-            if self.model_type == "paraformer":
-                self.model = sherpa_onnx.OfflineRecognizer.from_paraformer(
-                    paraformer=self.model_path,
-                    tokens=self.tokens_path,
-                    num_threads=2,
-                    sample_rate=16000,
-                    feature_dim=80,
-                    decoding_method="greedy_search",
-                    debug=False,
-                )
-            else:  # sense_voice
-                self.model = sherpa_onnx.OfflineRecognizer.from_sense_voice(
-                    model=self.model_path,
-                    tokens=self.tokens_path,
-                    num_threads=2,
-                    sample_rate=16000,
-                    feature_dim=80,
-                    decoding_method="greedy_search",
-                    debug=False,
-                    use_itn=True,
-                )
+        # 模型工作进程池：识别在独立进程中执行，不与事件循环争抢GIL，主进程不再加载模型
+        self.worker_pool = None
+        self.model = None
+        process_workers = int(config.get("process_workers", 0) or 0)
+        if process_workers > 0:
+            self.worker_pool = get_model_worker_pool(
+                "asr", f"{__name__}:create_worker_model", config, process_workers
+            )
+            register_stats("asr_worker_pool", self.worker_pool.get_stats)
+        else:
+            self.model = _create_recognizer(
+                self.model_path, self.tokens_path, self.model_type
+            )
+
+        # 动态批处理：多个连接的识别请求合并为一次批量解码
+        self.batch_scheduler = None
+        if (
+            self.worker_pool is None
+            and str(config.get("batch_enabled", False)).lower() == "true"
+        ):
+            self.batch_scheduler = ASRBatchScheduler(
+                self._decode_batch,
+                max_wait_ms=float(config.get("batch_max_wait_ms", 30) or 30),
+                max_batch_size=int(config.get("batch_max_size", 8) or 8),
+            )
+            register_stats("asr_batch", self.batch_scheduler.get_stats)
+            logger.bind(tag=TAG).info(
+                f"Sherpa动态批处理已启用: max_wait={self.batch_scheduler.max_wait * 1000}ms, "
+                f"max_batch={self.batch_scheduler.max_batch_size}"
+            )
+
+    def _decode_batch(self, batch: List[np.ndarray]) -> List[str]:
+        """一次解码多段音频，返回与输入顺序一致的识别文本"""
+        streams = []
+        for samples in batch:
+            s = self.model.create_stream()
+            s.accept_waveform(16000, samples)
+            streams.append(s)
+        self.model.decode_streams(streams)
+        return [s.result.text for s in streams]
 
     def read_wave(self, wave_filename: str) -> Tuple[np.ndarray, int]:
         """
@@ -139,11 +204,20 @@ class ASRProvider(ASRProviderBase):
 
             # 语音识别
             start_time = time.time()
-            s = self.model.create_stream()
-            samples, sample_rate = self.read_wave(file_path)
-            s.accept_waveform(sample_rate, samples)
-            self.model.decode_stream(s)
-            text = s.result.text
+            if self.worker_pool is not None:
+                text = await self.worker_pool.run(b"".join(pcm_data))
+            elif self.batch_scheduler is not None:
+                samples = (
+                    np.frombuffer(b"".join(pcm_data), dtype=np.int16).astype(np.float32)
+                    / 32768
+                )
+                text = await self.batch_scheduler.submit(samples, len(samples) / 16000)
+            else:
+                s = self.model.create_stream()
+                samples, sample_rate = self.read_wave(file_path)
+                s.accept_waveform(sample_rate, samples)
+                self.model.decode_stream(s)
+                text = s.result.text
             logger.bind(tag=TAG).debug(
                 f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
             )
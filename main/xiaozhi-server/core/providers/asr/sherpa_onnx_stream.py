@@ -0,0 +1,216 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.logger import setup_logging
+from typing import Optional, Tuple, List
+from core.providers.asr.dto.dto import InterfaceType
+from core.providers.asr.base import ASRProviderBase
+
+import numpy as np
+import sherpa_onnx
+
+TAG = __name__
+logger = setup_logging()
+
+# 流式接口每个连接一个Provider实例，但模型只加载一次，由所有连接共享
+_recognizers = {}
+_recognizers_lock = threading.Lock()
+# 所有连接共用的解码线程池，同一识别流的调用由各连接的锁串行化
+_decode_executor = None
+
+# 结束时补一段静音，让模型输出最后几个字
+TAIL_PADDING_SECONDS = 0.3
+# 累计到该长度再送入识别器，与模型每次解码的块长相当，不必每个包都切换一次线程
+FEED_BYTES = int(0.3 * 16000) * 2
+
+
+def _get_decode_executor(config: dict) -> ThreadPoolExecutor:
+    global _decode_executor
+    with _recognizers_lock:
+        if _decode_executor is None:
+            workers = int(config.get("decode_workers") or os.cpu_count() or 4)
+            _decode_executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="sherpa-stream"
+            )
+        return _decode_executor
+
+
+def _get_recognizer(config: dict):
+    model_dir = config.get("model_dir")
+    model_type = config.get("model_type", "zipformer")
+    key = (model_dir, model_type)
+    with _recognizers_lock:
+        recognizer = _recognizers.get(key)
+        if recognizer is not None:
+            return recognizer
+
+        def model_file(name, default):
+            return os.path.join(model_dir, config.get(name) or default)
+
+        tokens = model_file("tokens", "tokens.txt")
+        num_threads = int(config.get("num_threads", 2) or 2)
+        if model_type == "paraformer":
+            recognizer = sherpa_onnx.OnlineRecognizer.from_paraformer(
+                tokens=tokens,
+                encoder=model_file("encoder", "encoder.int8.onnx"),
+                decoder=model_file("decoder", "decoder.int8.onnx"),
+                num_threads=num_threads,
+                sample_rate=16000,
+                feature_dim=80,
+                decoding_method="greedy_search",
+            )
+        else:  # zipformer transducer
+            recognizer = sherpa_onnx.OnlineRecognizer.from_transducer(
+                tokens=tokens,
+                encoder=model_file("encoder", "encoder-epoch-99-avg-1.onnx"),
+                decoder=model_file("decoder", "decoder-epoch-99-avg-1.onnx"),
+                joiner=model_file("joiner", "joiner-epoch-99-avg-1.onnx"),
+                num_threads=num_threads,
+                sample_rate=16000,
+                feature_dim=80,
+                decoding_method="greedy_search",
+                # 断句由VAD负责，这里不启用模型自带的端点检测
+                enable_endpoint_detection=False,
+            )
+        _recognizers[key] = recognizer
+        logger.bind(tag=TAG).info(f"Sherpa流式识别模型加载完成: {model_dir}")
+        return recognizer
+
+
+class ASRProvider(ASRProviderBase):
+    """
+    本地流式识别：说话过程中持续把PCM送入sherpa-onnx在线识别器，
+    VAD判定说完时只需解码最后一小段音频即可得到结果
+    """
+
+    def __init__(self, config: dict, delete_audio_file: bool):
+        super().__init__()
+        self.interface_type = InterfaceType.STREAM
+        self.config = config
+        self.output_dir = config.get("output_dir", "tmp/")
+        self.delete_audio_file = delete_audio_file
+        self.recognizer = _get_recognizer(config)
+        self.executor = _get_decode_executor(config)
+
+        self.conn = None
+        self.stream = None
+        # sherpa-onnx 的识别流不是线程安全的，送入音频与结束解码不能同时进行
+        self.stream_lock = asyncio.Lock()
+        self.fed_pos = 0  # 已送入识别器的PCM绝对偏移
+        self.partial_text = ""
+        self.text = ""
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    async def open_audio_channels(self, conn):
+        self.conn = conn
+        await super().open_audio_channels(conn)
+
+    async def receive_audio(self, conn, audio, audio_have_voice):
+        conn.asr_audio.append(audio)
+
+        if self.stream is None:
+            if (
+                conn.client_listen_mode != "manual"
+                and not audio_have_voice
+                and not conn.client_have_voice
+            ):
+                # 静音期间只保留前导音频
+                conn.asr_audio.keep_last()
+                conn.audio_ingest.keep_last_packets(conn.asr_audio.pre_roll)
+                return
+            # 开始说话：创建识别流，从前导音频开始送入
+            self.stream = self.recognizer.create_stream()
+            self.fed_pos = conn.audio_ingest.segment_start
+            self.partial_text = ""
+
+        # 上一段音频仍在解码时不排队，新音频留到下次一并送入
+        if (
+            not self.stream_lock.locked()
+            and conn.audio_ingest.size_since(self.fed_pos) >= FEED_BYTES
+        ):
+            async with self.stream_lock:
+                await self._feed(conn)
+
+        # 自动模式下通过VAD检测到语音停止时结束识别
+        if conn.client_listen_mode != "manual" and conn.client_voice_stop:
+            await self._finish_utterance(conn, min_packets=15)
+
+    async def _feed(self, conn):
+        if self.stream is None:
+            return
+        pcm, self.fed_pos = conn.audio_ingest.read_since(self.fed_pos)
+        if not pcm:
+            return
+        try:
+            text = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._accept_pcm, self.stream, pcm
+            )
+            if text and text != self.partial_text:
+                self.partial_text = text
+                logger.bind(tag=TAG).debug(f"中间识别结果: {text}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"流式识别送入音频失败: {e}")
+
+    async def _send_stop_request(self):
+        """手动模式松开按键，结束本次识别"""
+        if self.conn is not None and self.stream is not None:
+            await self._finish_utterance(self.conn, min_packets=0)
+
+    async def _finish_utterance(self, conn, min_packets: int):
+        async with self.stream_lock:
+            stream = self.stream
+            if stream is None:
+                # 已由另一路调用结束
+                return
+            self.stream = None
+            # 尚未送入的音频与句尾静音一起解码
+            pcm, self.fed_pos = conn.audio_ingest.read_since(self.fed_pos)
+            asr_audio_task = conn.asr_audio.copy()
+            conn.asr_audio.clear()
+            pcm_data = conn.audio_ingest.take_segment()
+            conn.reset_vad_states()
+
+            try:
+                self.text = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self._finish_stream, stream, pcm
+                )
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"流式识别结束解码失败: {e}")
+                self.text = ""
+
+        if len(asr_audio_task) > min_packets:
+            await self.handle_voice_stop(conn, asr_audio_task, pcm_data)
+        self.text = ""
+
+    def _accept_pcm(self, stream, pcm: bytes) -> str:
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+        stream.accept_waveform(16000, samples)
+        while self.recognizer.is_ready(stream):
+            self.recognizer.decode_stream(stream)
+        return self.recognizer.get_result(stream).strip()
+
+    def _finish_stream(self, stream, pcm: bytes) -> str:
+        if pcm:
+            samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+            stream.accept_waveform(16000, samples)
+        tail = np.zeros(int(TAIL_PADDING_SECONDS * 16000), dtype=np.float32)
+        stream.accept_waveform(16000, tail)
+        stream.input_finished()
+        while self.recognizer.is_ready(stream):
+            self.recognizer.decode_stream(stream)
+        return self.recognizer.get_result(stream).strip()
+
+    async def speech_to_text(
+        self, opus_data: List[bytes], session_id: str, audio_format="opus"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """识别已在说话过程中完成，这里直接返回结果"""
+        file_path = None
+        if not self.delete_audio_file and audio_format == "pcm":
+            file_path = self.save_audio_to_file(opus_data, session_id)
+        return self.text, file_path
+
+    async def close(self):
+        self.stream = None
+        self.conn = None
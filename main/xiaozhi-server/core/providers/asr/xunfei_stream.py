@@ -9,11 +9,12 @@ import gc
 from time import mktime
 from datetime import datetime
 from urllib.parse import urlencode
-from typing import List
+from typing import List, Optional
 from config.logger import setup_logging
 from wsgiref.handlers import format_date_time
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.audio_frame import max_decode_samples
 
 TAG = __name__
 logger = setup_logging()
@@ -118,7 +119,7 @@ class ASRProvider(ASRProviderBase):
         # 发送当前音频数据
         if self.asr_ws and self.is_processing and self.server_ready:
             try:
-                pcm_frame = self.decoder.decode(audio, 960)
+                pcm_frame = self.decoder.decode(audio, max_decode_samples())
                 await self._send_audio_frame(pcm_frame, STATUS_CONTINUE_FRAME)
             except Exception as e:
                 logger.bind(tag=TAG).warning(f"发送音频数据时发生错误: {e}")
@@ -152,16 +153,16 @@ class ASRProvider(ASRProviderBase):
             if conn.asr_audio and len(conn.asr_audio) > 0:
                 first_audio = conn.asr_audio[-1] if conn.asr_audio else b""
                 pcm_frame = (
-                    self.decoder.decode(first_audio, 960) if first_audio else b""
+                    self.decoder.decode(first_audio, max_decode_samples()) if first_audio else b""
                 )
                 await self._send_audio_frame(pcm_frame, STATUS_FIRST_FRAME)
                 self.server_ready = True
                 logger.bind(tag=TAG).info("已发送首帧，开始识别")
 
                 # 发送缓存的音频数据
-                for cached_audio in conn.asr_audio[-10:]:
+                for cached_audio in conn.asr_audio[-conn.asr_audio.pre_roll :]:
                     try:
-                        pcm_frame = self.decoder.decode(cached_audio, 960)
+                        pcm_frame = self.decoder.decode(cached_audio, max_decode_samples())
                         await self._send_audio_frame(pcm_frame, STATUS_CONTINUE_FRAME)
                     except Exception as e:
                         logger.bind(tag=TAG).info(f"发送缓存音频数据时发生错误: {e}")
@@ -268,9 +269,11 @@ class ASRProvider(ASRProviderBase):
                 if hasattr(conn, "asr_audio_for_voiceprint"):
                     conn.asr_audio_for_voiceprint = []
                 if hasattr(conn, "asr_audio"):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
 
-    async def handle_voice_stop(self, conn, asr_audio_task: List[bytes]):
+    async def handle_voice_stop(
+        self, conn, asr_audio_task: List[bytes], pcm_data: Optional[bytes] = None
+    ):
         """处理语音停止，发送最后一帧并处理识别结果"""
         try:
             # 先发送最后一帧表示音频结束
@@ -283,7 +286,7 @@ class ASRProvider(ASRProviderBase):
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"发送停止请求失败: {e}")
 
-            await super().handle_voice_stop(conn, asr_audio_task)
+            await super().handle_voice_stop(conn, asr_audio_task, pcm_data)
         except Exception as e:
             logger.bind(tag=TAG).error(f"处理语音停止失败: {e}")
             import traceback
@@ -369,4 +372,4 @@ class ASRProvider(ASRProviderBase):
                 if hasattr(conn, "asr_audio_for_voiceprint"):
                     conn.asr_audio_for_voiceprint = []
                 if hasattr(conn, "asr_audio"):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
@@ -181,12 +181,12 @@ class TTSProvider(TTSProviderBase):
 
         # print(self.api_url, json.dumps(request_json, ensure_ascii=False))
         try:
-            resp = requests.post(
+            resp = self.http_session.post(
                 self.api_url, json.dumps(request_json), headers=self.header
             )
             if resp.status_code == 401:  # Token过期特殊处理
                 self._refresh_token()
-                resp = requests.post(
+                resp = self.http_session.post(
                     self.api_url, json.dumps(request_json), headers=self.header
                 )
             # 检查返回请求数据的mime类型是否是audio/***，是则保存到指定路径下；返回的是binary格式的
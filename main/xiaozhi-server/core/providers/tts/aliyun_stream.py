@@ -5,10 +5,11 @@ import hmac
 import hashlib
 import base64
 import time
-import queue
 import asyncio
+import threading
 import traceback
 from asyncio import Task
+from functools import partial
 import websockets
 import os
 from datetime import datetime
@@ -17,6 +18,7 @@ from core.providers.tts.base import TTSProviderBase
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 from core.utils.tts import MarkdownCleaner
 from core.utils import opus_encoder_utils, textUtils
+from core.utils.ws_pool import get_ws_pool
 from config.logger import setup_logging
 
 TAG = __name__
@@ -85,6 +87,51 @@ class AccessToken:
         return None, None
 
 
+# 同一AccessKey的Token由所有连接共享，不必每个设备连接都请求一次：{(id, secret): (token, 过期时间)}
+_shared_tokens = {}
+_shared_tokens_lock = threading.Lock()
+
+
+def _get_token(access_key_id, access_key_secret):
+    """返回未过期的共享Token，过期前60秒重新获取"""
+    key = (access_key_id, access_key_secret)
+    with _shared_tokens_lock:
+        cached = _shared_tokens.get(key)
+        if cached and time.time() < cached[1]:
+            return cached
+
+        token, expire_time_str = AccessToken.create_token(
+            access_key_id, access_key_secret
+        )
+        if not expire_time_str:
+            raise ValueError("无法获取有效的Token过期时间")
+
+        expire_str = str(expire_time_str).strip()
+
+        try:
+            if expire_str.isdigit():
+                expire_time = datetime.fromtimestamp(int(expire_str))
+            else:
+                expire_time = datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
+        except Exception as e:
+            raise ValueError(f"无效的过期时间格式: {expire_str}") from e
+        if token:
+            _shared_tokens[key] = (token, expire_time.timestamp() - 60)
+        return token, expire_time.timestamp() - 60
+
+
+async def _connect(ws_url, access_key_id, access_key_secret, token):
+    if access_key_id and access_key_secret:
+        token, _ = await asyncio.to_thread(_get_token, access_key_id, access_key_secret)
+    return await websockets.connect(
+        ws_url,
+        additional_headers={"X-NLS-Token": token},
+        ping_interval=30,
+        ping_timeout=10,
+        close_timeout=10,
+    )
+
+
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
@@ -146,25 +193,37 @@ class TTSProvider(TTSProviderBase):
             self.token = config.get("token")
             self.expire_time = None
 
+        # 所有设备共享已鉴权的连接，服务端约10秒无任务会断开空闲连接
+        # 使用AccessKey时建连前自动获取共享Token，否则使用配置的固定Token
+        static_token = None if self.expire_time else self.token
+        self.ws_pool = get_ws_pool(
+            (__name__, self.ws_url, self.access_key_id, self.access_key_secret, static_token),
+            "aliyun_stream",
+            partial(
+                _connect,
+                self.ws_url,
+                self.access_key_id,
+                self.access_key_secret,
+                static_token,
+            ),
+            max_idle_seconds=9,
+        )
+
+    async def open_audio_channels(self, conn):
+        await super().open_audio_channels(conn)
+        self.ws_pool.prewarm()
+
+    def _release_ws(self, reusable: bool):
+        """把连接还给连接池，不可复用的连接由连接池关闭"""
+        ws, self.ws = self.ws, None
+        self.ws_pool.release(ws, reusable=reusable)
+
     def _refresh_token(self):
         """刷新Token并记录过期时间"""
         if self.access_key_id and self.access_key_secret:
-            self.token, expire_time_str = AccessToken.create_token(
+            self.token, self.expire_time = _get_token(
                 self.access_key_id, self.access_key_secret
             )
-            if not expire_time_str:
-                raise ValueError("无法获取有效的Token过期时间")
-
-            expire_str = str(expire_time_str).strip()
-
-            try:
-                if expire_str.isdigit():
-                    expire_time = datetime.fromtimestamp(int(expire_str))
-                else:
-                    expire_time = datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
-                self.expire_time = expire_time.timestamp() - 60
-            except Exception as e:
-                raise ValueError(f"无效的过期时间格式: {expire_str}") from e
         else:
             self.expire_time = None
 
@@ -178,28 +237,16 @@ class TTSProvider(TTSProviderBase):
         return time.time() > self.expire_time
 
     async def _ensure_connection(self):
-        """确保WebSocket连接可用"""
+        """从连接池租用WebSocket连接，每次会话使用新的task_id"""
         try:
-            if self._is_token_expired():
-                logger.bind(tag=TAG).warning("Token已过期，正在自动刷新...")
-                self._refresh_token()
-            current_time = time.time()
-            if self.ws and current_time - self.last_active_time < 10:
-                # 10秒内才可以复用链接进行连续对话
-                self.task_id = uuid.uuid4().hex
-                logger.bind(tag=TAG).info(f"使用已有链接..., task_id: {self.task_id}")
-                return self.ws
-            logger.bind(tag=TAG).debug("开始建立新连接...")
-
-            self.ws = await websockets.connect(
-                self.ws_url,
-                additional_headers={"X-NLS-Token": self.token},
-                ping_interval=30,
-                ping_timeout=10,
-                close_timeout=10,
-            )
+            if self.ws:
+                # 上个会话未正常结束，连接不再复用
+                self._release_ws(reusable=False)
+
+            logger.bind(tag=TAG).debug("从连接池租用连接...")
+            self.ws = await self.ws_pool.lease()
             self.task_id = uuid.uuid4().hex
-            logger.bind(tag=TAG).debug(f"WebSocket连接建立成功, task_id: {self.task_id}")
+            logger.bind(tag=TAG).debug(f"WebSocket连接租用成功, task_id: {self.task_id}")
             self.last_active_time = time.time()
             return self.ws
         except Exception as e:
@@ -208,79 +255,69 @@ class TTSProvider(TTSProviderBase):
             self.last_active_time = None
             raise
 
-    def tts_text_priority_thread(self):
-        """流式文本处理线程"""
-        while not self.conn.stop_event.is_set():
-            try:
-                message = self.tts_text_queue.get(timeout=1)
-                logger.bind(tag=TAG).debug(
-                    f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
-                )
+    def handle_tts_text_message(self, message):
+        """流式文本处理"""
+        logger.bind(tag=TAG).debug(
+            f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
+        )
 
-                if message.sentence_type == SentenceType.FIRST:
-                    self.conn.client_abort = False
+        if message.sentence_type == SentenceType.FIRST:
+            self.conn.client_abort = False
 
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                    continue
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
+            return
 
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    try:
-                        logger.bind(tag=TAG).debug("开始启动TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.start_session(self.task_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
-                        self.before_stop_play_files.clear()
-                        logger.bind(tag=TAG).debug("TTS会话启动成功")
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
+            try:
+                logger.bind(tag=TAG).debug("开始启动TTS会话...")
+                future = asyncio.run_coroutine_threadsafe(
+                    self.start_session(self.task_id),
+                    loop=self.conn.loop,
+                )
+                future.result()
+                self.before_stop_play_files.clear()
+                logger.bind(tag=TAG).debug("TTS会话启动成功")
 
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"启动TTS会话失败: {str(e)}")
-                        continue
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"启动TTS会话失败: {str(e)}")
+                return
 
-                elif ContentType.TEXT == message.content_type:
-                    if message.content_detail:
-                        try:
-                            logger.bind(tag=TAG).debug(
-                                f"开始发送TTS文本: {message.content_detail}"
-                            )
-                            future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
-                                loop=self.conn.loop,
-                            )
-                            future.result()
-                            logger.bind(tag=TAG).debug("TTS文本发送成功")
-                        except Exception as e:
-                            logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-                            continue
-
-                elif ContentType.FILE == message.content_type:
-                    logger.bind(tag=TAG).info(
-                        f"添加音频文件到待播放列表: {message.content_file}"
+        elif ContentType.TEXT == message.content_type:
+            if message.content_detail:
+                try:
+                    logger.bind(tag=TAG).debug(
+                        f"开始发送TTS文本: {message.content_detail}"
                     )
-                    if message.content_file and os.path.exists(message.content_file):
-                        # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
-                if message.sentence_type == SentenceType.LAST:
-                    try:
-                        logger.bind(tag=TAG).debug("开始结束TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.finish_session(self.task_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
-                        continue
+                    future = asyncio.run_coroutine_threadsafe(
+                        self.text_to_speak(message.content_detail, None),
+                        loop=self.conn.loop,
+                    )
+                    future.result()
+                    logger.bind(tag=TAG).debug("TTS文本发送成功")
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
+                    return
 
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.bind(tag=TAG).error(
-                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+        elif ContentType.FILE == message.content_type:
+            logger.bind(tag=TAG).info(
+                f"添加音频文件到待播放列表: {message.content_file}"
+            )
+            if message.content_file and os.path.exists(message.content_file):
+                # 先处理文件音频数据
+                self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+        if message.sentence_type == SentenceType.LAST:
+            try:
+                logger.bind(tag=TAG).debug("开始结束TTS会话...")
+                future = asyncio.run_coroutine_threadsafe(
+                    self.finish_session(self.task_id),
+                    loop=self.conn.loop,
                 )
+                future.result()
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
+                return
 
     async def text_to_speak(self, text, _):
         try:
@@ -305,12 +342,7 @@ class TTSProvider(TTSProviderBase):
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            self._release_ws(reusable=False)
             raise
 
     async def start_session(self, task_id):
@@ -403,13 +435,8 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).warning(f"关闭时取消监听任务错误: {e}")
             self._monitor_task = None
 
-        if self.ws:
-            try:
-                await self.ws.close()
-            except:
-                pass
-            self.ws = None
-            self.last_active_time = None
+        self._release_ws(reusable=False)
+        self.last_active_time = None
 
     async def _start_monitor_tts_response(self):
         """监听TTS响应"""
@@ -461,13 +488,8 @@ class TTSProvider(TTSProviderBase):
                         f"处理TTS响应时出错: {e}\n{traceback.format_exc()}"
                     )
                     break
-            # 仅在连接异常时才关闭
-            if not session_finished and self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            # 会话正常结束时归还连接供下一个会话复用，连接异常或被打断时关闭
+            self._release_ws(reusable=session_finished)
         # 监听任务退出时清理引用
         finally:
             self._monitor_task = None
@@ -1,22 +1,40 @@
 import os
-import re
 import time
 import uuid
-import queue
 import asyncio
 import threading
 import traceback
+from functools import partial
 from core.utils import p3
 from datetime import datetime
-from core.utils import textUtils
 from typing import Callable, Any
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
+from core.utils.async_pipeline import LoopQueue
+from core.utils.tts_cache import get_tts_cache, tts_profile
+from core.utils.tts_io import get_http_session, get_tts_timeout, run_tts_coroutine
+from core.utils.tts_hedge import FirstAudioRace
+from core.utils.tts_pipeline import OrderedSynthesisPipeline
+from core.utils.sentence_segmenter import SentenceSegmenter
+from core.utils.segment_planner import SegmentPlanner
+from core.utils.silence_trim import SilenceTrimmer
 from core.utils.output_counter import add_device_output
 from core.handle.reportHandle import enqueue_tts_report
 from core.handle.sendAudioHandle import sendAudioMessage
-from core.utils.util import audio_bytes_to_data_stream, audio_to_data_stream
+from core.utils.audio_frame import DEFAULT_FRAME_DURATION
+from core.utils.opus_encoder_utils import OpusEncoderUtils
+from core.utils.audio_decode import (
+    TARGET_SAMPLE_RATE,
+    StreamingAudioDecoder,
+    get_stream_decode_stats,
+    supports_streaming,
+)
+from core.utils.util import (
+    audio_bytes_to_data_stream,
+    audio_to_data_stream,
+    opus_frames_to_data_stream,
+)
 from core.providers.tts.dto.dto import (
     TTSMessageDTO,
     SentenceType,
@@ -29,45 +47,64 @@ logger = setup_logging()
 
 
 class TTSProviderBase(ABC):
+    # 重写了 text_to_speak_stream、能按数据块返回音频的提供者设为 True
+    supports_audio_stream = False
+
     def __init__(self, config, delete_audio_file):
         self.interface_type = InterfaceType.NON_STREAM
         self.conn = None
         self.delete_audio_file = delete_audio_file
         self.audio_file_type = "wav"
         self.output_file = config.get("output_dir", "tmp/")
-        self.tts_text_queue = queue.Queue()
-        self.tts_audio_queue = queue.Queue()
+        # 音色、语速等配置的指纹，用于TTS音频缓存的键
+        self.cache_profile = tts_profile(type(self).__module__, config)
+        # 同类TTS提供者在所有连接间共享的长连接会话
+        self.http_session = get_http_session(type(self).__module__)
+        # 同时合成的分段数，有并发限制的TTS服务保持为1
+        self.tts_lookahead = int(config.get("tts_lookahead") or 1)
+        self.synthesis_pipeline = None
+        self.tts_text_queue = LoopQueue()
+        self.tts_audio_queue = LoopQueue()
         self.tts_audio_first_sentence = True
         self.before_stop_play_files = []
 
-        self.tts_text_buff = []
-        self.punctuations = (
-            "。",
-            "？",
-            "?",
-            "！",
-            "!",
-            "；",
-            ";",
-            "：",
+        # 流式文本增量分句
+        self.segmenter = SentenceSegmenter(
+            first_min_chars=int(config.get("first_segment_min_chars") or 0),
+            max_chars=int(config.get("max_segment_chars") or 120),
         )
-        self.first_sentence_punctuations = (
-            "，",
-            "~",
-            "、",
-            ",",
-            "。",
-            "？",
-            "?",
-            "！",
-            "!",
-            "；",
-            ";",
-            "：",
+        # 非流式TTS按播放进度合并短分段，减少请求次数
+        self.segment_planner = SegmentPlanner(
+            max_chars=int(config.get("merge_segment_chars") or 0),
+            margin_ms=float(config.get("merge_margin_ms") or 300),
         )
-        self.tts_stop_request = False
-        self.processed_chars = 0
-        self.is_first_sentence = True
+        # 编码前裁掉TTS服务在每句话前后加的静音，未配置时不裁剪
+        self.silence_trimmer = SilenceTrimmer.from_config(config)
+        # 首句竞速的备用TTS，本轮胜出的一方合成后续分段以保持音色一致
+        self.hedge_provider = None
+        self.hedge_delay_ms = 0
+        self._hedge_next = False
+        self._turn_provider = self
+        self._turn_decided = threading.Event()
+        self._turn_decided.set()
+
+    @property
+    def audio_frame_duration(self) -> int:
+        """与设备协商的音频帧时长（毫秒）"""
+        if self.conn is None:
+            return DEFAULT_FRAME_DURATION
+        return getattr(self.conn, "audio_frame_duration", DEFAULT_FRAME_DURATION)
+
+    def set_audio_frame_duration(self, frame_duration: int):
+        """流式TTS的编码器按新的帧时长分帧，在设备hello协商后或绑定连接时调用"""
+        opus_encoder = getattr(self, "opus_encoder", None)
+        if opus_encoder is not None:
+            opus_encoder.set_frame_size_ms(frame_duration)
+
+    def set_hedge_provider(self, provider, delay_ms: float):
+        """每轮首句在 delay_ms 内没有收到音频时，同时请求备用TTS provider"""
+        self.hedge_provider = provider
+        self.hedge_delay_ms = delay_ms
 
     def generate_filename(self, extension=".wav"):
         return os.path.join(
@@ -82,21 +119,64 @@ class TTSProviderBase(ABC):
     def handle_audio_file(self, file_audio: bytes, text):
         self.before_stop_play_files.append((file_audio, text))
 
-    def to_tts_stream(self, text, opus_handler: Callable[[bytes], None] = None) -> None:
+    def to_tts_stream(
+        self, text, opus_handler: Callable[[bytes], None] = None, output=None, hedge=False
+    ) -> None:
+        """output 为句子开始消息的写入目标，默认为播放队列；hedge 为真时与备用TTS竞速"""
         text = MarkdownCleaner.clean_markdown(text)
+        output = output if output is not None else self.tts_audio_queue
+        synthesize = self._synthesize_stream
+        if hedge and self.hedge_provider is not None:
+            synthesize = self._synthesize_hedged
+        cache = get_tts_cache()
+        if cache is None or (self.conn is not None and self.conn.audio_format == "pcm"):
+            synthesize(text, opus_handler, output)
+            return None
+
+        cache_key = cache.make_key(
+            self.cache_profile,
+            getattr(self, "voice", None),
+            text,
+            self.audio_frame_duration,
+        )
+        frames = cache.get(cache_key)
+        if frames is not None:
+            # 命中缓存：直接送入播放队列，不再调用TTS服务和转码
+            output.put((SentenceType.FIRST, None, text))
+            for frame in frames:
+                opus_handler(frame)
+            return None
+
+        frames = []
+
+        def collect(frame):
+            frames.append(frame)
+            opus_handler(frame)
+
+        # 重试过的合成可能已输出部分音频，只缓存一次成功的结果；备用TTS的音色不同，不缓存
+        if synthesize(text, collect, output) == 0 and self._turn_provider is self:
+            cache.put(cache_key, frames)
+        return None
+
+    def _synthesize_stream(self, text, opus_handler: Callable[[bytes], None], output):
+        """调用TTS服务合成并转码，返回重试次数，失败返回 None"""
         max_repeat_time = 5
+        if self.delete_audio_file and self._can_stream_decode():
+            return self._synthesize_incremental(text, opus_handler, output)
         if self.delete_audio_file:
             # 需要删除文件的直接转为音频数据
             while max_repeat_time > 0:
                 try:
-                    audio_bytes = asyncio.run(self.text_to_speak(text, None))
+                    audio_bytes = self._run_text_to_speak(text, None)
                     if audio_bytes:
-                        self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                        output.put((SentenceType.FIRST, None, text))
                         audio_bytes_to_data_stream(
                             audio_bytes,
                             file_type=self.audio_file_type,
                             is_opus=True,
                             callback=opus_handler,
+                            frame_duration=self.audio_frame_duration,
+                            trimmer=self.silence_trimmer,
                         )
                         break
                     else:
@@ -114,13 +194,14 @@ class TTSProviderBase(ABC):
                 logger.bind(tag=TAG).error(
                     f"语音生成失败: {text}，请检查网络或服务是否正常"
                 )
-            return None
+                return None
+            return 5 - max_repeat_time
         else:
             tmp_file = self.generate_filename()
             try:
                 while not os.path.exists(tmp_file) and max_repeat_time > 0:
                     try:
-                        asyncio.run(self.text_to_speak(text, tmp_file))
+                        self._run_text_to_speak(text, tmp_file)
                     except Exception as e:
                         logger.bind(tag=TAG).warning(
                             f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -138,12 +219,132 @@ class TTSProviderBase(ABC):
                     logger.bind(tag=TAG).error(
                         f"语音生成失败: {text}，请检查网络或服务是否正常"
                     )
-                    self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                    output.put((SentenceType.FIRST, None, text))
                 self._process_audio_file_stream(tmp_file, callback=opus_handler)
+                return 5 - max_repeat_time if max_repeat_time > 0 else None
             except Exception as e:
                 logger.bind(tag=TAG).error(f"Failed to generate TTS file: {e}")
                 return None
     
+    def _can_stream_decode(self) -> bool:
+        """提供者能按数据块返回音频，且该格式可以在进程内增量解码"""
+        return self.supports_audio_stream and supports_streaming(self.audio_file_type)
+
+    def _synthesize_incremental(self, text, opus_handler, output):
+        """边下载边解码编码，返回重试次数，失败返回 None"""
+        max_repeat_time = 5
+        while max_repeat_time > 0:
+            progress = {"frames": 0}
+            try:
+                run_tts_coroutine(
+                    self._speak_incremental(text, opus_handler, output, progress),
+                    timeout=get_tts_timeout(),
+                )
+                if progress["frames"]:
+                    logger.bind(tag=TAG).info(
+                        f"语音生成成功: {text}，重试{5 - max_repeat_time}次"
+                    )
+                    return 5 - max_repeat_time
+                max_repeat_time -= 1
+            except Exception as e:
+                if progress["frames"]:
+                    # 已送出部分音频，重试会重复播放开头，放弃这句剩余的部分
+                    logger.bind(tag=TAG).error(f"语音流中断: {text}，错误: {e}")
+                    return None
+                logger.bind(tag=TAG).warning(
+                    f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
+                )
+                max_repeat_time -= 1
+        logger.bind(tag=TAG).error(f"语音生成失败: {text}，请检查网络或服务是否正常")
+        return None
+
+    async def _speak_incremental(self, text, opus_handler, output, progress):
+        """每收到一个数据块就解码，凑满一帧PCM立即编码为Opus送出"""
+        stats = get_stream_decode_stats()
+        first_byte_time = None
+
+        def emit(opus):
+            if not progress["frames"]:
+                output.put((SentenceType.FIRST, None, text))
+                stats.first_frame_ms_hist.observe(
+                    (time.monotonic() - first_byte_time) * 1000
+                )
+            progress["frames"] += 1
+            opus_handler(opus)
+
+        transcoder = _IncrementalTranscoder(
+            self.audio_file_type, self.audio_frame_duration, emit, self.silence_trimmer
+        )
+        try:
+            async for chunk in self.text_to_speak_stream(text):
+                if first_byte_time is None:
+                    first_byte_time = time.monotonic()
+                transcoder.push(chunk)
+            if first_byte_time is not None:
+                transcoder.finish()
+        finally:
+            stats.streams += 1
+            transcoder.close()
+
+    async def _fetch_audio(self, text, emit):
+        """请求一句话的音频，能流式返回的逐块交给 emit，否则整句交给 emit"""
+        if self._can_stream_decode():
+            async for chunk in self.text_to_speak_stream(text):
+                emit(chunk)
+        else:
+            emit(await self.text_to_speak(text, None))
+
+    def _synthesize_hedged(self, text, opus_handler, output):
+        """
+        首句与备用TTS竞速，先返回音频的一方胜出并合成本轮后续分段
+        返回值同 _synthesize_stream，竞速在出声前失败时改为主TTS重试
+        """
+        contenders = (self, self.hedge_provider)
+        race = FirstAudioRace(
+            [partial(provider._fetch_audio, text) for provider in contenders],
+            delay=self.hedge_delay_ms / 1000,
+            timeout=get_tts_timeout(),
+        )
+        frames = 0
+
+        def emit(opus):
+            nonlocal frames
+            if not frames:
+                output.put((SentenceType.FIRST, None, text))
+            frames += 1
+            opus_handler(opus)
+
+        transcoder = None
+        try:
+            for chunk in race.chunks():
+                if transcoder is None:
+                    winner = contenders[race.winner]
+                    self._turn_provider = winner
+                    self._turn_decided.set()
+                    transcoder = _IncrementalTranscoder(
+                        winner.audio_file_type,
+                        self.audio_frame_duration,
+                        emit,
+                        winner.silence_trimmer,
+                    )
+                transcoder.push(chunk)
+            transcoder.finish()
+        except Exception as e:
+            if frames:
+                logger.bind(tag=TAG).error(f"语音流中断: {text}，错误: {e}")
+                return None
+            logger.bind(tag=TAG).warning(f"首句TTS竞速失败: {text}，错误: {e}")
+            self._turn_provider = self
+            self._turn_decided.set()
+            return self._synthesize_stream(text, opus_handler, output)
+        finally:
+            if transcoder is not None:
+                transcoder.close()
+        logger.bind(tag=TAG).info(
+            f"语音生成成功: {text}，{'备用' if race.winner else '主'}TTS胜出"
+        )
+        return 0
+
     def to_tts(self, text):
         text = MarkdownCleaner.clean_markdown(text)
         max_repeat_time = 5
@@ -151,14 +352,16 @@ class TTSProviderBase(ABC):
             # 需要删除文件的直接转为音频数据
             while max_repeat_time > 0:
                 try:
-                    audio_bytes = asyncio.run(self.text_to_speak(text, None))
+                    audio_bytes = self._run_text_to_speak(text, None)
                     if audio_bytes:
                         audio_datas = []
                         audio_bytes_to_data_stream(
                             audio_bytes,
                             file_type=self.audio_file_type,
                             is_opus=True,
-                            callback=lambda data: audio_datas.append(data)
+                            callback=lambda data: audio_datas.append(data),
+                            frame_duration=self.audio_frame_duration,
+                            trimmer=self.silence_trimmer,
                         )
                         return audio_datas
                     else:
@@ -182,7 +385,7 @@ class TTSProviderBase(ABC):
             try:
                 while not os.path.exists(tmp_file) and max_repeat_time > 0:
                     try:
-                        asyncio.run(self.text_to_speak(text, tmp_file))
+                        self._run_text_to_speak(text, tmp_file)
                     except Exception as e:
                         logger.bind(tag=TAG).warning(
                             f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -206,10 +409,26 @@ class TTSProviderBase(ABC):
                 logger.bind(tag=TAG).error(f"Failed to generate TTS file: {e}")
                 return None
 
+    def _run_text_to_speak(self, text, output_file):
+        """在当前线程的常驻事件循环中执行 text_to_speak，不再每句话新建事件循环"""
+        return run_tts_coroutine(
+            self.text_to_speak(text, output_file), timeout=get_tts_timeout()
+        )
+
     @abstractmethod
     async def text_to_speak(self, text, output_file):
         pass
 
+    async def text_to_speak_stream(self, text):
+        """
+        按到达顺序逐块产出TTS服务返回的音频数据（异步生成器），默认整句作为一块产出
+        重写此方法并设置 supports_audio_stream 的提供者在返回mp3等可增量解码的格式时，
+        边下载边解码编码，不必等整句下载完
+        """
+        audio = await self.text_to_speak(text, None)
+        if audio:
+            yield audio
+
     def upload_voice(self, audio_file_path: str, custom_name: str, reference_text: str) -> dict:
         """上传音色到TTS服务并获取音色ID
         
@@ -233,16 +452,28 @@ class TTSProviderBase(ABC):
         }
 
     def audio_to_pcm_data_stream(
-        self, audio_file_path, callback: Callable[[Any], Any] = None
+        self, audio_file_path, callback: Callable[[Any], Any] = None, trimmer=None
     ):
         """音频文件转换为PCM编码"""
-        return audio_to_data_stream(audio_file_path, is_opus=False, callback=callback)
+        return audio_to_data_stream(
+            audio_file_path,
+            is_opus=False,
+            callback=callback,
+            frame_duration=self.audio_frame_duration,
+            trimmer=trimmer,
+        )
 
     def audio_to_opus_data_stream(
-        self, audio_file_path, callback: Callable[[Any], Any] = None
+        self, audio_file_path, callback: Callable[[Any], Any] = None, trimmer=None
     ):
         """音频文件转换为Opus编码"""
-        return audio_to_data_stream(audio_file_path, is_opus=True, callback=callback)
+        return audio_to_data_stream(
+            audio_file_path,
+            is_opus=True,
+            callback=callback,
+            frame_duration=self.audio_frame_duration,
+            trimmer=trimmer,
+        )
 
     def tts_one_sentence(
         self,
@@ -259,92 +490,183 @@ class TTSProviderBase(ABC):
             else:
                 sentence_id = str(uuid.uuid4().hex)
                 conn.sentence_id = sentence_id
-        # 对于单句的文本，进行分段处理
-        segments = re.split(r"([。！？!?；;\n])", content_detail)
-        for seg in segments:
-            self.tts_text_queue.put(
-                TTSMessageDTO(
-                    sentence_id=sentence_id,
-                    sentence_type=SentenceType.MIDDLE,
-                    content_type=content_type,
-                    content_detail=seg,
-                    content_file=content_file,
-                )
+        # 整段文本交给分句器切分，再由分段规划器决定合并
+        self.tts_text_queue.put(
+            TTSMessageDTO(
+                sentence_id=sentence_id,
+                sentence_type=SentenceType.MIDDLE,
+                content_type=content_type,
+                content_detail=content_detail,
+                content_file=content_file,
             )
+        )
 
     async def open_audio_channels(self, conn):
         self.conn = conn
-        # tts 消化线程
-        self.tts_priority_thread = threading.Thread(
-            target=self.tts_text_priority_thread, daemon=True
-        )
-        self.tts_priority_thread.start()
+        self.set_audio_frame_duration(self.audio_frame_duration)
+        opus_encoder = getattr(self, "opus_encoder", None)
+        if opus_encoder is not None and self.silence_trimmer is not None:
+            # 流式TTS以每句话的 end_of_stream 为界裁剪
+            opus_encoder.set_silence_trimmer(self.silence_trimmer)
+        if self.hedge_provider is not None:
+            # 备用TTS只借用连接的协商参数，音频仍输出到本提供者的播放队列
+            self.hedge_provider.conn = conn
+        self.tts_text_queue.bind(conn.loop)
+        self.tts_audio_queue.bind(conn.loop)
+        if self.interface_type == InterfaceType.NON_STREAM and self.tts_lookahead > 1:
+            self.synthesis_pipeline = OrderedSynthesisPipeline(
+                self.tts_audio_queue, conn.tts_executor, self.tts_lookahead
+            )
+        # tts 文本消费任务
+        self.tts_priority_task = asyncio.create_task(self._tts_text_priority_task())
 
-        # 音频播放 消化线程
-        self.audio_play_priority_thread = threading.Thread(
-            target=self._audio_play_priority_thread, daemon=True
+        # 音频播放 消费任务
+        self.audio_play_priority_task = asyncio.create_task(
+            self._audio_play_priority_task()
         )
-        self.audio_play_priority_thread.start()
 
-    # 这里默认是非流式的处理方式
-    # 流式处理方式请在子类中重写
-    def tts_text_priority_thread(self):
+    async def _tts_text_priority_task(self):
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
-                if message.sentence_type == SentenceType.FIRST:
-                    self.conn.client_abort = False
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                    continue
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.is_first_sentence = True
-                    self.tts_audio_first_sentence = True
-                elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
-                elif ContentType.FILE == message.content_type:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
-                    tts_file = message.content_file
-                    if tts_file and os.path.exists(tts_file):
-                        self._process_audio_file_stream(
-                            tts_file, callback=self.handle_opus
+                delay = self.segment_planner.poll_delay()
+                if delay is None:
+                    message = await self.tts_text_queue.get()
+                else:
+                    # 有暂存待合并的文本时，LLM迟迟没有新输出也要在播放领先量不足前合成
+                    try:
+                        message = await asyncio.wait_for(self.tts_text_queue.get(), delay)
+                    except asyncio.TimeoutError:
+                        await self.conn.loop.run_in_executor(
+                            self.conn.tts_executor, self._poll_planned_segments
                         )
-                if message.sentence_type == SentenceType.LAST:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
-                    self.tts_audio_queue.put(
-                        (message.sentence_type, [], message.content_detail)
-                    )
-
-            except queue.Empty:
-                continue
+                        continue
+                # 合成过程包含阻塞调用，放到TTS线程池中逐条执行，保证文本顺序
+                await self.conn.loop.run_in_executor(
+                    self.conn.tts_executor, self.handle_tts_text_message, message
+                )
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
                 )
                 continue
 
-    def _audio_play_priority_thread(self):
+    # 这里默认是非流式的处理方式
+    # 流式处理方式请在子类中重写
+    def handle_tts_text_message(self, message):
+        if message.sentence_type == SentenceType.FIRST:
+            # 上一轮未输出的分段不能混入新一轮
+            self.cancel_pending_synthesis()
+            self.conn.client_abort = False
+        if self.conn.client_abort:
+            self.cancel_pending_synthesis()
+            logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
+            return
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
+            self.segmenter.reset()
+            self.segment_planner.reset()
+            self.tts_audio_first_sentence = True
+            self._turn_provider = self
+            self._hedge_next = self.hedge_provider is not None
+            # 每轮一个事件，上一轮残留的合成不会影响本轮
+            self._turn_decided = threading.Event()
+            if not self._hedge_next:
+                self._turn_decided.set()
+        elif ContentType.TEXT == message.content_type:
+            for segment_text in self.segmenter.push(message.content_detail):
+                self._synthesize_planned(self.segment_planner.push(segment_text))
+            # 没有新分段时也检查播放进度，领先量不足就合成暂存的文本
+            self._synthesize_planned(self.segment_planner.poll())
+        elif ContentType.FILE == message.content_type:
+            self._process_remaining_text_ordered()
+            tts_file = message.content_file
+            if tts_file and os.path.exists(tts_file):
+                self._run_ordered(self._play_file_segment, tts_file)
+        if message.sentence_type == SentenceType.LAST:
+            self._process_remaining_text_ordered()
+            self.segment_planner.finish()
+            item = (message.sentence_type, [], message.content_detail)
+            if self.synthesis_pipeline is None:
+                self.tts_audio_queue.put(item)
+            else:
+                self.synthesis_pipeline.put_ordered(item)
+
+    def _poll_planned_segments(self):
+        """等待LLM输出期间检查播放进度，领先量不足时合成暂存的文本"""
+        if self.conn.client_abort:
+            self.cancel_pending_synthesis()
+            return
+        self._synthesize_planned(self.segment_planner.poll())
+
+    def _run_ordered(self, fn, *args):
+        """
+        执行 fn(output, opus_handler, *args)，输出按提交顺序进入播放队列
+        开启流水线时提交到线程池与后续分段并发执行，否则直接在当前线程执行
+        """
+        if self.synthesis_pipeline is None:
+            fn(self.tts_audio_queue, self.handle_opus, *args)
+            return
+
+        def run(output, *args):
+            fn(
+                output,
+                lambda frame: output.put((SentenceType.MIDDLE, frame, None)),
+                *args,
+            )
+
+        self.synthesis_pipeline.submit(run, *args)
+
+    def _synthesize_planned(self, texts):
+        for text in texts:
+            hedge, self._hedge_next = self._hedge_next, False
+            self._run_ordered(
+                self._synthesize_segment, text, hedge, self._turn_decided
+            )
+
+    def _synthesize_segment(self, output, opus_handler, text, hedge, turn_decided):
+        with self.segment_planner.track(
+            opus_handler, self.audio_frame_duration
+        ) as handler:
+            if hedge:
+                try:
+                    self.to_tts_stream(
+                        text, opus_handler=handler, output=output, hedge=True
+                    )
+                finally:
+                    turn_decided.set()
+                return
+            # 流水线中的后续分段等首句竞速决出胜者，再用同一音色合成
+            turn_decided.wait(get_tts_timeout())
+            self._turn_provider.to_tts_stream(
+                text, opus_handler=handler, output=output
+            )
+
+    def _play_file_segment(self, output, opus_handler, tts_file):
+        self._process_audio_file_stream(tts_file, callback=opus_handler)
+
+    def _process_remaining_text_ordered(self):
+        segment_text = self.segmenter.flush()
+        if segment_text:
+            self._synthesize_planned(self.segment_planner.push(segment_text))
+        self._synthesize_planned(self.segment_planner.flush())
+
+    def cancel_pending_synthesis(self):
+        """打断时取消流水线中尚未输出的分段，丢弃暂存待合并的文本"""
+        self.segment_planner.reset()
+        self._turn_decided.set()
+        if self.synthesis_pipeline is not None:
+            self.synthesis_pipeline.cancel()
+
+    async def _audio_play_priority_task(self):
         # 需要上报的文本和音频列表
         enqueue_text = None
         enqueue_audio = None
         while not self.conn.stop_event.is_set():
             text = None
             try:
-                try:
-                    sentence_type, audio_datas, text = self.tts_audio_queue.get(
-                        timeout=0.1
-                    )
-                except queue.Empty:
-                    if self.conn.stop_event.is_set():
-                        break
-                    continue
+                sentence_type, audio_datas, text = await self.tts_audio_queue.get()
 
                 if self.conn.client_abort:
                     logger.bind(tag=TAG).debug("收到打断信号，跳过当前音频数据")
@@ -364,18 +686,16 @@ class TTSProviderBase(ABC):
                     enqueue_audio.append(audio_datas)
 
                 # 发送音频
-                future = asyncio.run_coroutine_threadsafe(
-                    sendAudioMessage(self.conn, sentence_type, audio_datas, text),
-                    self.conn.loop,
-                )
-                future.result()
+                await sendAudioMessage(self.conn, sentence_type, audio_datas, text)
 
                 # 记录输出和报告
                 if self.conn.max_output_size > 0 and text:
                     add_device_output(self.conn.headers.get("device-id"), len(text))
 
+            except asyncio.CancelledError:
+                break
             except Exception as e:
-                logger.bind(tag=TAG).error(f"audio_play_priority_thread: {text} {e}")
+                logger.bind(tag=TAG).error(f"audio_play_priority_task: {text} {e}")
 
     async def start_session(self, session_id):
         pass
@@ -387,45 +707,8 @@ class TTSProviderBase(ABC):
         """资源清理方法"""
         if hasattr(self, "ws") and self.ws:
             await self.ws.close()
-
-    def _get_segment_text(self):
-        # 合并当前全部文本并处理未分割部分
-        full_text = "".join(self.tts_text_buff)
-        current_text = full_text[self.processed_chars :]  # 从未处理的位置开始
-        last_punct_pos = -1
-
-        # 根据是否是第一句话选择不同的标点符号集合
-        punctuations_to_use = (
-            self.first_sentence_punctuations
-            if self.is_first_sentence
-            else self.punctuations
-        )
-
-        for punct in punctuations_to_use:
-            pos = current_text.rfind(punct)
-            if (pos != -1 and last_punct_pos == -1) or (
-                pos != -1 and pos < last_punct_pos
-            ):
-                last_punct_pos = pos
-
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(
-                segment_text_raw
-            )
-            self.processed_chars += len(segment_text_raw)  # 更新已处理字符位置
-
-            # 如果是第一句话，在找到第一个逗号后，将标志设置为False
-            if self.is_first_sentence:
-                self.is_first_sentence = False
-
-            return segment_text
-        elif self.tts_stop_request and current_text:
-            segment_text = current_text
-            self.is_first_sentence = True  # 重置标志
-            return segment_text
-        else:
-            return None
+        if self.hedge_provider is not None:
+            await self.hedge_provider.close()
 
     def _process_audio_file_stream(
         self, tts_file, callback: Callable[[Any], Any]
@@ -436,12 +719,15 @@ class TTSProviderBase(ABC):
             tts_file: 音频文件路径
             callback: 文件处理函数
         """
+        # 只裁剪本提供者合成的临时文件，提示音等文件原样播放
+        trimmer = self.silence_trimmer if tts_file.startswith(self.output_file) else None
         if tts_file.endswith(".p3"):
-            p3.decode_opus_from_file_stream(tts_file, callback=callback)
+            opus_datas, _ = p3.decode_opus_from_file(tts_file)
+            opus_frames_to_data_stream(opus_datas, callback, self.audio_frame_duration)
         elif self.conn.audio_format == "pcm":
-            self.audio_to_pcm_data_stream(tts_file, callback=callback)
+            self.audio_to_pcm_data_stream(tts_file, callback=callback, trimmer=trimmer)
         else:
-            self.audio_to_opus_data_stream(tts_file, callback=callback)
+            self.audio_to_opus_data_stream(tts_file, callback=callback, trimmer=trimmer)
 
         if (
             self.delete_audio_file
@@ -465,12 +751,53 @@ class TTSProviderBase(ABC):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_stream(segment_text, opus_handler=opus_handler)
-                self.processed_chars += len(full_text)
-                return True
+        segment_text = self.segmenter.flush()
+        if segment_text:
+            self.to_tts_stream(segment_text, opus_handler=opus_handler)
+            return True
         return False
+
+
+class _IncrementalTranscoder:
+    """
+    把一句话的音频数据块转码为Opus帧交给 emit
+    可增量解码的格式每块到达就解码编码，其余格式收齐后整句转码
+    """
+
+    def __init__(self, file_type: str, frame_duration: int, emit, trimmer=None):
+        self.file_type = file_type
+        self.frame_duration = frame_duration
+        self.emit = emit
+        self.trimmer = trimmer
+        self.decoder = None
+        self.encoder = None
+        self.buffer = b""
+        if supports_streaming(file_type):
+            self.decoder = StreamingAudioDecoder(file_type)
+            self.encoder = OpusEncoderUtils(TARGET_SAMPLE_RATE, 1, frame_duration)
+            self.encoder.set_silence_trimmer(trimmer)
+
+    def push(self, chunk: bytes):
+        if self.decoder is None:
+            self.buffer += chunk
+            return
+        pcm = self.decoder.push(chunk)
+        if pcm:
+            self.encoder.encode_pcm_to_opus_stream(pcm, False, self.emit)
+
+    def finish(self):
+        if self.decoder is not None:
+            self.encoder.encode_pcm_to_opus_stream(self.decoder.flush(), True, self.emit)
+        elif self.buffer:
+            audio_bytes_to_data_stream(
+                self.buffer,
+                file_type=self.file_type,
+                is_opus=True,
+                callback=self.emit,
+                frame_duration=self.frame_duration,
+                trimmer=self.trimmer,
+            )
+
+    def close(self):
+        if self.encoder is not None:
+            self.encoder.close()
@@ -263,8 +263,7 @@ class TTSProvider(TTSProviderBase):
             logger.bind(tag=TAG).info(f"[COSYVOICE_CLONE] Using {len(references)} reference(s)")
             
             # Make request
-            import requests
-            response = requests.post(
+            response = self.http_session.post(
                 self.api_url,
                 json=request_data,
                 headers=headers,
@@ -211,7 +211,7 @@ class TTSProvider(TTSProviderBase):
                 return None
             
             # Download audio from URL
-            audio_response = requests.get(audio_url, timeout=30)
+            audio_response = self.http_session.get(audio_url, timeout=30)
             if audio_response.status_code == 200:
                 audio_data = audio_response.content
                 self._save_audio_to_file(audio_data, output_file)
@@ -236,7 +236,7 @@ class TTSProvider(TTSProviderBase):
         try:
             import requests
             
-            response = requests.post(
+            response = self.http_session.post(
                 url,
                 json=request_data,
                 headers=headers,
@@ -403,7 +403,7 @@ class TTSProvider(TTSProviderBase):
                     return audio_data
                 else:
                     # Handle non-streaming response
-                    response = requests.post(
+                    response = self.http_session.post(
                         self.api_url,
                         json=request_data,
                         headers=headers,
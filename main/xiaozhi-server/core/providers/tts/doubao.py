@@ -1,7 +1,6 @@
 import uuid
 import json
 import base64
-import requests
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
@@ -67,7 +66,7 @@ class TTSProvider(TTSProviderBase):
         }
 
         try:
-            resp = requests.post(
+            resp = self.http_session.post(
                 self.api_url, json.dumps(request_json), headers=self.header
             )
             if "data" in resp.json():
@@ -1,16 +1,17 @@
 import os
 import uuid
 import json
-import queue
 import asyncio
 import traceback
 import websockets
 
+from functools import partial
 from typing import Callable, Any
 from core.utils.tts import MarkdownCleaner
 from config.logger import setup_logging
 from core.utils import opus_encoder_utils
 from core.utils.util import check_model_key
+from core.utils.ws_pool import get_ws_pool
 from core.providers.tts.base import TTSProviderBase
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 
@@ -139,6 +140,18 @@ class Response:
         return super().__str__()
 
 
+async def _connect(ws_url, app_id, access_token, resource_id):
+    ws_header = {
+        "X-Api-App-Key": app_id,
+        "X-Api-Access-Key": access_token,
+        "X-Api-Resource-Id": resource_id,
+        "X-Api-Connect-Id": str(uuid.uuid4()),
+    }
+    return await websockets.connect(
+        ws_url, additional_headers=ws_header, max_size=1000000000
+    )
+
+
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
@@ -171,6 +184,12 @@ class TTSProvider(TTSProviderBase):
         enable_ws_reuse_value = config.get("enable_ws_reuse", True)
         self.enable_ws_reuse = False if str(enable_ws_reuse_value).lower() == 'false' else True
         self.tts_text = ""
+        # 同一账号和资源的连接由所有设备共享，会话结束后归还，下一个会话直接在该连接上开始
+        self.ws_pool = get_ws_pool(
+            (__name__, self.ws_url, self.appId, self.access_token, self.resource_id),
+            "huoshan_double_stream",
+            partial(_connect, self.ws_url, self.appId, self.access_token, self.resource_id),
+        )
         self.opus_encoder = opus_encoder_utils.OpusEncoderUtils(
             sample_rate=16000, channels=1, frame_size_ms=60
         )
@@ -181,13 +200,14 @@ class TTSProvider(TTSProviderBase):
     async def open_audio_channels(self, conn):
         try:
             await super().open_audio_channels(conn)
+            self.ws_pool.prewarm()
         except Exception as e:
             logger.bind(tag=TAG).error(f"Failed to open audio channels: {str(e)}")
             self.ws = None
             raise
 
     async def _ensure_connection(self):
-        """建立新的WebSocket连接，并启动监听任务（仅第一次）"""
+        """从连接池租用WebSocket连接，并启动本次租用的监听任务"""
         try:
             if self.ws:
                 if self.enable_ws_reuse:
@@ -198,29 +218,32 @@ class TTSProvider(TTSProviderBase):
                         await self.finish_connection()
                     except:
                         pass
-            logger.bind(tag=TAG).debug("开始建立新连接...")
-            ws_header = {
-                "X-Api-App-Key": self.appId,
-                "X-Api-Access-Key": self.access_token,
-                "X-Api-Resource-Id": self.resource_id,
-                "X-Api-Connect-Id": uuid.uuid4(),
-            }
-            self.ws = await websockets.connect(
-                self.ws_url, additional_headers=ws_header, max_size=1000000000
+                    self._release_ws(reusable=False)
+            logger.bind(tag=TAG).debug("从连接池租用连接...")
+            self.ws = await self.ws_pool.lease()
+            logger.bind(tag=TAG).debug("WebSocket连接租用成功")
+
+            # 每次租用启动一个监听任务，连接归还后退出
+            logger.bind(tag=TAG).debug("启动监听任务...")
+            self._monitor_task = asyncio.create_task(
+                self._start_monitor_tts_response(self.ws)
             )
-            logger.bind(tag=TAG).debug("WebSocket连接建立成功")
-            
-            # 连接建立成功后，启动监听任务
-            if self._monitor_task is None or self._monitor_task.done():
-                logger.bind(tag=TAG).debug("启动监听任务...")
-                self._monitor_task = asyncio.create_task(self._start_monitor_tts_response())
-            
             return self.ws
         except Exception as e:
             logger.bind(tag=TAG).error(f"建立连接失败: {str(e)}")
             self.ws = None
             raise
     
+    def _release_ws(self, reusable: bool, ws=None):
+        """
+        把当前租用的连接还给连接池，不可复用的连接由连接池关闭
+        指定 ws 时仅当它仍是当前连接才归还，避免上一次租用的监听任务归还新租用的连接
+        """
+        if ws is not None and ws is not self.ws:
+            return
+        ws, self.ws = self.ws, None
+        self.ws_pool.release(ws, reusable=reusable and self.enable_ws_reuse)
+
     async def finish_connection(self):
         """发送 FinishConnection 事件，等待服务端返回 EVENT_ConnectionFinished"""
         try:
@@ -237,97 +260,86 @@ class TTSProvider(TTSProviderBase):
         except:
             pass
 
-    def tts_text_priority_thread(self):
-        """火山引擎双流式TTS的文本处理线程"""
-        while not self.conn.stop_event.is_set():
-            try:
-                message = self.tts_text_queue.get(timeout=1)
-                logger.bind(tag=TAG).debug(
-                    f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
-                )
+    def handle_tts_text_message(self, message):
+        """火山引擎双流式TTS的文本处理"""
+        logger.bind(tag=TAG).debug(
+            f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
+        )
 
-                if message.sentence_type == SentenceType.FIRST:
-                    self.conn.client_abort = False
+        if message.sentence_type == SentenceType.FIRST:
+            self.conn.client_abort = False
 
-                if self.conn.client_abort:
-                    try:
-                        logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                        if self.enable_ws_reuse:
-                            asyncio.run_coroutine_threadsafe(
-                                self.cancel_session(self.conn.sentence_id),
-                                loop=self.conn.loop,
-                            )
-                        else:
-                            asyncio.run_coroutine_threadsafe(
-                                self.finish_connection(),
-                                loop=self.conn.loop,
-                            )
-                        continue
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"取消TTS会话失败: {str(e)}")
-                        continue
-
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    try:
-                        if not getattr(self.conn, "sentence_id", None): 
-                            self.conn.sentence_id = uuid.uuid4().hex
-                            logger.bind(tag=TAG).debug(f"自动生成新的 会话ID: {self.conn.sentence_id}")
-
-                        logger.bind(tag=TAG).debug("开始启动TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.start_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
-                        self.before_stop_play_files.clear()
-                        logger.bind(tag=TAG).debug("TTS会话启动成功")
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"启动TTS会话失败: {str(e)}")
-                        continue
+        if self.conn.client_abort:
+            try:
+                logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
+                if self.enable_ws_reuse:
+                    asyncio.run_coroutine_threadsafe(
+                        self.cancel_session(self.conn.sentence_id),
+                        loop=self.conn.loop,
+                    )
+                else:
+                    asyncio.run_coroutine_threadsafe(
+                        self.finish_connection(),
+                        loop=self.conn.loop,
+                    )
+                return
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"取消TTS会话失败: {str(e)}")
+                return
 
-                elif ContentType.TEXT == message.content_type:
-                    if message.content_detail:
-                        try:
-                            logger.bind(tag=TAG).debug(
-                                f"开始发送TTS文本: {message.content_detail}"
-                            )
-                            future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
-                                loop=self.conn.loop,
-                            )
-                            future.result()
-                            logger.bind(tag=TAG).debug("TTS文本发送成功")
-                        except Exception as e:
-                            logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-                            continue
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
+            try:
+                if not getattr(self.conn, "sentence_id", None): 
+                    self.conn.sentence_id = uuid.uuid4().hex
+                    logger.bind(tag=TAG).debug(f"自动生成新的 会话ID: {self.conn.sentence_id}")
+
+                logger.bind(tag=TAG).debug("开始启动TTS会话...")
+                future = asyncio.run_coroutine_threadsafe(
+                    self.start_session(self.conn.sentence_id),
+                    loop=self.conn.loop,
+                )
+                future.result()
+                self.before_stop_play_files.clear()
+                logger.bind(tag=TAG).debug("TTS会话启动成功")
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"启动TTS会话失败: {str(e)}")
+                return
 
-                elif ContentType.FILE == message.content_type:
-                    logger.bind(tag=TAG).info(
-                        f"添加音频文件到待播放列表: {message.content_file}"
+        elif ContentType.TEXT == message.content_type:
+            if message.content_detail:
+                try:
+                    logger.bind(tag=TAG).debug(
+                        f"开始发送TTS文本: {message.content_detail}"
                     )
-                    if message.content_file and os.path.exists(message.content_file):
-                        # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
-                if message.sentence_type == SentenceType.LAST:
-                    try:
-                        logger.bind(tag=TAG).debug("开始结束TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.finish_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
-                        continue
+                    future = asyncio.run_coroutine_threadsafe(
+                        self.text_to_speak(message.content_detail, None),
+                        loop=self.conn.loop,
+                    )
+                    future.result()
+                    logger.bind(tag=TAG).debug("TTS文本发送成功")
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
+                    return
 
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.bind(tag=TAG).error(
-                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+        elif ContentType.FILE == message.content_type:
+            logger.bind(tag=TAG).info(
+                f"添加音频文件到待播放列表: {message.content_file}"
+            )
+            if message.content_file and os.path.exists(message.content_file):
+                # 先处理文件音频数据
+                self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+        if message.sentence_type == SentenceType.LAST:
+            try:
+                logger.bind(tag=TAG).debug("开始结束TTS会话...")
+                future = asyncio.run_coroutine_threadsafe(
+                    self.finish_session(self.conn.sentence_id),
+                    loop=self.conn.loop,
                 )
-                continue
+                future.result()
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
+                return
 
     async def text_to_speak(self, text, _):
         """发送文本到TTS服务"""
@@ -346,12 +358,7 @@ class TTSProvider(TTSProviderBase):
             return
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            self._release_ws(reusable=False)
             raise
 
     async def start_session(self, session_id):
@@ -450,20 +457,15 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).warning(f"关闭时取消监听任务错误: {e}")
             self._monitor_task = None
 
-        if self.ws:
-            try:
-                await self.ws.close()
-            except:
-                pass
-            self.ws = None
+        self._release_ws(reusable=False)
 
-    async def _start_monitor_tts_response(self):
-        """监听TTS响应 - 长期运行"""
+    async def _start_monitor_tts_response(self, ws):
+        """监听TTS响应，当前会话结束后把连接还给连接池"""
         try:
             while not self.conn.stop_event.is_set():
                 try:
                     # 确保 `recv()` 运行在同一个 event loop
-                    msg = await self.ws.recv()
+                    msg = await ws.recv()
                     res = self.parser_response(msg)
                     self.print_response(res, "send_text res:")
 
@@ -483,6 +485,8 @@ class TTSProvider(TTSProviderBase):
                     if res.optional.event == EVENT_SessionCanceled:
                         logger.bind(tag=TAG).debug(f"释放服务端资源成功～～")
                         self.activate_session = False
+                        self._release_ws(reusable=True, ws=ws)
+                        break
                     elif res.optional.event == EVENT_TTSSentenceStart:
                         json_data = json.loads(res.payload.decode("utf-8"))
                         self.tts_text = json_data.get("text", "")
@@ -501,9 +505,12 @@ class TTSProvider(TTSProviderBase):
                         logger.bind(tag=TAG).debug(f"会话结束～～")
                         self.activate_session = False
                         self._process_before_stop_play_files()
-                        # 非复用模式下，会话结束后发送 FinishConnection
+                        # 非复用模式下，会话结束后发送 FinishConnection，等待连接结束后关闭
                         if not self.enable_ws_reuse:
                             await self.finish_connection()
+                            continue
+                        self._release_ws(reusable=True, ws=ws)
+                        break
                 except websockets.ConnectionClosed:
                     logger.bind(tag=TAG).warning("WebSocket连接已关闭")
                     break
@@ -513,17 +520,13 @@ class TTSProvider(TTSProviderBase):
                     )
                     traceback.print_exc()
                     break
-            # 连接异常时关闭WebSocket
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            # 连接异常或会话未正常结束时，连接不再复用
+            self._release_ws(reusable=False, ws=ws)
         # 监听任务退出时清理引用
         finally:
-            self.activate_session = False
-            self._monitor_task = None
+            if self._monitor_task is asyncio.current_task():
+                self.activate_session = False
+                self._monitor_task = None
 
     async def send_event(
         self,
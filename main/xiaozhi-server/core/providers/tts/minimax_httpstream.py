@@ -1,16 +1,14 @@
 import os
 import json
 import time
-import queue
-import asyncio
-import aiohttp
 import requests
-import traceback
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
 from core.utils.util import parse_string_to_list
 from core.providers.tts.base import TTSProviderBase
-from core.utils import opus_encoder_utils, textUtils
+from core.utils.tts_io import run_tts_coroutine, shared_aiohttp_session
+from core.utils import opus_encoder_utils
+from core.utils.audio_decode import StreamingAudioDecoder, supports_streaming
 from core.providers.tts.dto.dto import SentenceType, ContentType
 
 TAG = __name__
@@ -62,7 +60,12 @@ class TTSProvider(TTSProviderBase):
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
         }
-        self.audio_file_type = defult_audio_setting.get("format", "pcm")
+        self.audio_file_type = self.audio_setting.get("format", "pcm")
+        if self.audio_file_type != "pcm" and not supports_streaming(self.audio_file_type):
+            logger.bind(tag=TAG).warning(
+                f"{self.audio_file_type}格式无法流式解码，改用pcm格式"
+            )
+            self.audio_file_type = self.audio_setting["format"] = "pcm"
 
         self.opus_encoder = opus_encoder_utils.OpusEncoderUtils(
             sample_rate=24000, channels=1, frame_size_ms=60
@@ -71,55 +74,35 @@ class TTSProvider(TTSProviderBase):
         # PCM缓冲区
         self.pcm_buffer = bytearray()
 
-    def tts_text_priority_thread(self):
-        """流式文本处理线程"""
-        while not self.conn.stop_event.is_set():
-            try:
-                message = self.tts_text_queue.get(timeout=1)
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.before_stop_play_files.clear()
-                elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        self.to_tts_single_stream(segment_text)
-
-                elif ContentType.FILE == message.content_type:
-                    logger.bind(tag=TAG).info(
-                        f"添加音频文件到待播放列表: {message.content_file}"
-                    )
-                    if message.content_file and os.path.exists(message.content_file):
-                        # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
-                if message.sentence_type == SentenceType.LAST:
-                    # 处理剩余的文本
-                    self._process_remaining_text_stream(True)
-
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.bind(tag=TAG).error(
-                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
-                )
+    def handle_tts_text_message(self, message):
+        """流式文本处理"""
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
+            self.segmenter.reset()
+            self.before_stop_play_files.clear()
+        elif ContentType.TEXT == message.content_type:
+            for segment_text in self.segmenter.push(message.content_detail):
+                self.to_tts_single_stream(segment_text)
+
+        elif ContentType.FILE == message.content_type:
+            logger.bind(tag=TAG).info(
+                f"添加音频文件到待播放列表: {message.content_file}"
+            )
+            if message.content_file and os.path.exists(message.content_file):
+                # 先处理文件音频数据
+                self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+        if message.sentence_type == SentenceType.LAST:
+            # 处理剩余的文本
+            self._process_remaining_text_stream(True)
 
     def _process_remaining_text_stream(self, is_last=False):
         """处理剩余的文本并生成语音
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_single_stream(segment_text, is_last)
-                self.processed_chars += len(full_text)
-            else:
-                self._process_before_stop_play_files()
+        segment_text = self.segmenter.flush()
+        if segment_text:
+            self.to_tts_single_stream(segment_text, is_last)
         else:
             self._process_before_stop_play_files()
 
@@ -128,7 +111,7 @@ class TTSProvider(TTSProviderBase):
             max_repeat_time = 5
             text = MarkdownCleaner.clean_markdown(text)
             try:
-                asyncio.run(self.text_to_speak(text, is_last))
+                run_tts_coroutine(self.text_to_speak(text, is_last))
             except Exception as e:
                 logger.bind(tag=TAG).warning(
                     f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -171,7 +154,7 @@ class TTSProvider(TTSProviderBase):
             * 2
         )  # 16-bit = 2 bytes
         try:
-            async with aiohttp.ClientSession() as session:
+            async with shared_aiohttp_session() as session:
                 async with session.post(
                     self.api_url,
                     headers=self.header,
@@ -188,6 +171,8 @@ class TTSProvider(TTSProviderBase):
 
                     self.pcm_buffer.clear()
                     self.tts_audio_queue.put((SentenceType.FIRST, [], text))
+                    # mp3等压缩格式每收到一个完整的帧就解码，不等整句返回
+                    decoder = self._create_decoder()
 
                     # 处理音频流数据
                     buffer = b""
@@ -218,6 +203,8 @@ class TTSProvider(TTSProviderBase):
                                 # 仅处理status=1的有效音频块 忽略status=2的结束汇总块
                                 if status == 1 and audio_hex:
                                     pcm_data = bytes.fromhex(audio_hex)
+                                    if decoder is not None:
+                                        pcm_data = decoder.push(pcm_data)
                                     self.pcm_buffer.extend(pcm_data)
 
                             except json.JSONDecodeError as e:
@@ -232,6 +219,9 @@ class TTSProvider(TTSProviderBase):
                                 frame, end_of_stream=False, callback=self.handle_opus
                             )
 
+                    if decoder is not None:
+                        self.pcm_buffer.extend(decoder.flush())
+
                     # flush 剩余不足一帧的数据
                     if self.pcm_buffer:
                         self.opus_encoder.encode_pcm_to_opus_stream(
@@ -249,6 +239,14 @@ class TTSProvider(TTSProviderBase):
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
             self.tts_audio_queue.put((SentenceType.LAST, [], None))
 
+    def _create_decoder(self):
+        """非pcm格式时按编码器的采样率创建流式解码器"""
+        if self.audio_file_type == "pcm":
+            return None
+        return StreamingAudioDecoder(
+            self.audio_file_type, sample_rate=self.opus_encoder.sample_rate
+        )
+
     async def close(self):
         """资源清理"""
         await super().close()
@@ -299,6 +297,7 @@ class TTSProvider(TTSProviderBase):
                 opus_datas = []
                 full_content = response.content.decode('utf-8')
                 pcm_data = bytearray()
+                decoder = self._create_decoder()
                 for data_block in full_content.split('\n\n'):
                     if not data_block.startswith('data: '):
                         continue
@@ -308,11 +307,17 @@ class TTSProvider(TTSProviderBase):
                         data = json.loads(json_str)
                         if data.get('data', {}).get('status') == 1:
                             audio_hex = data['data']['audio']
-                            pcm_data.extend(bytes.fromhex(audio_hex))
+                            audio = bytes.fromhex(audio_hex)
+                            if decoder is not None:
+                                audio = decoder.push(audio)
+                            pcm_data.extend(audio)
                     except (json.JSONDecodeError, KeyError) as e:
                         logger.bind(tag=TAG).warning(f"无效数据块: {e}")
                         continue
 
+                if decoder is not None:
+                    pcm_data.extend(decoder.flush())
+
                 # 计算每帧的字节数
                 frame_bytes = int(
                     self.opus_encoder.sample_rate
@@ -1,4 +1,3 @@
-import requests
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
@@ -41,7 +40,7 @@ class TTSProvider(TTSProviderBase):
             "response_format": "wav",
             "speed": self.speed,
         }
-        response = requests.post(self.api_url, json=data, headers=headers)
+        response = self.http_session.post(self.api_url, json=data, headers=headers)
         if response.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as audio_file:
@@ -7,8 +7,13 @@ from core.providers.tts.base import TTSProviderBase
 TAG = __name__
 logger = setup_logging()
 
+# 流式读取响应时每次读取的字节数，128kbps的mp3约为64ms音频
+STREAM_CHUNK_SIZE = 1024
+
 
 class TTSProvider(TTSProviderBase):
+    supports_audio_stream = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.model = config.get("model")
@@ -205,7 +210,7 @@ class TTSProvider(TTSProviderBase):
             "Content-Type": "application/json",
         }
         try:
-            response = requests.request(
+            response = self.http_session.request(
                 "POST", self.api_url, json=request_json, headers=headers
             )
             data = response.content
@@ -216,3 +221,27 @@ class TTSProvider(TTSProviderBase):
                 return data
         except Exception as e:
             raise Exception(f"{__name__} error: {e}")
+
+    async def text_to_speak_stream(self, text):
+        """流式读取响应体，mp3格式时由基类边接收边解码"""
+        request_json = {
+            "model": self.model,
+            "input": text,
+            "voice": self.voice,
+            "response_format": self.response_format,
+        }
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json",
+        }
+        try:
+            with self.http_session.request(
+                "POST", self.api_url, json=request_json, headers=headers, stream=True
+            ) as response:
+                if response.status_code != 200:
+                    raise Exception(f"{response.status_code}, {response.text}")
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    if chunk:
+                        yield chunk
+        except Exception as e:
+            raise Exception(f"{__name__} error: {e}")
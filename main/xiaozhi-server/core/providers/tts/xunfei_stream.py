@@ -3,15 +3,16 @@ import time
 import uuid
 import json
 import hmac
-import queue
 import base64
 import hashlib
 import asyncio
 import traceback
 import websockets
 from asyncio import Task
+from functools import partial
 from config.logger import setup_logging
 from core.utils import opus_encoder_utils
+from core.utils.ws_pool import get_ws_pool
 from core.utils.tts import MarkdownCleaner
 from urllib.parse import urlencode, urlparse
 from core.providers.tts.base import TTSProviderBase
@@ -58,6 +59,17 @@ class XunfeiWSAuth:
         return url
 
 
+async def _connect(api_key, api_secret, api_url):
+    # 认证URL带有签名时间，建连时再生成
+    auth_url = XunfeiWSAuth.create_auth_url(api_key, api_secret, api_url)
+    return await websockets.connect(
+        auth_url,
+        ping_interval=30,
+        ping_timeout=10,
+        close_timeout=10,
+    )
+
+
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
@@ -122,112 +134,108 @@ class TTSProvider(TTSProviderBase):
         if not all([self.app_id, self.api_key, self.api_secret]):
             raise ValueError("讯飞TTS需要配置app_id、api_key和api_secret")
 
-    async def _ensure_connection(self):
-        """确保WebSocket连接可用"""
-        try:
-            logger.bind(tag=TAG).info("开始建立新连接...")
+        # 一个连接只能进行一次合成，连接池只负责提前建立连接，用完即关闭
+        self.ws_pool = get_ws_pool(
+            (__name__, self.api_url, self.api_key, self.api_secret),
+            "xunfei_stream",
+            partial(_connect, self.api_key, self.api_secret, self.api_url),
+            max_idle_seconds=8,
+        )
 
-            # 生成认证URL
-            auth_url = XunfeiWSAuth.create_auth_url(
-                self.api_key, self.api_secret, self.api_url
-            )
+    async def open_audio_channels(self, conn):
+        await super().open_audio_channels(conn)
+        self.ws_pool.prewarm()
 
-            self.ws = await websockets.connect(
-                auth_url,
-                ping_interval=30,
-                ping_timeout=10,
-                close_timeout=10,
-            )
-            logger.bind(tag=TAG).info("WebSocket连接建立成功")
+    async def _ensure_connection(self):
+        """从连接池取用预先建立的WebSocket连接"""
+        try:
+            logger.bind(tag=TAG).info("从连接池租用连接...")
+            self.ws = await self.ws_pool.lease()
+            logger.bind(tag=TAG).info("WebSocket连接租用成功")
             return self.ws
         except Exception as e:
             logger.bind(tag=TAG).error(f"建立连接失败: {str(e)}")
             self.ws = None
             raise
 
-    def tts_text_priority_thread(self):
-        """流式文本处理线程"""
-        while not self.conn.stop_event.is_set():
+    def _release_ws(self):
+        """归还并关闭连接，讯飞的连接不能进行下一次合成"""
+        ws, self.ws = self.ws, None
+        self.ws_pool.release(ws, reusable=False)
+
+    def handle_tts_text_message(self, message):
+        """流式文本处理"""
+        logger.bind(tag=TAG).debug(
+            f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
+        )
+
+        if message.sentence_type == SentenceType.FIRST:
+            # 重置序列号
+            self.text_seq = 0
+            self.conn.client_abort = False
+        # 增加序列号
+        self.text_seq += 1
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
+            return
+
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
             try:
-                message = self.tts_text_queue.get(timeout=1)
-                logger.bind(tag=TAG).debug(
-                    f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
+                if not getattr(self.conn, "sentence_id", None):
+                    self.conn.sentence_id = uuid.uuid4().hex
+                    logger.bind(tag=TAG).info(f"自动生成新的 会话ID: {self.conn.sentence_id}")
+
+                logger.bind(tag=TAG).info("开始启动TTS会话...")
+                future = asyncio.run_coroutine_threadsafe(
+                    self.start_session(self.conn.sentence_id),
+                    loop=self.conn.loop,
                 )
+                future.result()
+                self.before_stop_play_files.clear()
+                logger.bind(tag=TAG).info("TTS会话启动成功")
 
-                if message.sentence_type == SentenceType.FIRST:
-                    # 重置序列号
-                    self.text_seq = 0
-                    self.conn.client_abort = False
-                # 增加序列号
-                self.text_seq += 1
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                    continue
-
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    try:
-                        if not getattr(self.conn, "sentence_id", None):
-                            self.conn.sentence_id = uuid.uuid4().hex
-                            logger.bind(tag=TAG).info(f"自动生成新的 会话ID: {self.conn.sentence_id}")
-
-                        logger.bind(tag=TAG).info("开始启动TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.start_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
-                        self.before_stop_play_files.clear()
-                        logger.bind(tag=TAG).info("TTS会话启动成功")
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"启动TTS会话失败: {str(e)}")
+                return
 
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"启动TTS会话失败: {str(e)}")
-                        continue
-
-                # 处理文本内容
-                if ContentType.TEXT == message.content_type:
-                    if message.content_detail:
-                        try:
-                            logger.bind(tag=TAG).debug(
-                                f"开始发送TTS文本: {message.content_detail}"
-                            )
-                            future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
-                                loop=self.conn.loop,
-                            )
-                            future.result()
-                            logger.bind(tag=TAG).debug("TTS文本发送成功")
-                        except Exception as e:
-                            logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-                            # 不使用continue，确保后续处理不被中断
-
-                # 处理文件内容
-                if ContentType.FILE == message.content_type:
-                    logger.bind(tag=TAG).info(
-                        f"添加音频文件到待播放列表: {message.content_file}"
+        # 处理文本内容
+        if ContentType.TEXT == message.content_type:
+            if message.content_detail:
+                try:
+                    logger.bind(tag=TAG).debug(
+                        f"开始发送TTS文本: {message.content_detail}"
+                    )
+                    future = asyncio.run_coroutine_threadsafe(
+                        self.text_to_speak(message.content_detail, None),
+                        loop=self.conn.loop,
                     )
-                    if message.content_file and os.path.exists(message.content_file):
-                        # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+                    future.result()
+                    logger.bind(tag=TAG).debug("TTS文本发送成功")
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
+                    # 不使用continue，确保后续处理不被中断
 
-                # 处理会话结束
-                if message.sentence_type == SentenceType.LAST:
-                    try:
-                        logger.bind(tag=TAG).info("开始结束TTS会话...")
-                        asyncio.run_coroutine_threadsafe(
-                            self.finish_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
-                        continue
+        # 处理文件内容
+        if ContentType.FILE == message.content_type:
+            logger.bind(tag=TAG).info(
+                f"添加音频文件到待播放列表: {message.content_file}"
+            )
+            if message.content_file and os.path.exists(message.content_file):
+                # 先处理文件音频数据
+                self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
 
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.bind(tag=TAG).error(
-                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+        # 处理会话结束
+        if message.sentence_type == SentenceType.LAST:
+            try:
+                logger.bind(tag=TAG).info("开始结束TTS会话...")
+                asyncio.run_coroutine_threadsafe(
+                    self.finish_session(self.conn.sentence_id),
+                    loop=self.conn.loop,
                 )
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
+                return
 
     async def text_to_speak(self, text, _):
         """发送文本到TTS服务进行合成"""
@@ -245,12 +253,7 @@ class TTSProvider(TTSProviderBase):
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            self._release_ws()
             raise
 
     async def start_session(self, session_id):
@@ -317,12 +320,7 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).warning(f"关闭时取消监听任务错误: {e}")
             self._monitor_task = None
 
-        if self.ws:
-            try:
-                await self.ws.close()
-            except:
-                pass
-            self.ws = None
+        self._release_ws()
 
     async def _start_monitor_tts_response(self):
         """监听TTS响应"""
@@ -394,12 +392,7 @@ class TTSProvider(TTSProviderBase):
                     break
 
             # 链接不可复用
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            self._release_ws()
         # 监听任务退出时清理引用
         finally:
             self._monitor_task = None
@@ -7,3 +7,11 @@ class VADProviderBase(ABC):
     def is_vad(self, conn, data) -> bool:
         """检测音频数据中的语音活动"""
         pass
+
+    async def is_vad_async(self, conn, data) -> bool:
+        """异步检测语音活动，默认直接调用同步实现"""
+        return self.is_vad(conn, data)
+
+    def release_conn(self, conn) -> None:
+        """连接关闭时释放该连接在VAD中占用的资源"""
+        pass
@@ -1,9 +1,15 @@
+import os
 import time
-import numpy as np
 import torch
-import opuslib_next
 from config.logger import setup_logging
 from core.providers.vad.base import VADProviderBase
+from core.providers.vad.silero_batch_engine import (
+    SileroBatchEngine,
+    SileroOnnxBatchModel,
+    ProcessPoolSileroModel,
+)
+from core.utils.metrics import register_stats
+from core.utils.model_worker_pool import get_model_worker_pool
 
 TAG = __name__
 logger = setup_logging()
@@ -19,8 +25,6 @@ class VADProvider(VADProviderBase):
             force_reload=False,
         )
 
-        self.decoder = opuslib_next.Decoder(16000, 1)
-
         # 处理空字符串的情况
         threshold = config.get("threshold", "0.5")
         threshold_low = config.get("threshold_low", "0.2")
@@ -33,69 +37,118 @@ class VADProvider(VADProviderBase):
             int(min_silence_duration_ms) if min_silence_duration_ms else 1000
         )
 
+        # 推测回复：静音达到该时长时提前识别并启动LLM，0表示关闭
+        speculative_silence_ms = config.get("speculative_silence_ms", "0")
+        self.speculative_silence_ms = (
+            int(speculative_silence_ms) if speculative_silence_ms else 0
+        )
+
         # 至少要多少帧才算有语音
         self.frame_window_threshold = 3
 
-    def __del__(self):
-        if hasattr(self, 'decoder') and self.decoder is not None:
-            try:
-                del self.decoder
-            except Exception:
-                pass
+        # 跨连接批量推理，多设备并发时将各连接的帧合并为一次前向计算
+        self.batch_engine = None
+        if str(config.get("batch_enabled", False)).lower() == "true":
+            model_path = os.path.join(
+                config["model_dir"], "src", "silero_vad", "data", "silero_vad.onnx"
+            )
+            # 模型工作进程池：推理在独立进程中执行，不与事件循环争抢GIL
+            process_workers = int(config.get("process_workers", 0) or 0)
+            if process_workers > 0:
+                worker_pool = get_model_worker_pool(
+                    "vad",
+                    "core.providers.vad.silero_batch_engine:create_worker_model",
+                    {"onnx_path": model_path},
+                    process_workers,
+                )
+                register_stats("vad_worker_pool", worker_pool.get_stats)
+                batch_model = ProcessPoolSileroModel(worker_pool)
+            else:
+                batch_model = SileroOnnxBatchModel(model_path)
+            self.batch_engine = SileroBatchEngine(
+                batch_model,
+                max_wait_ms=float(config.get("batch_max_wait_ms", 5) or 5),
+                max_batch_size=int(config.get("batch_max_size", 64) or 64),
+            )
+            logger.bind(tag=TAG).info(
+                f"SileroVAD批量推理已启用: max_wait={self.batch_engine.max_wait * 1000}ms, "
+                f"max_batch={self.batch_engine.max_batch_size}"
+            )
+
+    def _update_voice_state(self, conn, speech_prob):
+        """根据单帧语音概率更新连接的VAD状态，返回当前是否有语音"""
+        # 双阈值判断
+        if speech_prob >= self.vad_threshold:
+            is_voice = True
+        elif speech_prob <= self.vad_threshold_low:
+            is_voice = False
+        else:
+            is_voice = conn.last_is_voice
+
+        # 声音没低于最低值则延续前一个状态，判断为有声音
+        conn.last_is_voice = is_voice
+
+        # 更新滑动窗口
+        conn.client_voice_window.append(is_voice)
+        client_have_voice = (
+            conn.client_voice_window.count(True) >= self.frame_window_threshold
+        )
+
+        # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
+        if conn.client_have_voice and not client_have_voice:
+            stop_duration = time.time() * 1000 - conn.last_activity_time
+            if stop_duration >= self.silence_threshold_ms:
+                conn.client_voice_stop = True
+            elif 0 < self.speculative_silence_ms <= stop_duration:
+                # 短暂停顿，可能已经说完，允许提前推测回复
+                conn.client_voice_pause = True
+        if client_have_voice:
+            conn.client_have_voice = True
+            conn.client_voice_pause = False
+            conn.last_activity_time = time.time() * 1000
+        return client_have_voice
 
     def is_vad(self, conn, opus_packet):
         # 手动模式：直接返回True，不进行实时VAD检测，所有音频都缓存
         if conn.client_listen_mode == "manual":
             return True
-            
-        try:
-            pcm_frame = self.decoder.decode(opus_packet, 960)
-            conn.client_audio_buffer.extend(pcm_frame)  # 将新数据加入缓冲区
 
-            # 处理缓冲区中的完整帧（每次处理512采样点）
+        try:
+            # 音频包已在接入时解码，这里只读取新的完整帧（每帧512采样点）
             client_have_voice = False
-            while len(conn.client_audio_buffer) >= 512 * 2:
-                # 提取前512个采样点（1024字节）
-                chunk = conn.client_audio_buffer[: 512 * 2]
-                conn.client_audio_buffer = conn.client_audio_buffer[512 * 2 :]
-
-                # 转换为模型需要的张量格式
-                audio_int16 = np.frombuffer(chunk, dtype=np.int16)
-                audio_float32 = audio_int16.astype(np.float32) / 32768.0
+            for audio_float32 in conn.audio_ingest.vad_frames():
                 audio_tensor = torch.from_numpy(audio_float32)
 
                 # 检测语音活动
                 with torch.no_grad():
                     speech_prob = self.model(audio_tensor, 16000).item()
 
-                # 双阈值判断
-                if speech_prob >= self.vad_threshold:
-                    is_voice = True
-                elif speech_prob <= self.vad_threshold_low:
-                    is_voice = False
-                else:
-                    is_voice = conn.last_is_voice
-
-                # 声音没低于最低值则延续前一个状态，判断为有声音
-                conn.last_is_voice = is_voice
-
-                # 更新滑动窗口
-                conn.client_voice_window.append(is_voice)
-                client_have_voice = (
-                    conn.client_voice_window.count(True) >= self.frame_window_threshold
-                )
+                client_have_voice = self._update_voice_state(conn, speech_prob)
+
+            return client_have_voice
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
 
-                # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
-                if conn.client_have_voice and not client_have_voice:
-                    stop_duration = time.time() * 1000 - conn.last_activity_time
-                    if stop_duration >= self.silence_threshold_ms:
-                        conn.client_voice_stop = True
-                if client_have_voice:
-                    conn.client_have_voice = True
-                    conn.last_activity_time = time.time() * 1000
+    async def is_vad_async(self, conn, opus_packet):
+        if self.batch_engine is None:
+            return self.is_vad(conn, opus_packet)
+
+        # 手动模式：直接返回True，不进行实时VAD检测，所有音频都缓存
+        if conn.client_listen_mode == "manual":
+            return True
 
+        try:
+            # 交给批量引擎，与其他连接的帧一起推理
+            speech_probs = await self.batch_engine.infer(
+                conn.session_id, conn.audio_ingest.vad_frames()
+            )
+            client_have_voice = False
+            for speech_prob in speech_probs:
+                client_have_voice = self._update_voice_state(conn, speech_prob)
             return client_have_voice
-        except opuslib_next.OpusError as e:
-            logger.bind(tag=TAG).info(f"解码错误: {e}")
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
+
+    def release_conn(self, conn):
+        if self.batch_engine is not None:
+            self.batch_engine.release(conn.session_id)
@@ -0,0 +1,247 @@
+"""
+Silero VAD 跨连接批量推理引擎
+将多个连接在短时间窗口内提交的512采样点帧合并为一次前向计算，
+每个连接的循环状态(state/context)单独保存，推理时按批次堆叠
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 512  # 16kHz下每帧512个采样点
+CONTEXT_SAMPLES = 64  # 模型需要的上一帧尾部上下文
+STATE_SIZE = 128
+
+
+# 推理线程为进程级，更新配置重建VAD时不会每次新建线程
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="silero-batch"
+            )
+        return _batch_executor
+
+
+class SileroOnnxBatchModel:
+    """基于onnxruntime的Silero模型，状态由调用方显式传入，支持任意批大小"""
+
+    def __init__(self, model_path: str, num_threads: int = 1):
+        import onnxruntime
+
+        opts = onnxruntime.SessionOptions()
+        opts.inter_op_num_threads = 1
+        opts.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            model_path, providers=["CPUExecutionProvider"], sess_options=opts
+        )
+        self._sr = np.array(SAMPLE_RATE, dtype=np.int64)
+
+    def forward(self, frames: np.ndarray, contexts: np.ndarray, states: np.ndarray):
+        """
+        执行一次批量前向计算
+
+        Args:
+            frames: (B, 512) float32 音频帧
+            contexts: (B, 64) float32 每路上一帧的尾部
+            states: (2, B, 128) float32 每路的循环状态
+
+        Returns:
+            (probs (B,), new_states (2, B, 128), new_contexts (B, 64))
+        """
+        x = np.concatenate([contexts, frames], axis=1)
+        out, new_states = self.session.run(
+            None, {"input": x, "state": states, "sr": self._sr}
+        )
+        return out.reshape(-1), new_states, x[:, -CONTEXT_SAMPLES:]
+
+
+def create_worker_model(config: dict):
+    """模型工作进程内调用，返回按共享内存布局解包并执行一次批量前向计算的函数"""
+    model = SileroOnnxBatchModel(config["onnx_path"])
+
+    def forward(buffer_view, batch_size):
+        # 布局: frames (B,512) | contexts (B,64) | states (2,B,128)，均为float32
+        data = np.frombuffer(buffer_view, dtype=np.float32).copy()
+        frames_end = batch_size * FRAME_SAMPLES
+        contexts_end = frames_end + batch_size * CONTEXT_SAMPLES
+        frames = data[:frames_end].reshape(batch_size, FRAME_SAMPLES)
+        contexts = data[frames_end:contexts_end].reshape(batch_size, CONTEXT_SAMPLES)
+        states = data[contexts_end:].reshape(2, batch_size, STATE_SIZE)
+        return model.forward(frames, contexts, states)
+
+    return forward
+
+
+class ProcessPoolSileroModel:
+    """与 SileroOnnxBatchModel 接口一致，前向计算转交给模型工作进程执行"""
+
+    def __init__(self, worker_pool):
+        self.worker_pool = worker_pool
+
+    def forward(self, frames: np.ndarray, contexts: np.ndarray, states: np.ndarray):
+        batch_size = frames.shape[0]
+        data = np.concatenate(
+            [frames.reshape(-1), contexts.reshape(-1), states.reshape(-1)]
+        ).astype(np.float32, copy=False)
+        return self.worker_pool.submit(data.data, batch_size=batch_size).result()
+
+
+class _StreamState:
+    """单个连接的推理状态"""
+
+    __slots__ = ("state", "context", "pending")
+
+    def __init__(self):
+        self.state = np.zeros((2, STATE_SIZE), dtype=np.float32)
+        self.context = np.zeros(CONTEXT_SAMPLES, dtype=np.float32)
+        self.pending = deque()  # (frame, future)
+
+
+class SileroBatchEngine:
+    """
+    跨连接的微批调度器
+    - 每个批次中每个连接最多一帧，保证同一连接的帧按顺序经过循环状态
+    - 攒够 max_batch_size 路或等待超过 max_wait_ms 即触发一次推理
+    - 推理在单独的线程中执行，不阻塞事件循环；推理期间到达的帧自动进入下一批
+    """
+
+    def __init__(self, model, max_wait_ms: float = 5, max_batch_size: int = 64):
+        self.model = model
+        self.max_wait = max(float(max_wait_ms), 0) / 1000.0
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self._streams = {}
+        self._ready = OrderedDict()  # 有待处理帧的连接，按到达顺序轮转
+        self._flush_handle = None
+        self._inflight = False
+        self._executor = _get_batch_executor()
+        self.stats = {"batches": 0, "frames": 0, "max_batch": 0}
+
+    async def infer(self, key, frames):
+        """
+        提交某个连接的若干帧，按顺序返回每帧的语音概率
+
+        Args:
+            key: 连接标识（如session_id）
+            frames: float32 数组列表，每个512个采样点
+        """
+        if not frames:
+            return []
+        loop = asyncio.get_running_loop()
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = _StreamState()
+            self._streams[key] = stream
+
+        futures = []
+        for frame in frames:
+            future = loop.create_future()
+            stream.pending.append((frame, future))
+            futures.append(future)
+        self._ready[key] = stream
+        self._schedule(loop)
+        return list(await asyncio.gather(*futures))
+
+    def release(self, key):
+        """连接关闭时释放其状态"""
+        stream = self._streams.pop(key, None)
+        self._ready.pop(key, None)
+        if stream is not None:
+            while stream.pending:
+                _, future = stream.pending.popleft()
+                if not future.done():
+                    future.cancel()
+
+    def get_stats(self) -> dict:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "streams": len(self._streams),
+            "avg_batch": (self.stats["frames"] / batches) if batches else 0,
+        }
+
+    def _schedule(self, loop):
+        if self._inflight:
+            # 推理进行中，完成后会自动处理新到达的帧
+            return
+        if len(self._ready) >= self.max_batch_size or self.max_wait == 0:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            loop.create_task(self._flush())
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                self.max_wait, lambda: loop.create_task(self._flush())
+            )
+
+    def _take_batch(self):
+        """每个连接取一帧，组成一个批次"""
+        batch = []
+        for key in list(self._ready.keys())[: self.max_batch_size]:
+            stream = self._ready.pop(key)
+            frame, future = stream.pending.popleft()
+            if stream.pending:
+                # 仍有剩余帧，放回队尾等待下一批
+                self._ready[key] = stream
+            if future.cancelled():
+                continue
+            batch.append((stream, frame, future))
+        return batch
+
+    async def _flush(self):
+        self._flush_handle = None
+        if self._inflight:
+            return
+        self._inflight = True
+        loop = asyncio.get_running_loop()
+        try:
+            while self._ready:
+                batch = self._take_batch()
+                if not batch:
+                    continue
+                frames = np.stack([item[1] for item in batch]).astype(
+                    np.float32, copy=False
+                )
+                contexts = np.stack([item[0].context for item in batch])
+                states = np.stack([item[0].state for item in batch], axis=1)
+                try:
+                    probs, new_states, new_contexts = await loop.run_in_executor(
+                        self._executor, self.model.forward, frames, contexts, states
+                    )
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"VAD批量推理失败: {e}")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for i, (stream, _, future) in enumerate(batch):
+                    stream.state = new_states[:, i, :]
+                    stream.context = new_contexts[i]
+                    if not future.done():
+                        future.set_result(float(probs[i]))
+
+                size = len(batch)
+                self.stats["batches"] += 1
+                self.stats["frames"] += size
+                if size > self.stats["max_batch"]:
+                    self.stats["max_batch"] = size
+
+                # 未攒满一批时让出事件循环，让其他连接的帧进入下一批
+                if len(self._ready) < self.max_batch_size and self.max_wait > 0:
+                    await asyncio.sleep(0)
+        finally:
+            self._inflight = False
@@ -0,0 +1,200 @@
+"""
+连接内的异步处理管道
+每个连接的ASR音频、TTS文本、音频播放和聊天记录上报都由事件循环中的任务消费，
+空闲连接不再占用常驻线程；需要阻塞执行的提供者调用交给进程级的有界线程池：
+LLM对话等使用共享线程池，TTS合成使用单独的线程池，对话较多时正在播放的回复不会排在其他连接的整段LLM回复之后
+"""
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config.logger import setup_logging
+from core.utils.metrics import register_stats
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_EXECUTOR_WORKERS = 64
+DEFAULT_TTS_EXECUTOR_WORKERS = 64
+DEFAULT_SPECULATION_EXECUTOR_WORKERS = 16
+
+
+class LoopQueue:
+    """
+    单消费者队列：任意线程都可以 put，事件循环中的任务通过 await get() 消费
+    - 入队顺序即出队顺序，与生产者所在线程无关
+    - 只有消费者正在等待时才唤醒事件循环，连接空闲时没有任何轮询
+    - 保留 put/get_nowait/qsize 等接口，与原先的 queue.Queue 用法兼容
+    """
+
+    def __init__(self):
+        self._items = deque()
+        self._loop = None
+        self._waiter = None
+
+    def bind(self, loop):
+        """绑定消费者所在的事件循环，绑定前入队的数据会保留"""
+        self._loop = loop
+
+    def put(self, item):
+        self._items.append(item)
+        waiter = self._waiter
+        if waiter is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup, waiter)
+
+    put_nowait = put
+
+    @staticmethod
+    def _wakeup(waiter):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    async def get(self):
+        while not self._items:
+            self._waiter = self._loop.create_future()
+            try:
+                # 设置等待者之前入队的数据不会触发唤醒，这里再检查一次
+                if not self._items:
+                    await self._waiter
+            finally:
+                self._waiter = None
+        return self._items.popleft()
+
+    def get_nowait(self):
+        try:
+            return self._items.popleft()
+        except IndexError:
+            raise queue.Empty
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+
+class BoundedLoopQueue(LoopQueue):
+    """
+    有界队列，只能在事件循环线程中写入：
+    - 超过 maxsize 时丢弃最早一个标记为可丢弃的数据
+    - 队列中全部为不可丢弃的数据时仍然入队，只记录超限次数
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.over_limit = 0
+        self.max_depth = 0
+
+    def put(self, item, droppable: bool = False):
+        if self.maxsize > 0 and len(self._items) >= self.maxsize:
+            if not self._drop_oldest():
+                self.over_limit += 1
+        super().put((droppable, item))
+        if len(self._items) > self.max_depth:
+            self.max_depth = len(self._items)
+
+    put_nowait = put
+
+    def _drop_oldest(self) -> bool:
+        for index, (droppable, _) in enumerate(self._items):
+            if droppable:
+                del self._items[index]
+                self.dropped += 1
+                return True
+        return False
+
+    async def get(self):
+        return (await super().get())[1]
+
+    def get_nowait(self):
+        return super().get_nowait()[1]
+
+    def get_stats(self) -> dict:
+        return {
+            "depth": len(self._items),
+            "max_depth": self.max_depth,
+            "dropped": self.dropped,
+            "over_limit": self.over_limit,
+        }
+
+
+class SharedExecutor(ThreadPoolExecutor):
+    """进程内所有连接共用的有界线程池，执行LLM对话、TTS合成等阻塞调用"""
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "conn-worker"):
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._active = 0
+        self._active_lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        def run():
+            with self._active_lock:
+                self._active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._active_lock:
+                    self._active -= 1
+
+        return super().submit(run)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        # 连接关闭时不能关闭共享线程池
+        pass
+
+    def is_saturated(self) -> bool:
+        """所有线程都在执行任务时返回True，此时提交的任务需要排队"""
+        return self._active + self._work_queue.qsize() >= self._max_workers
+
+    def get_stats(self) -> dict:
+        return {
+            "max_workers": self._max_workers,
+            "threads": len(self._threads),
+            "active": self._active,
+            "queued": self._work_queue.qsize(),
+        }
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(name: str, workers: int, thread_name_prefix: str) -> SharedExecutor:
+    """按名称返回进程级线程池，首次调用时创建，之后的调用直接返回同一个线程池"""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = SharedExecutor(workers, thread_name_prefix)
+                _executors[name] = executor
+                register_stats(name, executor.get_stats)
+                logger.bind(tag=TAG).info(f"线程池 {name} 已创建，最大线程数={workers}")
+    return executor
+
+
+def get_shared_executor(max_workers: int = None) -> SharedExecutor:
+    """LLM对话、工具调用、上报转码等阻塞调用共用的线程池"""
+    return _get_executor(
+        "shared_executor", int(max_workers or DEFAULT_EXECUTOR_WORKERS), "conn-worker"
+    )
+
+
+def get_tts_executor(max_workers: int = None) -> SharedExecutor:
+    """TTS文本处理与分段合成专用的线程池"""
+    return _get_executor(
+        "tts_executor", int(max_workers or DEFAULT_TTS_EXECUTOR_WORKERS), "tts-worker"
+    )
+
+
+def get_speculation_executor(max_workers: int = None) -> SharedExecutor:
+    """推测回复专用的线程池，推测回复等待确认时不占用对话线程池"""
+    return _get_executor(
+        "speculation_executor",
+        int(max_workers or DEFAULT_SPECULATION_EXECUTOR_WORKERS),
+        "spec-worker",
+    )
@@ -1,16 +1,181 @@
+import sys
 import time
 import asyncio
 from collections import deque
 from config.logger import setup_logging
+from core.utils.metrics import Histogram, register_stats
 
 TAG = __name__
 logger = setup_logging()
 
+# scheduled_tick 取该值表示已加入调度器的待处理列表，将在本轮事件循环末尾处理
+_READY = -1
+
+
+if sys.version_info >= (3, 12):
+
+    def _create_send_task(coro) -> asyncio.Task:
+        """
+        在独立任务中执行发送：任务立即同步执行到第一次挂起，websocket发送通常不会挂起，此时直接完成；
+        发送中的 asyncio.timeout 等只作用于这个任务，不会影响调度器任务
+        """
+        return asyncio.Task(coro, loop=asyncio.get_running_loop(), eager_start=True)
+
+else:
+    # 3.12 以下没有 eager_start，发送任务在下一轮事件循环开始执行
+    _create_send_task = asyncio.ensure_future
+
+
+class PacingScheduler:
+    """
+    音频发送节拍调度器，同一帧时长的所有连接共用一个
+    原先每个连接各有一个发送任务，每个包 asyncio.sleep 一次，1000路同时播放时每秒约1.6万次定时器回调。
+    这里以帧时长为节拍（时间轮的一格），只保留一个定时器：
+    - 每个连接的音频从所在节拍开始按帧排期，第n个包在第 start_tick+n 拍发送，同一拍到期的连接一次处理完
+    - 连接有包到期但已落后（如队列空了一段时间后又有数据）时，与原实现一样立即补发所有已到期的包
+    - 新数据到达时空闲的连接在本轮事件循环末尾统一处理一次，不必等到下一拍
+    """
+
+    def __init__(self, frame_duration: int):
+        self.frame_duration = frame_duration
+        self.tick_seconds = frame_duration / 1000
+        self.epoch = time.monotonic()
+        self._slots = {}  # 节拍序号 -> 该拍到期的连接列表
+        self._next_tick = self.current_tick() + 1
+        self._ready = []
+        self._ready_scheduled = False
+        self._has_slots = asyncio.Event()
+        self._closing = False
+        self._task = None
+        self._start_task()
+
+        self.ticks = 0
+        self.packets = 0
+        self.active_streams = 0
+        self.lateness_ms_hist = Histogram([1, 2, 5, 10, 20, 40, 60, 120])
+
+    def current_tick(self) -> int:
+        return int((time.monotonic() - self.epoch) / self.tick_seconds)
+
+    def tick_time(self, tick: int) -> float:
+        return self.epoch + tick * self.tick_seconds
+
+    def wake(self, stream):
+        """连接有新数据且当前未排期时调用，在本轮事件循环末尾处理"""
+        self._ready.append(stream)
+        if not self._ready_scheduled:
+            self._ready_scheduled = True
+            asyncio.get_running_loop().call_soon(self._process_ready)
+
+    def schedule(self, stream, tick: int):
+        stream.scheduled_tick = tick
+        self._slots.setdefault(tick, []).append(stream)
+        self._has_slots.set()
+
+    def get_stats(self) -> dict:
+        return {
+            "frame_duration": self.frame_duration,
+            "active_streams": self.active_streams,
+            "ticks": self.ticks,
+            "packets": self.packets,
+            "lateness_ms_hist": self.lateness_ms_hist.snapshot(),
+        }
+
+    def _process_ready(self):
+        self._ready_scheduled = False
+        ready, self._ready = self._ready, []
+        now_tick = self.current_tick()
+        for stream in ready:
+            # 加入列表后被重置或已排期的连接跳过
+            if stream.scheduled_tick == _READY:
+                stream.service(now_tick)
+
+    async def _run(self):
+        while True:
+            try:
+                if not self._slots:
+                    self._has_slots.clear()
+                    await self._has_slots.wait()
+                    # 空闲后重新对齐，不补跑空闲期间的节拍
+                    self._next_tick = max(self._next_tick, self.current_tick())
+                delay = self.tick_time(self._next_tick) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._run_due_slots()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"音频节拍调度异常: {e}")
+
+    def _start_task(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        self._task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task):
+        if self._closing or task is not self._task:
+            return
+        # 调度器被所有连接共用，不是由 close 发起的取消时立即重新启动，已排期的连接不受影响
+        logger.bind(tag=TAG).warning("音频节拍调度任务被意外取消，已重新启动")
+        self._start_task()
+
+    def close(self):
+        """停止调度任务，服务关闭时调用"""
+        self._closing = True
+        self._task.cancel()
+
+    def _run_due_slots(self):
+        now_tick = self.current_tick()
+        self.ticks += 1
+        while self._next_tick <= now_tick:
+            tick = self._next_tick
+            self._next_tick += 1
+            streams = self._slots.pop(tick, None)
+            if not streams:
+                continue
+            for stream in streams:
+                # 排期后被重置或重新排期的连接跳过
+                if stream.scheduled_tick == tick:
+                    stream.scheduled_tick = None
+                    stream.service(now_tick)
+
+    def record_send(self, due_tick: int, now_tick: int):
+        """记录发送时刻相对节拍的延迟，队列断流后补发的包从当前节拍算起，只反映调度本身的延迟"""
+        self.packets += 1
+        lateness = (time.monotonic() - self.tick_time(max(due_tick, now_tick))) * 1000
+        self.lateness_ms_hist.observe(max(lateness, 0))
+
+
+_schedulers = {}
+
+
+def _get_scheduler(frame_duration: int) -> PacingScheduler:
+    """按帧时长返回当前事件循环中的调度器，首次调用时创建"""
+    scheduler = _schedulers.get(frame_duration)
+    if scheduler is None or scheduler._task.done():
+        scheduler = PacingScheduler(frame_duration)
+        _schedulers[frame_duration] = scheduler
+        register_stats("audio_pacing", get_pacing_stats)
+    return scheduler
+
+
+def close_pacing_schedulers():
+    """停止所有调度器，服务关闭时调用"""
+    for scheduler in list(_schedulers.values()):
+        scheduler.close()
+    _schedulers.clear()
+
+
+def get_pacing_stats() -> dict:
+    return {
+        f"{duration}ms": scheduler.get_stats()
+        for duration, scheduler in list(_schedulers.items())
+    }
+
 
 class AudioRateController:
     """
-    音频速率控制器 - 按照60ms帧时长精确控制音频发送
-    解决高并发下的时间累积误差问题
+    音频速率控制器 - 按照连接协商的帧时长精确控制音频发送
+    由 PacingScheduler 统一按节拍发送，不再为每个连接单独创建发送任务和定时器
     """
 
     def __init__(self, frame_duration=60):
@@ -20,33 +185,29 @@ class AudioRateController:
         """
         self.frame_duration = frame_duration
         self.queue = deque()
-        self.play_position = 0  # 虚拟播放位置（毫秒）
-        self.start_timestamp = None  # 开始时间戳（只读，不修改）
-        self.pending_send_task = None
+        self.play_position = 0  # 虚拟播放位置（已排期的帧数）
+        self.start_tick = None  # 首个音频包所在的节拍，由首个音频包设置
+        self.scheduled_tick = None  # 已排期等待的节拍，None 表示未排期
+        self.send_audio_callback = None
+        self.inflight = None  # 尚未完成的发送任务
         self.logger = logger
         self.queue_empty_event = asyncio.Event()  # 队列清空事件
         self.queue_empty_event.set()  # 初始为空状态
-        self.queue_has_data_event = asyncio.Event()  # 队列数据事件
+        self._scheduler = _get_scheduler(frame_duration)
 
     def reset(self):
         """重置控制器状态"""
-        if self.pending_send_task and not self.pending_send_task.done():
-            self.pending_send_task.cancel()
-            # 取消任务后，任务会在下次事件循环时清理，无需阻塞等待
-
+        self.stop_sending()
         self.queue.clear()
         self.play_position = 0
-        self.start_timestamp = None  # 由首个音频包设置
+        self.start_tick = None  # 由首个音频包设置
         # 相关事件处理
         self.queue_empty_event.set()
-        self.queue_has_data_event.clear()
 
     def add_audio(self, opus_packet):
         """添加音频包到队列"""
         self.queue.append(("audio", opus_packet))
-        # 相关事件处理
-        self.queue_empty_event.clear()
-        self.queue_has_data_event.set()
+        self._on_data()
 
     def add_message(self, message_callback):
         """
@@ -56,105 +217,133 @@ class AudioRateController:
             message_callback: 消息发送回调函数 async def()
         """
         self.queue.append(("message", message_callback))
-        # 相关事件处理
-        self.queue_empty_event.clear()
-        self.queue_has_data_event.set()
+        self._on_data()
 
-    def _get_elapsed_ms(self):
-        """获取已经过的时间（毫秒）"""
-        if self.start_timestamp is None:
-            return 0
-        return (time.monotonic() - self.start_timestamp) * 1000
-
-    async def check_queue(self, send_audio_callback):
+    def advance(self, frames: int):
+        """
+        整体提前 frames 帧发送后续音频，用于设备欠载时立即增加设备端的缓冲时长
+        尚未开始发送音频时不做处理
         """
-        检查队列并按时发送音频/消息
+        if self.start_tick is None or frames <= 0:
+            return
+        self.start_tick -= frames
+        # 重新计算到期时间，原来排期的节拍到期时会被跳过
+        if (
+            self.is_sending()
+            and self.queue
+            and self.inflight is None
+            and self.scheduled_tick != _READY
+        ):
+            self.scheduled_tick = _READY
+            self._scheduler.wake(self)
 
-        Args:
-            send_audio_callback: 发送音频的回调函数 async def(opus_packet)
+    def _on_data(self):
+        self.queue_empty_event.clear()
+        # 已排期或发送中的连接会在轮到时继续处理队列
+        if self.is_sending() and self.scheduled_tick is None and self.inflight is None:
+            self.scheduled_tick = _READY
+            self._scheduler.wake(self)
+
+    def service(self, now_tick: int):
+        """
+        发送队列中所有已到期的消息和音频包，下一个包未到期时排期到对应节拍
+        由调度器调用
         """
+        self.scheduled_tick = None
+        if not self.is_sending():
+            return
         while self.queue:
-            item = self.queue[0]
-            item_type = item[0]
+            item_type, payload = self.queue[0]
 
             if item_type == "message":
                 # 消息类型：立即发送，不占用播放时间
-                _, message_callback = item
                 self.queue.popleft()
-                try:
-                    await message_callback()
-                except Exception as e:
-                    self.logger.bind(tag=TAG).error(f"发送消息失败: {e}")
-                    raise
+                if not self._send(payload, (), "发送消息失败"):
+                    return
 
             elif item_type == "audio":
-                if self.start_timestamp is None:
-                    self.start_timestamp = time.monotonic()
-
-                _, opus_packet = item
-
-                # 循环等待直到时间到达
-                while True:
-                    # 计算时间差
-                    elapsed_ms = self._get_elapsed_ms()
-                    output_ms = self.play_position
-
-                    if elapsed_ms < output_ms:
-                        # 还不到发送时间，计算等待时长
-                        wait_ms = output_ms - elapsed_ms
-
-                        # 等待后继续检查（允许被中断）
-                        try:
-                            await asyncio.sleep(wait_ms / 1000)
-                        except asyncio.CancelledError:
-                            self.logger.bind(tag=TAG).debug("音频发送任务被取消")
-                            raise
-                        # 等待结束后重新检查时间（循环回到 while True）
-                    else:
-                        # 时间已到，跳出等待循环
-                        break
+                if self.start_tick is None:
+                    self.start_tick = now_tick
+                due_tick = self.start_tick + self.play_position
+                if due_tick > now_tick:
+                    # 还不到发送时间，排期到对应节拍
+                    self._scheduler.schedule(self, due_tick)
+                    return
 
                 # 时间已到，从队列移除并发送
                 self.queue.popleft()
-                self.play_position += self.frame_duration
-                try:
-                    await send_audio_callback(opus_packet)
-                except Exception as e:
-                    self.logger.bind(tag=TAG).error(f"发送音频失败: {e}")
-                    raise
-
-        # 队列处理完后清除事件
+                self.play_position += 1
+                self._scheduler.record_send(due_tick, now_tick)
+                if not self._send(self.send_audio_callback, (payload,), "发送音频失败"):
+                    return
+
+        # 队列处理完后设置事件
         self.queue_empty_event.set()
-        self.queue_has_data_event.clear()
+
+    def _send(self, callback, args, error_msg) -> bool:
+        """发送一条消息或一个音频包，返回能否继续处理队列"""
+        try:
+            task = _create_send_task(callback(*args))
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"{error_msg}: {e}")
+            self.stop_sending()
+            return False
+        if task.done():
+            return self._check_send(task, error_msg)
+        # 发送需要等待时暂停处理该连接，完成后再继续，其他连接不受影响
+        self.inflight = task
+        task.add_done_callback(lambda t: self._on_send_done(t, error_msg))
+        return False
+
+    def _check_send(self, task, error_msg) -> bool:
+        """检查已完成的发送任务，失败或被取消时停止发送"""
+        if task.cancelled():
+            self.logger.bind(tag=TAG).debug("音频发送任务被取消")
+            self.stop_sending()
+            return False
+        e = task.exception()
+        if e is not None:
+            self.logger.bind(tag=TAG).error(f"{error_msg}: {e}")
+            self.stop_sending()
+            return False
+        return True
+
+    def _on_send_done(self, task, error_msg):
+        if task is not self.inflight:
+            return
+        self.inflight = None
+        if not self._check_send(task, error_msg):
+            return
+        if not self.queue:
+            self.queue_empty_event.set()
+        else:
+            # 完成回调不在调度器任务中执行，直接继续处理队列
+            self.service(self._scheduler.current_tick())
 
     def start_sending(self, send_audio_callback):
         """
-        启动异步发送任务
+        开始由调度器发送队列中的数据
 
         Args:
-            send_audio_callback: 发送音频的回调函数
-
-        Returns:
-            asyncio.Task: 发送任务
+            send_audio_callback: 发送音频的回调函数 async def(opus_packet)
         """
+        if not self.is_sending():
+            self._scheduler.active_streams += 1
+        self.send_audio_callback = send_audio_callback
+        if self.queue:
+            self._on_data()
 
-        async def _send_loop():
-            try:
-                while True:
-                    # 等待队列数据事件，不轮询等待占用CPU
-                    await self.queue_has_data_event.wait()
-
-                    await self.check_queue(send_audio_callback)
-            except asyncio.CancelledError:
-                self.logger.bind(tag=TAG).debug("音频发送循环已停止")
-            except Exception as e:
-                self.logger.bind(tag=TAG).error(f"音频发送循环异常: {e}")
-
-        self.pending_send_task = asyncio.create_task(_send_loop())
-        return self.pending_send_task
+    def is_sending(self) -> bool:
+        """发送已开始且未因重置、中止或发送失败而停止"""
+        return self.send_audio_callback is not None
 
     def stop_sending(self):
-        """停止发送任务"""
-        if self.pending_send_task and not self.pending_send_task.done():
-            self.pending_send_task.cancel()
-            self.logger.bind(tag=TAG).debug("已取消音频发送任务")
+        """停止发送，已排期的节拍到期时会被跳过"""
+        if self.is_sending():
+            self._scheduler.active_streams -= 1
+            self.logger.bind(tag=TAG).debug("已停止音频发送")
+        self.send_audio_callback = None
+        self.scheduled_tick = None
+        if self.inflight is not None:
+            inflight, self.inflight = self.inflight, None
+            inflight.cancel()
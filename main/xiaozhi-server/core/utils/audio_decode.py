@@ -0,0 +1,292 @@
+"""
+进程内音频解码与重采样
+大部分TTS服务返回WAV或裸PCM，原先每句话都要启动一次ffmpeg才能转成16kHz单声道int16。
+这里直接解析WAV头部，并用NumPy多相滤波器把 22.05/24/44.1/48kHz 等采样率转换到16kHz，
+只有mp3、opus等压缩格式才交给pydub/ffmpeg。
+
+边下载边返回mp3的TTS服务用 StreamingAudioDecoder 在进程内逐帧解码（依赖PyAV），
+每收到一个完整的mp3帧就输出PCM，不必等整句下载完再启动ffmpeg。
+"""
+
+import struct
+from io import BytesIO
+from math import gcd
+
+import numpy as np
+
+from core.utils.metrics import Histogram, register_stats
+
+try:
+    import av
+
+    HAS_STREAM_DECODER = True
+except ImportError:
+    HAS_STREAM_DECODER = False
+
+TARGET_SAMPLE_RATE = 16000
+
+# 在进程内处理的格式，其余格式交给ffmpeg
+IN_PROCESS_TYPES = ("wav", "pcm")
+# 可以按数据块增量解码的格式（裸码流，不需要容器信息）
+STREAMING_TYPES = ("mp3", "aac")
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+_ZERO_CROSSINGS = 8  # 每侧保留的sinc过零点数，越大过渡带越窄
+_KAISER_BETA = 8.0
+_CUTOFF = 0.95  # 截止频率占目标采样率奈奎斯特频率的比例
+_BLOCK_SIZE = 8192  # 分块计算的输出采样数，限制中间矩阵的内存
+
+_filter_banks = {}
+
+
+def parse_wav(data: bytes):
+    """
+    解析WAV二进制数据，返回 (float32单声道采样, 采样率)
+    不支持的编码返回 None，由调用方改用ffmpeg
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset : offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+            if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # 扩展格式的实际编码在子格式GUID的前两个字节
+                sub_format = struct.unpack_from("<H", data, body + 24)[0]
+                fmt = (sub_format,) + fmt[1:]
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            # 流式返回的WAV长度字段常为0或0xFFFFFFFF，此时取到数据末尾
+            end = body + chunk_size
+            if chunk_size == 0 or end > len(data):
+                end = len(data)
+            return _pcm_to_float(data[body:end], fmt)
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _pcm_to_float(raw: bytes, fmt):
+    format_tag, channels, sample_rate, _, _, bits = fmt
+    if channels < 1:
+        return None
+    if format_tag == _WAVE_FORMAT_PCM and bits == 16:
+        samples = _frombuffer(raw, "<i2").astype(np.float32) / 32768.0
+    elif format_tag == _WAVE_FORMAT_PCM and bits == 8:
+        samples = (_frombuffer(raw, "u1").astype(np.float32) - 128.0) / 128.0
+    elif format_tag == _WAVE_FORMAT_PCM and bits == 24:
+        raw = raw[: len(raw) - len(raw) % 3]
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        value = np.where(value & 0x800000, value - (1 << 24), value)
+        samples = value.astype(np.float32) / 8388608.0
+    elif format_tag == _WAVE_FORMAT_PCM and bits == 32:
+        samples = _frombuffer(raw, "<i4").astype(np.float32) / 2147483648.0
+    elif format_tag == _WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        samples = _frombuffer(raw, "<f4").astype(np.float32)
+    else:
+        return None
+
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels]
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def _frombuffer(raw: bytes, dtype: str):
+    item = np.dtype(dtype).itemsize
+    return np.frombuffer(raw[: len(raw) - len(raw) % item], dtype=dtype)
+
+
+def _filter_bank(up: int, down: int) -> np.ndarray:
+    """Kaiser窗sinc低通滤波器按相位拆分，形状为 (up, 每相抽头数)"""
+    key = (up, down)
+    bank = _filter_banks.get(key)
+    if bank is not None:
+        return bank
+    taps = 2 * _ZERO_CROSSINGS * max(1, -(-down // up))
+    length = taps * up
+    # 截止频率按上采样后的采样率归一化
+    cutoff = _CUTOFF / max(up, down)
+    n = np.arange(length) - (length - 1) / 2
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(length, _KAISER_BETA) * up
+    bank = h.reshape(taps, up).T[:, ::-1].astype(np.float32)
+    bank = np.ascontiguousarray(bank)
+    _filter_banks[key] = bank
+    return bank
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int = TARGET_SAMPLE_RATE):
+    """多相滤波重采样，只计算需要输出的采样点"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    g = gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    bank = _filter_bank(up, down)
+    taps = bank.shape[1]
+    length = taps * up
+    delay = (length - 1) // 2
+
+    out_len = -(-len(samples) * up // down)
+    padded = np.concatenate(
+        [np.zeros(taps, np.float32), samples, np.zeros(taps, np.float32)]
+    )
+    out = np.empty(out_len, dtype=np.float32)
+    window = np.arange(taps - 1, -1, -1)
+    for start in range(0, out_len, _BLOCK_SIZE):
+        n = np.arange(start, min(start + _BLOCK_SIZE, out_len))
+        t = n * down + delay
+        phase = t % up
+        # 每个输出点对应的最新输入位置，加上左侧补零的偏移
+        newest = t // up + taps
+        idx = newest[:, None] - window[None, :]
+        out[start : start + len(n)] = np.einsum(
+            "ij,ij->i", padded[idx], bank[phase]
+        )
+    return out
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def decode_to_pcm16k(audio_bytes: bytes, file_type: str) -> bytes:
+    """
+    将音频数据转换为16kHz单声道16位PCM
+    WAV和裸PCM(16kHz单声道int16)在进程内处理，其余格式使用ffmpeg
+    """
+    file_type = (file_type or "").lower()
+    if file_type == "pcm":
+        return audio_bytes[: len(audio_bytes) - len(audio_bytes) % 2]
+    if file_type == "wav":
+        parsed = parse_wav(audio_bytes)
+        if parsed is not None:
+            samples, sample_rate = parsed
+            return to_pcm16(resample(samples, sample_rate))
+    return _decode_with_ffmpeg(audio_bytes, file_type)
+
+
+def _decode_with_ffmpeg(audio_bytes: bytes, file_type: str) -> bytes:
+    from pydub import AudioSegment
+
+    # -nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
+    audio = AudioSegment.from_file(
+        BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
+    )
+    audio = audio.set_channels(1).set_frame_rate(TARGET_SAMPLE_RATE).set_sample_width(2)
+    return audio.raw_data
+
+
+class StreamDecodeStats:
+    """流式解码的次数（含重试），以及从收到第一个数据块到送出第一帧Opus的耗时"""
+
+    def __init__(self):
+        self.streams = 0
+        self.first_frame_ms_hist = Histogram([5, 10, 20, 50, 100, 200, 500, 1000])
+
+    def snapshot(self) -> dict:
+        return {
+            "streams": self.streams,
+            "first_frame_ms_hist": self.first_frame_ms_hist.snapshot(),
+        }
+
+
+_stream_decode_stats = None
+
+
+def get_stream_decode_stats() -> StreamDecodeStats:
+    global _stream_decode_stats
+    if _stream_decode_stats is None:
+        _stream_decode_stats = StreamDecodeStats()
+        register_stats("tts_stream_decode", _stream_decode_stats.snapshot)
+    return _stream_decode_stats
+
+
+def supports_streaming(file_type: str) -> bool:
+    """该格式能否边接收边解码"""
+    return HAS_STREAM_DECODER and (file_type or "").lower() in STREAMING_TYPES
+
+
+class StreamingAudioDecoder:
+    """
+    有状态的流式解码器，每个音频流一个
+    push 送入任意切分的数据块，返回其中已完整的帧解码、重采样后的单声道int16 PCM；
+    不完整的帧留在解析器中，与下一个数据块拼接
+    """
+
+    def __init__(self, file_type: str, sample_rate: int = TARGET_SAMPLE_RATE):
+        if not supports_streaming(file_type):
+            raise ValueError(f"不支持流式解码的格式: {file_type}")
+        self.codec = av.CodecContext.create(file_type.lower(), "r")
+        # mp3文件开头可能带有ID3标签，需要先跳过
+        self._header = b"" if file_type.lower() == "mp3" else None
+        self.resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+        self.input_bytes = 0
+        self.output_bytes = 0
+
+    def push(self, chunk: bytes) -> bytes:
+        if not chunk:
+            return b""
+        self.input_bytes += len(chunk)
+        if self._header is not None:
+            chunk = self._skip_id3(chunk)
+            if not chunk:
+                return b""
+        return self._decode(self.codec.parse(chunk))
+
+    def _skip_id3(self, chunk: bytes) -> bytes:
+        """缓存开头的数据直到确定有无ID3v2标签，返回去掉标签后的数据"""
+        data = self._header + chunk
+        if len(data) < 10 and b"ID3".startswith(data[:3]):
+            self._header = data
+            return b""
+        if data[:3] != b"ID3":
+            self._header = None
+            return data
+        # 标签长度为4个字节的同步安全整数，不含10字节的头部
+        size = 10 + (
+            (data[6] & 0x7F) << 21
+            | (data[7] & 0x7F) << 14
+            | (data[8] & 0x7F) << 7
+            | (data[9] & 0x7F)
+        )
+        if len(data) < size:
+            self._header = data
+            return b""
+        # 标签之后可能紧跟另一个标签
+        self._header = b""
+        return self._skip_id3(data[size:])
+
+    def flush(self) -> bytes:
+        """流结束：取出解析器、解码器和重采样器中剩余的数据"""
+        pcm = self._decode(self.codec.parse(None))
+        pcm += self._decode([None])
+        pcm += self._resample(None)
+        return pcm
+
+    def _decode(self, packets) -> bytes:
+        pcm = b""
+        for packet in packets:
+            try:
+                frames = self.codec.decode(packet)
+            except av.error.InvalidDataError:
+                # 损坏的帧直接丢弃，不影响后续帧
+                continue
+            for frame in frames:
+                pcm += self._resample(frame)
+        return pcm
+
+    def _resample(self, frame) -> bytes:
+        pcm = b""
+        for out in self.resampler.resample(frame):
+            pcm += out.to_ndarray().tobytes()
+        self.output_bytes += len(pcm)
+        return pcm
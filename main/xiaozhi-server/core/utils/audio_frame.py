@@ -0,0 +1,57 @@
+"""
+Opus音频帧时长
+设备在hello消息的 audio_params.frame_duration 中声明音频帧时长：低延迟设备可以用20ms帧，
+带宽受限的设备用120ms帧，减少包数和每个包的头部开销。
+- 下行：TTS编码、提示音、缓存和发送节拍都按连接协商的帧时长
+- 上行：Opus包自带时长，解码时按最长帧分配缓冲区即可解码任意帧时长的包，
+  只有丢包补偿、前导音频等按包计数的地方需要知道一帧的长度
+"""
+
+DEFAULT_FRAME_DURATION = 60
+SUPPORTED_FRAME_DURATIONS = (20, 40, 60, 120)
+MAX_FRAME_DURATION = 120  # Opus单个包的最大时长
+
+# TOC字节中 config 对应的单帧时长（微秒），见 RFC 6716 3.1 节
+_CONFIG_FRAME_US = (
+    [10000, 20000, 40000, 60000] * 3  # SILK
+    + [10000, 20000] * 2  # Hybrid
+    + [2500, 5000, 10000, 20000] * 4  # CELT
+)
+
+
+def negotiate_frame_duration(requested) -> int:
+    """取设备请求的帧时长，不支持时使用默认的60ms"""
+    try:
+        frame_duration = int(requested)
+    except (TypeError, ValueError):
+        return DEFAULT_FRAME_DURATION
+    if frame_duration in SUPPORTED_FRAME_DURATIONS:
+        return frame_duration
+    return DEFAULT_FRAME_DURATION
+
+
+def frame_samples(frame_duration: int, sample_rate: int = 16000) -> int:
+    """一帧的采样点数"""
+    return sample_rate * frame_duration // 1000
+
+
+def max_decode_samples(sample_rate: int = 16000) -> int:
+    """Opus解码缓冲区的采样点数，足以容纳任意时长的包"""
+    return frame_samples(MAX_FRAME_DURATION, sample_rate)
+
+
+def packet_duration_ms(packet) -> float:
+    """根据TOC字节计算一个Opus包的时长（毫秒），无法解析时返回0"""
+    if not packet:
+        return 0
+    toc = packet[0]
+    code = toc & 0x03
+    if code == 0:
+        frames = 1
+    elif code in (1, 2):
+        frames = 2
+    elif len(packet) > 1:
+        frames = packet[1] & 0x3F
+    else:
+        return 0
+    return frames * _CONFIG_FRAME_US[toc >> 3] / 1000
@@ -0,0 +1,271 @@
+"""
+连接级音频接入缓冲
+每个上行音频包只解码一次，解码得到的PCM同时供VAD、ASR、声纹识别和录音保存使用，
+避免VAD解码一次、ASR识别时再整段解码一次
+"""
+
+import threading
+from collections import deque
+
+import numpy as np
+import opuslib_next
+from config.logger import setup_logging
+from core.utils.metrics import register_stats
+from core.utils.audio_frame import (
+    DEFAULT_FRAME_DURATION,
+    frame_samples,
+    max_decode_samples,
+)
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+VAD_FRAME_SAMPLES = 512
+PRE_ROLL_MS = 600  # 静音期间保留的前导音频时长
+PRE_ROLL_PACKETS = PRE_ROLL_MS // DEFAULT_FRAME_DURATION  # 默认帧时长下的前导音频包数
+
+
+def pre_roll_packets(frame_duration: int) -> int:
+    """按帧时长换算前导音频的包数"""
+    return max(1, round(PRE_ROLL_MS / frame_duration))
+
+
+class AudioPacketBuffer(deque):
+    """
+    ASR音频包缓存：说话期间保存整句的音频包，静音期间只保留最近几个包作为前导音频。
+    静音时原地从头部弹出，不再每个包都切片生成新列表
+    """
+
+    # 前导音频包数，随连接协商的帧时长调整
+    pre_roll = PRE_ROLL_PACKETS
+
+    def keep_last(self, count: int = None):
+        if count is None:
+            count = self.pre_roll
+        while len(self) > count:
+            self.popleft()
+
+    def copy(self) -> list:
+        return list(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        return super().__getitem__(index)
+
+
+class IngestQueueStats:
+    """各连接ASR音频队列的深度和丢弃统计"""
+
+    def __init__(self):
+        self._queues = {}
+        self._lock = threading.Lock()
+        # 已关闭连接的累计值
+        self.closed_dropped = 0
+        self.closed_over_limit = 0
+
+    def add(self, session_id, audio_queue):
+        with self._lock:
+            self._queues[session_id] = audio_queue
+
+    def remove(self, session_id):
+        with self._lock:
+            audio_queue = self._queues.pop(session_id, None)
+        if audio_queue is not None:
+            self.closed_dropped += audio_queue.dropped
+            self.closed_over_limit += audio_queue.over_limit
+
+    def snapshot(self) -> dict:
+        """只输出汇总值，指标接口不需要认证，不能暴露单个连接和设备的信息"""
+        with self._lock:
+            queues = list(self._queues.values())
+        dropped = self.closed_dropped
+        over_limit = self.closed_over_limit
+        depth_total = 0
+        max_depth = 0
+        for audio_queue in queues:
+            stats = audio_queue.get_stats()
+            dropped += stats["dropped"]
+            over_limit += stats["over_limit"]
+            depth_total += stats["depth"]
+            max_depth = max(max_depth, stats["max_depth"])
+        return {
+            "connections": len(queues),
+            "depth_total": depth_total,
+            "max_depth": max_depth,
+            "dropped_total": dropped,
+            "over_limit_total": over_limit,
+        }
+
+
+_ingest_stats = None
+
+
+def get_ingest_stats() -> IngestQueueStats:
+    global _ingest_stats
+    if _ingest_stats is None:
+        _ingest_stats = IngestQueueStats()
+        register_stats("audio_ingest", _ingest_stats.snapshot)
+    return _ingest_stats
+
+
+class PcmIngestBuffer:
+    """
+    按绝对字节偏移管理一段连续的PCM数据：
+    - VAD通过读游标按512采样点取帧，不再对缓冲区反复切片
+    - ASR当前语音段从 segment_start 开始，静音时只保留最近若干个包作为前导音频
+    - 语音段起点之前的数据不再需要，直接从缓冲区头部删除
+    """
+
+    def __init__(self, max_seconds: int = 60):
+        self._decoder = None
+        self._buf = bytearray()
+        self._base = 0  # _buf[0] 对应的绝对偏移
+        self._vad_pos = 0
+        self._segment_start = 0
+        self._packet_starts = deque()  # 当前语音段内每个包的起始偏移
+        # 流式ASR不会主动截断语音段，这里兜底限制缓冲区长度
+        self._max_bytes = max_seconds * SAMPLE_RATE * 2
+        # 丢包补偿时生成的采样点数，为一帧的长度
+        self._conceal_samples = frame_samples(DEFAULT_FRAME_DURATION, SAMPLE_RATE)
+
+    def set_frame_duration(self, frame_duration: int):
+        self._conceal_samples = frame_samples(frame_duration, SAMPLE_RATE)
+
+    @property
+    def _end(self) -> int:
+        return self._base + len(self._buf)
+
+    def push(self, audio: bytes, audio_format: str = "opus") -> int:
+        """写入一个上行音频包，返回解码得到的PCM字节数"""
+        self._packet_starts.append(self._end)
+        if audio_format == "pcm":
+            pcm = audio
+        else:
+            try:
+                if self._decoder is None:
+                    # 每个连接独立的解码器，避免多设备共用一个解码器导致状态串扰
+                    self._decoder = opuslib_next.Decoder(SAMPLE_RATE, 1)
+                # 包自带时长，按最长帧分配缓冲区
+                pcm = self._decoder.decode(audio, max_decode_samples(SAMPLE_RATE))
+            except opuslib_next.OpusError as e:
+                logger.bind(tag=TAG).info(f"解码错误: {e}")
+                return 0
+        self._buf.extend(pcm)
+
+        overflow = self._end - self._segment_start - self._max_bytes
+        if overflow > 0:
+            self._segment_start += overflow + (overflow & 1)
+            while self._packet_starts and self._packet_starts[0] < self._segment_start:
+                self._packet_starts.popleft()
+            self._compact()
+        return len(pcm)
+
+    def conceal(self) -> int:
+        """
+        丢包补偿：向解码器送入空包（即 opus_decode 的 data=NULL），
+        由解码器根据历史状态生成一帧PCM。补偿帧并入上一个包，不计入包数
+        """
+        if self._decoder is None:
+            pcm = bytes(self._conceal_samples * 2)
+        else:
+            try:
+                pcm = self._decoder.decode(b"", self._conceal_samples)
+            except opuslib_next.OpusError as e:
+                logger.bind(tag=TAG).info(f"丢包补偿失败: {e}")
+                return 0
+        self._buf.extend(pcm)
+        return len(pcm)
+
+    def vad_frames(self, frame_samples: int = VAD_FRAME_SAMPLES) -> list:
+        """取出所有未处理的完整帧，转换为float32数组"""
+        frame_bytes = frame_samples * 2
+        available = (self._end - self._vad_pos) // frame_bytes
+        if available <= 0:
+            return []
+        offset = self._vad_pos - self._base
+        samples = np.frombuffer(
+            self._buf, dtype=np.int16, count=available * frame_samples, offset=offset
+        )
+        frames = list(
+            (samples.astype(np.float32) / 32768.0).reshape(available, frame_samples)
+        )
+        del samples  # 释放对bytearray的引用，之后才能调整其大小
+        self._vad_pos += available * frame_bytes
+        self._compact()
+        return frames
+
+    def reset_vad(self):
+        """丢弃VAD尚未处理的不完整帧"""
+        self._vad_pos = self._end
+        self._compact()
+
+    def keep_last_packets(self, count: int):
+        """静音期间只保留最近count个包作为下一句话的前导音频"""
+        while len(self._packet_starts) > count:
+            self._packet_starts.popleft()
+        if self._packet_starts:
+            self._segment_start = self._packet_starts[0]
+        else:
+            self._segment_start = self._end
+        self._compact()
+
+    def take_segment(self) -> bytes:
+        """取出当前语音段的PCM数据，并从缓冲区末尾开始新的语音段"""
+        start = self._segment_start - self._base
+        with memoryview(self._buf) as view:
+            pcm = bytes(view[start:])
+        self.clear_segment()
+        return pcm
+
+    def clear_segment(self):
+        self._segment_start = self._end
+        self._packet_starts.clear()
+        self._compact()
+
+    def discard_vad_read(self):
+        """
+        ASR不读取PCM时每个包之后调用：丢弃VAD已处理的数据，只保留不足一帧的部分；
+        手动模式下VAD不读取数据，全部丢弃
+        """
+        self._segment_start = max(self._segment_start, self._vad_pos)
+        if self._vad_pos < self._end - VAD_FRAME_SAMPLES * 2:
+            self._segment_start = self._end
+        self._packet_starts.clear()
+        self._compact()
+
+    def segment_size(self) -> int:
+        return self._end - self._segment_start
+
+    @property
+    def segment_start(self) -> int:
+        return self._segment_start
+
+    def size_since(self, pos: int) -> int:
+        """当前语音段中从绝对偏移pos到末尾的字节数"""
+        return self._end - max(pos, self._segment_start)
+
+    def read_since(self, pos: int):
+        """
+        读取当前语音段中从绝对偏移pos到末尾的PCM，供流式识别增量送入
+
+        Returns:
+            (pcm bytes, 新的偏移)
+        """
+        start = max(pos, self._segment_start) - self._base
+        with memoryview(self._buf) as view:
+            pcm = bytes(view[start:])
+        return pcm, self._end
+
+    def _compact(self):
+        # VAD总是先于ASR读取同一个包，正常情况下读游标不会落后于语音段起点；
+        # 手动模式下VAD不读取数据，落后的部分直接跳过
+        keep_from = self._segment_start
+        if self._vad_pos < keep_from:
+            self._vad_pos = keep_from
+        drop = keep_from - self._base
+        if drop > 0:
+            # 从bytearray头部删除只移动起始指针，不复制数据
+            del self._buf[:drop]
+            self._base = keep_from
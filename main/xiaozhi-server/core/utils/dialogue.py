@@ -2,6 +2,7 @@ import uuid
 import re
 from typing import List, Dict
 from datetime import datetime
+from core.utils.dialogue_budget import estimate_tokens
 
 
 class Message:
@@ -23,6 +24,8 @@ class Message:
 class Dialogue:
     def __init__(self):
         self.dialogue: List[Message] = []
+        # 对话上下文的token预算（DialogueBudget），为 None 时每次发送全部历史
+        self.budget = None
         # 获取当前时间
         self.current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -110,9 +113,18 @@ class Dialogue:
                 )
             dialogue.append({"role": "system", "content": enhanced_system_prompt})
 
-        # 添加用户和助手的对话
-        for m in self.dialogue:
-            if m.role != "system":  # 跳过原始的系统消息
-                self.getMessages(m, dialogue)
+        # 添加用户和助手的对话，跳过原始的系统消息
+        history = [m for m in self.dialogue if m.role != "system"]
+        if self.budget is not None:
+            system_tokens = estimate_tokens(dialogue[0]["content"]) if dialogue else 0
+            summary, history = self.budget.select(history, system_tokens)
+            if summary:
+                summary_prompt = f"<dialogue_summary>\n更早对话的摘要：{summary}\n</dialogue_summary>"
+                if dialogue:
+                    dialogue[0]["content"] += f"\n\n{summary_prompt}"
+                else:
+                    dialogue.append({"role": "system", "content": summary_prompt})
+        for m in history:
+            self.getMessages(m, dialogue)
 
         return dialogue
@@ -0,0 +1,312 @@
+"""
+对话上下文的token预算
+连接存活期间对话历史不断增长，每轮以及每次工具调用后的递归请求都会把全部历史发给LLM。
+这里在构造请求时按预算选取历史：
+- 系统提示词始终保留，最近 keep_turns 轮原样保留（一轮从用户消息开始，包含其后的工具调用和结果，
+  按轮取舍，工具调用与工具结果不会被拆开）
+- 更早的轮次折叠为滚动摘要放在系统提示词中，摘要由后台线程调用LLM生成，不占用回复的关键路径
+- 摘要尚未覆盖的旧轮次在预算允许时原样保留，从最近的开始
+token数用本地规则估计，不依赖分词器和网络
+"""
+
+import re
+import json
+import time
+import threading
+from typing import Callable, List, Optional
+
+from config.logger import setup_logging
+from core.utils.metrics import Histogram, register_stats
+
+TAG = __name__
+logger = setup_logging()
+
+MESSAGE_OVERHEAD = 4  # 每条消息的角色、分隔符等固定开销
+SUMMARY_RETRY_SECONDS = 30  # 摘要失败后的重试间隔
+TOOL_RESULT_CHARS = 200  # 生成摘要时每条工具结果最多保留的字数
+
+_CJK = re.compile(
+    r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]"
+)
+_LETTERS = re.compile(r"[A-Za-z]+")
+_DIGITS = re.compile(r"\d+")
+_SYMBOLS = re.compile(r"[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    按常见BPE分词器的经验估计token数：中日韩字符每字约1个，
+    英文单词每4个字母约1个，数字每3位约1个，其余符号各1个
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    if cjk:
+        text = _CJK.sub(" ", text)
+    tokens = cjk + len(_SYMBOLS.findall(text))
+    tokens += sum((len(word) + 3) // 4 for word in _LETTERS.findall(text))
+    tokens += sum((len(digits) + 2) // 3 for digits in _DIGITS.findall(text))
+    return tokens
+
+
+def estimate_message_tokens(message) -> int:
+    """估计一条 Message 的token数，工具调用按其JSON计算"""
+    tokens = MESSAGE_OVERHEAD + estimate_tokens(message.content)
+    if message.tool_calls is not None:
+        tokens += estimate_tokens(json.dumps(message.tool_calls, ensure_ascii=False))
+    return tokens
+
+
+def split_turns(messages: list) -> List[list]:
+    """按用户消息把非系统消息分成轮次，第一条用户消息之前的消息（如欢迎语）自成一轮"""
+    turns = []
+    for message in messages:
+        if message.role == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def render_transcript(turns: List[list]) -> str:
+    """把若干轮对话整理成供摘要使用的文本"""
+    lines = []
+    for turn in turns:
+        for message in turn:
+            if message.tool_calls is not None:
+                calls = [
+                    f"{call.get('function', {}).get('name', '')}"
+                    f"({call.get('function', {}).get('arguments', '')})"
+                    for call in message.tool_calls
+                    if isinstance(call, dict)
+                ]
+                lines.append(f"助手调用工具: {'，'.join(calls)}")
+            elif message.role == "tool":
+                lines.append(f"工具结果: {(message.content or '')[:TOOL_RESULT_CHARS]}")
+            elif message.role == "user":
+                lines.append(f"用户: {message.content}")
+            elif message.content:
+                lines.append(f"助手: {message.content}")
+    return "\n".join(lines)
+
+
+SUMMARY_PROMPT = (
+    "你负责压缩一段语音助手与用户的对话历史。请把【已有摘要】和【新的对话】合并为一份新的摘要，"
+    "保留用户的身份、偏好、提到的关键事实、做出的约定和尚未完成的事项，以及工具查询得到的重要结果，"
+    "省略寒暄和重复内容。用第三人称陈述，不超过{max_chars}字，只输出摘要本身。"
+)
+
+
+# 只有普通对话补全接口才用来生成摘要；homeassistant、dify、coze、fastgpt、AliBL 等智能体/应用类接口
+# 会把收到的对话当作指令执行，或不支持额外参数，这类LLM下超出预算的旧轮次直接丢弃
+SUMMARY_LLM_TYPES = ("openai", "ollama", "gemini", "xinference")
+
+
+def can_summarize(llm) -> bool:
+    """按提供者模块名判断LLM是否为普通对话补全接口"""
+    return llm is not None and type(llm).__module__.split(".")[-1] in SUMMARY_LLM_TYPES
+
+
+def summarize_with_llm(llm, previous: str, transcript: str, max_chars: int) -> str:
+    """调用LLM把已有摘要与新的对话合并，失败时抛出异常"""
+    user_prompt = f"【已有摘要】\n{previous or '无'}\n\n【新的对话】\n{transcript}"
+    result = llm.response_no_stream(
+        SUMMARY_PROMPT.format(max_chars=max_chars), user_prompt
+    )
+    result = (result or "").strip()
+    # response_no_stream 出错时返回提示文本而不是抛出异常
+    if not result or result.startswith("【LLM服务响应异常】"):
+        raise RuntimeError(f"摘要生成失败: {result}")
+    return result
+
+
+class DialogueBudgetStats:
+    """构造请求的次数、估计的请求token数，以及后台摘要的次数和耗时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.trimmed_builds = 0
+        self.saved_tokens = 0
+        self.summaries = 0
+        self.summary_failures = 0
+        self.prompt_tokens_hist = Histogram([500, 1000, 2000, 4000, 8000, 16000])
+        self.summary_ms_hist = Histogram([500, 1000, 2000, 5000, 10000, 30000])
+
+    def on_build(self, prompt_tokens: int, full_tokens: int):
+        with self._lock:
+            self.builds += 1
+            if full_tokens > prompt_tokens:
+                self.trimmed_builds += 1
+                self.saved_tokens += full_tokens - prompt_tokens
+            self.prompt_tokens_hist.observe(prompt_tokens)
+
+    def on_summary(self, ok: bool, elapsed_ms: float):
+        with self._lock:
+            if ok:
+                self.summaries += 1
+                self.summary_ms_hist.observe(elapsed_ms)
+            else:
+                self.summary_failures += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "builds": self.builds,
+                "trimmed_builds": self.trimmed_builds,
+                "saved_tokens": self.saved_tokens,
+                "summaries": self.summaries,
+                "summary_failures": self.summary_failures,
+                "prompt_tokens_hist": self.prompt_tokens_hist.snapshot(),
+                "summary_ms_hist": self.summary_ms_hist.snapshot(),
+            }
+
+
+_budget_stats = None
+
+
+def get_budget_stats() -> DialogueBudgetStats:
+    global _budget_stats
+    if _budget_stats is None:
+        _budget_stats = DialogueBudgetStats()
+        register_stats("dialogue_budget", _budget_stats.snapshot)
+    return _budget_stats
+
+
+class DialogueBudget:
+    """
+    每个连接一个，select 在构造LLM请求时调用，摘要在 submit 提交的后台任务中生成
+    summarize(已有摘要, 对话文本, 最大字数) 返回新的摘要，为 None 时只按预算丢弃旧轮次
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        keep_turns: int = 4,
+        summary_batch_turns: int = 4,
+        summary_max_chars: int = 300,
+        summarize: Optional[Callable[[str, str, int], str]] = None,
+        submit: Optional[Callable] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.keep_turns = max(keep_turns, 1)
+        self.summary_batch_turns = max(summary_batch_turns, 1)
+        self.summary_max_chars = summary_max_chars
+        self.summarize = summarize
+        self.submit = submit
+        self.stats = get_budget_stats()
+        self.summary = ""
+        # 摘要之后第一轮的第一条消息，按 uniq_id 定位，不受回滚和删除工具消息影响
+        self._boundary = None
+        self._lock = threading.Lock()
+        self._summarizing = False
+        self._retry_at = 0.0
+        # 消息写入对话后内容不再变化，按 uniq_id 缓存估计的token数
+        self._token_cache = {}
+
+    @classmethod
+    def from_config(cls, config: dict, summarize=None, submit=None):
+        """按 dialogue_budget 配置创建，max_tokens 未配置或为0时返回 None"""
+        budget_config = config.get("dialogue_budget") or {}
+        max_tokens = int(budget_config.get("max_tokens") or 0)
+        if max_tokens <= 0:
+            return None
+        if not budget_config.get("summary", True):
+            summarize = None
+        return cls(
+            max_tokens,
+            keep_turns=int(budget_config.get("keep_turns") or 4),
+            summary_batch_turns=int(budget_config.get("summary_batch_turns") or 4),
+            summary_max_chars=int(budget_config.get("summary_max_chars") or 300),
+            summarize=summarize,
+            submit=submit,
+        )
+
+    def select(self, messages: list, system_tokens: int):
+        """
+        从非系统消息中选取本次请求的历史，返回 (摘要, 消息列表)
+        system_tokens 为系统提示词（不含摘要）的估计token数
+        """
+        turns = split_turns(messages)
+        with self._lock:
+            summary, boundary = self.summary, self._boundary
+        start = 0
+        if boundary is not None:
+            start = next(
+                (i for i, turn in enumerate(turns) if turn[0].uniq_id == boundary), 0
+            )
+        recent_start = max(start, len(turns) - self.keep_turns)
+        older = turns[start:recent_start]
+        recent = turns[recent_start:]
+
+        turn_tokens = [sum(self._message_tokens(m) for m in turn) for turn in turns]
+        if len(self._token_cache) > 2 * len(messages) + 64:
+            # 回滚或删除的消息不再出现，只保留当前对话中的
+            current = {m.uniq_id for m in messages}
+            self._token_cache = {
+                k: v for k, v in self._token_cache.items() if k in current
+            }
+        used = system_tokens
+        if summary:
+            used += MESSAGE_OVERHEAD + estimate_tokens(summary)
+        # 最近的轮次原样保留，超出预算时从最早的开始丢弃，至少保留当前一轮
+        first = recent_start
+        recent_total = sum(turn_tokens[recent_start:])
+        while first < len(turns) - 1 and used + recent_total > self.max_tokens:
+            recent_total -= turn_tokens[first]
+            first += 1
+        used += recent_total
+        # 摘要未覆盖的旧轮次从最近的开始，预算内原样保留
+        kept = first
+        if first == recent_start:
+            while kept > start and used + turn_tokens[kept - 1] <= self.max_tokens:
+                kept -= 1
+                used += turn_tokens[kept]
+
+        self.stats.on_build(used, system_tokens + sum(turn_tokens))
+        if older and (len(older) >= self.summary_batch_turns or kept > start):
+            self._schedule_summary(summary, older, recent[0][0].uniq_id if recent else None)
+        return summary, [m for turn in turns[kept:] for m in turn]
+
+    def _message_tokens(self, message) -> int:
+        tokens = self._token_cache.get(message.uniq_id)
+        if tokens is None:
+            tokens = estimate_message_tokens(message)
+            self._token_cache[message.uniq_id] = tokens
+        return tokens
+
+    def _schedule_summary(self, previous: str, turns: List[list], boundary):
+        if self.summarize is None or self.submit is None or boundary is None:
+            return
+        with self._lock:
+            if self._summarizing or time.monotonic() < self._retry_at:
+                return
+            self._summarizing = True
+        try:
+            self.submit(self._run_summary, previous, turns, boundary)
+        except Exception as e:
+            with self._lock:
+                self._summarizing = False
+            logger.bind(tag=TAG).warning(f"提交对话摘要任务失败: {e}")
+
+    def _run_summary(self, previous: str, turns: List[list], boundary):
+        start = time.monotonic()
+        try:
+            summary = self.summarize(
+                previous, render_transcript(turns), self.summary_max_chars
+            )
+        except Exception as e:
+            self.stats.on_summary(False, 0)
+            logger.bind(tag=TAG).warning(f"对话摘要生成失败: {e}")
+            with self._lock:
+                self._summarizing = False
+                self._retry_at = time.monotonic() + SUMMARY_RETRY_SECONDS
+            return
+        elapsed_ms = (time.monotonic() - start) * 1000
+        self.stats.on_summary(True, elapsed_ms)
+        with self._lock:
+            self.summary = summary
+            self._boundary = boundary
+            self._summarizing = False
+        logger.bind(tag=TAG).debug(
+            f"对话摘要已更新，折叠{len(turns)}轮，耗时{elapsed_ms:.0f}ms: {summary}"
+        )
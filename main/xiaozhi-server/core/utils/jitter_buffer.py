@@ -0,0 +1,201 @@
+"""
+MQTT网关音频抖动缓冲
+经UDP转发的设备音频会乱序、迟到和丢包，这里按设备时间戳把音频包放入小顶堆，
+延迟 playout_delay_ms 后按顺序输出；中间缺失的帧输出 None，由解码器做丢包补偿
+"""
+
+import heapq
+
+from config.logger import setup_logging
+from core.utils.metrics import Histogram, register_stats
+
+TAG = __name__
+logger = setup_logging()
+
+TIMESTAMP_MODULO = 1 << 32  # 网关头部中的时间戳为32位无符号整数(毫秒)
+RESYNC_THRESHOLD_MS = 10_000  # 时间戳回退超过该值视为设备重新开始计时
+
+
+class JitterBufferStats:
+    """所有连接的抖动缓冲累计指标"""
+
+    def __init__(self):
+        self.received = 0
+        self.late = 0  # 输出位置已过，只能丢弃
+        self.lost = 0  # 一直未到达，已做丢包补偿
+        self.reordered = 0  # 晚于后续包到达，但仍在缓冲期内被排回正确位置
+        self.duplicate = 0
+        self.resync = 0  # 时间戳跳变或长时间中断后重新对齐
+        self.overflow = 0  # 缓冲区满被提前输出
+        self.depth_hist = Histogram([0, 1, 2, 4, 8, 16, 32])
+
+    def snapshot(self) -> dict:
+        return {
+            "received": self.received,
+            "late": self.late,
+            "lost": self.lost,
+            "reordered": self.reordered,
+            "duplicate": self.duplicate,
+            "resync": self.resync,
+            "overflow": self.overflow,
+            "loss_rate": (self.lost / (self.received + self.lost))
+            if self.received + self.lost
+            else 0,
+            "depth_hist": self.depth_hist.snapshot(),
+        }
+
+
+_jitter_stats = None
+
+
+def get_jitter_stats() -> JitterBufferStats:
+    global _jitter_stats
+    if _jitter_stats is None:
+        _jitter_stats = JitterBufferStats()
+        register_stats("jitter_buffer", _jitter_stats.snapshot)
+    return _jitter_stats
+
+
+class JitterBuffer:
+    """
+    - push 写入一个音频包，pop_ready 取出已到输出时间的包，缺失的帧以 None 表示
+    - 32位时间戳展开为连续的整数，回绕后仍能正确排序
+    - 输出时间 = 包的设备时间戳 + 设备与服务器的时钟差 + playout_delay_ms，
+      时钟差取观察到的最小值，即网络最快的那个包
+    - 缺口超过 max_conceal_frames 帧视为设备停止发送（如播放TTS期间），不做补偿
+    """
+
+    def __init__(
+        self,
+        playout_delay_ms: int = 120,
+        frame_ms: int = 60,
+        max_packets: int = 32,
+        max_conceal_frames: int = 5,
+    ):
+        self.playout_delay_ms = playout_delay_ms
+        self.frame_ms = frame_ms
+        self.max_packets = max_packets
+        self.max_conceal_frames = max_conceal_frames
+        self.stats = get_jitter_stats()
+
+        self._heap = []  # (展开后的时间戳, 包)
+        self._queued = set()
+        self._last_raw = None
+        self._last_ext = 0
+        self._max_ext = None  # 已收到的最大时间戳，用于判断乱序
+        self._next_ext = None  # 下一个应输出的时间戳
+        self._clock_offset = None  # 服务器时间 - 设备时间 的最小值
+        self._carry = []  # 重新对齐前尚未取走的输出
+
+        # 本连接的计数，连接关闭时输出
+        self.received = 0
+        self.late = 0
+        self.lost = 0
+        self.reordered = 0
+
+    def _unwrap(self, timestamp: int) -> int:
+        if self._last_raw is None:
+            self._last_raw = timestamp
+            self._last_ext = timestamp
+            return timestamp
+        diff = (timestamp - self._last_raw) % TIMESTAMP_MODULO
+        if diff >= TIMESTAMP_MODULO // 2:
+            diff -= TIMESTAMP_MODULO
+        ext = self._last_ext + diff
+        if diff > 0:
+            self._last_raw = timestamp
+            self._last_ext = ext
+        return ext
+
+    def _resync(self):
+        self.stats.resync += 1
+        # 缓冲中的包仍按原来的顺序输出
+        self._carry.extend(self.flush())
+        self._last_raw = None
+        self._max_ext = None
+        self._next_ext = None
+        self._clock_offset = None
+
+    def push(self, timestamp: int, payload: bytes, now_ms: float):
+        ext = self._unwrap(timestamp)
+        if self._max_ext is not None and ext < self._max_ext - RESYNC_THRESHOLD_MS:
+            # 时间戳大幅回退，设备重新开始计时
+            self._resync()
+            ext = self._unwrap(timestamp)
+        elif (
+            self._max_ext is not None
+            and ext - self._max_ext > self.max_conceal_frames * self.frame_ms
+        ):
+            # 设备停止发送一段时间后重新开始，按新的一段重新估计时钟差
+            self._clock_offset = None
+
+        self.received += 1
+        self.stats.received += 1
+
+        if self._next_ext is not None and ext < self._next_ext - self.frame_ms // 2:
+            self.late += 1
+            self.stats.late += 1
+            return
+        if ext in self._queued:
+            self.stats.duplicate += 1
+            return
+
+        if self._max_ext is not None and ext < self._max_ext:
+            self.reordered += 1
+            self.stats.reordered += 1
+        else:
+            self._max_ext = ext
+
+        offset = now_ms - ext
+        if self._clock_offset is None or offset < self._clock_offset:
+            self._clock_offset = offset
+
+        heapq.heappush(self._heap, (ext, payload))
+        self._queued.add(ext)
+        self.stats.depth_hist.observe(len(self._heap))
+
+    def pop_ready(self, now_ms: float) -> list:
+        """按顺序取出已到输出时间的包，缺失的帧为 None"""
+        out, self._carry = self._carry, []
+        while self._heap:
+            ext, payload = self._heap[0]
+            due = ext + self._clock_offset + self.playout_delay_ms
+            if now_ms < due:
+                if len(self._heap) <= self.max_packets:
+                    break
+                self.stats.overflow += 1
+            heapq.heappop(self._heap)
+            self._queued.discard(ext)
+            self._emit(ext, payload, out)
+        return out
+
+    def flush(self) -> list:
+        """不再等待，输出缓冲区中的全部包"""
+        out, self._carry = self._carry, []
+        while self._heap:
+            ext, payload = heapq.heappop(self._heap)
+            self._emit(ext, payload, out)
+        self._queued.clear()
+        return out
+
+    def next_due_ms(self):
+        """最早一个包的输出时间，缓冲区为空时返回 None"""
+        if not self._heap:
+            return None
+        return self._heap[0][0] + self._clock_offset + self.playout_delay_ms
+
+    def _emit(self, ext: int, payload: bytes, out: list):
+        if self._next_ext is not None:
+            gap = round((ext - self._next_ext) / self.frame_ms)
+            if 0 < gap <= self.max_conceal_frames:
+                self.lost += gap
+                self.stats.lost += gap
+                out.extend([None] * gap)
+        out.append(payload)
+        self._next_ext = ext + self.frame_ms
+
+    def summary(self) -> str:
+        return (
+            f"收到{self.received}包, 迟到丢弃{self.late}, "
+            f"丢失补偿{self.lost}, 乱序{self.reordered}"
+        )
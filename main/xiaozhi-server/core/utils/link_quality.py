@@ -0,0 +1,191 @@
+"""
+设备下行链路质量估计，用于按连接调整TTS音频的预缓冲包数
+原先每句话都先直接发送固定5个包再按帧率发送：局域网设备首包后要多等约200ms的缓冲才开始出声，
+经MQTT网关、4G网络的设备又可能不够，播放中途断音。这里按连接测量：
+- RTT：连接建立时以及每轮回复开始时（距上次超过 probe_interval 秒）发送websocket ping，
+  按TCP的方式平滑得到 srtt/rttvar
+- 抖动：MQTT网关转发的上行音频带有设备时间戳，按 RFC 3550 的到达间隔抖动算法估计
+- 欠载：设备上报的播放欠载 {"type": "playback", "state": "underrun"}
+预缓冲时长 = srtt/2 + 4*max(rttvar, 抖动) + 一帧余量，每次欠载再多缓冲一帧，限制在 [min_packets, max_packets]；
+尚无测量数据时使用 default_packets
+"""
+
+import math
+import time
+import asyncio
+import threading
+
+from config.logger import setup_logging
+from core.utils.metrics import Histogram, register_stats
+
+TAG = __name__
+logger = setup_logging()
+
+TIMESTAMP_MODULO = 1 << 32  # 网关头部中的时间戳为32位无符号整数(毫秒)
+MAX_TRANSIT_DELTA_MS = 2000  # 相邻包传输时间差超过该值视为设备重新计时，不计入抖动
+PROBE_TIMEOUT = 5
+
+
+class LinkQualityStats:
+    """各连接选择的预缓冲深度和欠载统计"""
+
+    def __init__(self):
+        self._links = {}
+        self._lock = threading.Lock()
+        self.depth_hist = Histogram([1, 2, 3, 4, 5, 6, 8, 10, 12])
+        self.rtt_ms_hist = Histogram([5, 10, 20, 50, 100, 200, 500, 1000])
+        # 已关闭连接的累计值
+        self.closed_underruns = 0
+
+    def add(self, session_id, link):
+        with self._lock:
+            self._links[session_id] = link
+
+    def remove(self, session_id):
+        with self._lock:
+            link = self._links.pop(session_id, None)
+        if link is not None:
+            self.closed_underruns += link.underruns
+
+    def snapshot(self) -> dict:
+        """只输出汇总值，指标接口不需要认证，不能暴露单个连接和设备的信息"""
+        with self._lock:
+            links = list(self._links.values())
+        underruns = self.closed_underruns
+        srtt_max = None
+        jitter_max = 0.0
+        for link in links:
+            underruns += link.underruns
+            if link.srtt is not None and (srtt_max is None or link.srtt > srtt_max):
+                srtt_max = link.srtt
+            jitter_max = max(jitter_max, link.jitter)
+        return {
+            "connections": len(links),
+            "underruns_total": underruns,
+            "srtt_ms_max": round(srtt_max, 1) if srtt_max is not None else None,
+            "jitter_ms_max": round(jitter_max, 1),
+            "pre_buffer_hist": self.depth_hist.snapshot(),
+            "rtt_ms_hist": self.rtt_ms_hist.snapshot(),
+        }
+
+
+_link_stats = None
+
+
+def get_link_stats() -> LinkQualityStats:
+    global _link_stats
+    if _link_stats is None:
+        _link_stats = LinkQualityStats()
+        register_stats("link_quality", _link_stats.snapshot)
+    return _link_stats
+
+
+class LinkQuality:
+    """单个连接的链路质量估计，只在事件循环中使用"""
+
+    def __init__(self, config: dict):
+        pre_buffer_config = config.get("tts_pre_buffer") or {}
+        self.default_packets = int(pre_buffer_config.get("default_packets", 5))
+        self.min_packets = max(1, int(pre_buffer_config.get("min_packets", 2)))
+        self.max_packets = max(
+            self.min_packets, int(pre_buffer_config.get("max_packets", 12))
+        )
+        self.probe_interval = float(pre_buffer_config.get("probe_interval", 15))
+        self.stats = get_link_stats()
+
+        self.srtt = None  # 平滑RTT(毫秒)
+        self.rttvar = 0.0
+        self.rtt_samples = 0
+        self.jitter = 0.0  # 上行到达间隔抖动(毫秒)
+        self.jitter_samples = 0
+        self._last_timestamp = None
+        self._last_arrival = None
+        self.underruns = 0
+        self.extra_packets = 0  # 因欠载增加的缓冲包数
+        self.pre_buffer = None  # 最近一次选择的预缓冲包数
+        self._last_probe = 0.0
+        self._probe_task = None
+
+    def observe_rtt(self, rtt_ms: float):
+        """按 RFC 6298 平滑RTT样本"""
+        if self.srtt is None:
+            self.srtt = rtt_ms
+            self.rttvar = rtt_ms / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt_ms)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt_ms
+        self.rtt_samples += 1
+        self.stats.rtt_ms_hist.observe(rtt_ms)
+
+    def observe_transit(self, timestamp: int, arrival_ms: float):
+        """记录一个带设备时间戳的上行包，按 RFC 3550 更新到达间隔抖动"""
+        if self._last_timestamp is not None:
+            sent_delta = (timestamp - self._last_timestamp) % TIMESTAMP_MODULO
+            if sent_delta >= TIMESTAMP_MODULO // 2:
+                sent_delta -= TIMESTAMP_MODULO
+            delta = abs((arrival_ms - self._last_arrival) - sent_delta)
+            if delta < MAX_TRANSIT_DELTA_MS:
+                self.jitter += (delta - self.jitter) / 16
+                self.jitter_samples += 1
+        self._last_timestamp = timestamp
+        self._last_arrival = arrival_ms
+
+    def on_underrun(self, count: int = 1):
+        """设备播放欠载，之后每句话多缓冲count帧"""
+        self.underruns += count
+        self.extra_packets = min(self.extra_packets + count, self.max_packets)
+
+    def pre_buffer_packets(self, frame_duration: int) -> int:
+        """选择一句话开头直接发送的包数"""
+        if self.srtt is None and not self.jitter_samples:
+            packets = self.default_packets
+        else:
+            variation = max(self.rttvar, self.jitter)
+            lead_ms = (self.srtt or 0) / 2 + 4 * variation + frame_duration
+            packets = math.ceil(lead_ms / frame_duration)
+        packets = min(max(packets + self.extra_packets, self.min_packets), self.max_packets)
+        self.pre_buffer = packets
+        self.stats.depth_hist.observe(packets)
+        return packets
+
+    def maybe_probe(self, websocket):
+        """距上次探测超过 probe_interval 时在后台测量一次RTT"""
+        if websocket is None or self.probe_interval <= 0:
+            return
+        if self._probe_task is not None and not self._probe_task.done():
+            return
+        now = time.monotonic()
+        if now - self._last_probe < self.probe_interval:
+            return
+        self._last_probe = now
+        self._probe_task = asyncio.create_task(self._probe(websocket))
+
+    async def _probe(self, websocket):
+        try:
+            pong_waiter = await websocket.ping()
+            latency = await asyncio.wait_for(pong_waiter, PROBE_TIMEOUT)
+            self.observe_rtt(latency * 1000)
+        except asyncio.TimeoutError:
+            # 超时本身说明链路很差
+            self.observe_rtt(PROBE_TIMEOUT * 1000)
+        except Exception as e:
+            logger.bind(tag=TAG).debug(f"RTT探测失败: {e}")
+
+    def close(self):
+        if self._probe_task is not None and not self._probe_task.done():
+            self._probe_task.cancel()
+
+    def get_stats(self) -> dict:
+        return {
+            "srtt_ms": round(self.srtt, 1) if self.srtt is not None else None,
+            "rttvar_ms": round(self.rttvar, 1),
+            "jitter_ms": round(self.jitter, 1),
+            "pre_buffer_packets": self.pre_buffer,
+            "underruns": self.underruns,
+        }
+
+    def summary(self) -> dict:
+        stats = self.get_stats()
+        stats["rtt_samples"] = self.rtt_samples
+        stats["jitter_samples"] = self.jitter_samples
+        return stats
@@ -0,0 +1,65 @@
+"""
+服务运行指标汇总
+各模块通过 register_stats 注册一个返回dict的函数，由 /xiaozhi/metrics 接口统一输出，
+便于根据线上负载评估节点规格
+该接口不需要认证，指标只能是汇总值，不能包含单个连接的 session_id、device_id 等信息
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict
+
+_stats_providers: Dict[str, Callable[[], dict]] = {}
+_lock = threading.Lock()
+
+
+def register_stats(name: str, provider: Callable[[], dict]):
+    """注册指标提供函数，同名覆盖"""
+    with _lock:
+        _stats_providers[name] = provider
+
+
+def unregister_stats(name: str):
+    with _lock:
+        _stats_providers.pop(name, None)
+
+
+def collect_stats() -> dict:
+    """收集所有已注册模块的指标，单个模块出错不影响其他模块"""
+    with _lock:
+        providers = list(_stats_providers.items())
+    result = {}
+    for name, provider in providers:
+        try:
+            result[name] = provider()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
+
+
+class Histogram:
+    """固定分桶直方图，bounds 为各桶的上界（包含），超过最大上界的计入 +Inf 桶"""
+
+    def __init__(self, bounds):
+        self.bounds = sorted(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> dict:
+        buckets = {f"<={b}": c for b, c in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {
+            "count": self.total,
+            "avg": (self.sum / self.total) if self.total else 0,
+            "max": self.max,
+            "buckets": buckets,
+        }
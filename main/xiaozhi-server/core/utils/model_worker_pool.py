@@ -0,0 +1,224 @@
+"""
+模型工作进程池
+本地ASR/VAD推理是CPU密集型任务，放在事件循环所在进程的线程里执行会与事件循环争抢GIL，
+识别高峰时拖慢音频发送节奏。进程池中每个工作进程只加载一次模型，
+PCM数据通过共享内存传递，只有识别结果通过队列返回
+"""
+
+import time
+import atexit
+import asyncio
+import importlib
+import itertools
+import queue
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import Future
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+RETIRE_TIMEOUT_SECONDS = 30  # 配置变化后旧进程池等待未完成请求的最长时间
+
+
+def _load_handler(factory_path: str, config: dict):
+    """factory_path 形如 "package.module:function"，返回 handler(pcm_view, **kwargs)"""
+    module_name, func_name = factory_path.split(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, func_name)(config)
+
+
+def _worker_main(factory_path, config, request_queue, response_queue):
+    handler = _load_handler(factory_path, config)
+    response_queue.put((None, "ready", None))
+    while True:
+        request = request_queue.get()
+        if request is None:
+            break
+        request_id, shm_name, size, kwargs = request
+        shm = None
+        try:
+            # spawn启动的工作进程与父进程共用resource_tracker，由父进程负责unlink
+            shm = shared_memory.SharedMemory(name=shm_name)
+            view = shm.buf[:size]
+            try:
+                # handler 不能在返回后继续引用该内存
+                result = handler(view, **kwargs)
+            finally:
+                view.release()
+            response_queue.put((request_id, result, None))
+        except Exception as e:
+            response_queue.put((request_id, None, f"{type(e).__name__}: {e}"))
+        finally:
+            if shm is not None:
+                shm.close()
+
+
+class ModelWorkerPool:
+    """
+    - handler 由 factory_path 指定的工厂函数在工作进程内创建，只加载一次模型
+    - submit 返回 concurrent.futures.Future，线程中可直接等待；run 为协程版本
+    - 所有工作进程共用一个请求队列，空闲的进程先取到请求
+    """
+
+    def __init__(self, factory_path: str, config: dict, num_workers: int = 1):
+        self.factory_path = factory_path
+        self.num_workers = max(int(num_workers), 1)
+        ctx = multiprocessing.get_context("spawn")
+        self._request_queue = ctx.Queue()
+        self._response_queue = ctx.Queue()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._closed = False
+        self._ready = 0
+
+        self._processes = []
+        for i in range(self.num_workers):
+            process = ctx.Process(
+                target=_worker_main,
+                args=(factory_path, config, self._request_queue, self._response_queue),
+                name=f"model-worker-{i}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        self._listener = threading.Thread(
+            target=self._listen, name="model-worker-listener", daemon=True
+        )
+        self._listener.start()
+        atexit.register(self.close)
+        logger.bind(tag=TAG).info(
+            f"模型工作进程池已启动: {factory_path}, 进程数={self.num_workers}"
+        )
+
+    def submit(self, pcm, **kwargs) -> Future:
+        """提交一段PCM（bytes-like），kwargs 需可pickle且体积较小"""
+        future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("模型工作进程池已关闭"))
+            return future
+        with memoryview(pcm) as src, src.cast("B") as data:
+            size = data.nbytes
+            shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            shm.buf[:size] = data
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = (future, shm)
+        self._request_queue.put((request_id, shm.name, size, kwargs))
+        return future
+
+    async def run(self, pcm, **kwargs):
+        return await asyncio.wrap_future(self.submit(pcm, **kwargs))
+
+    def _listen(self):
+        while not self._closed:
+            try:
+                request_id, result, error = self._response_queue.get(timeout=5)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            except Exception:
+                break
+            if request_id is None:
+                if result == "ready":
+                    self._ready += 1
+                    if self._ready == self.num_workers:
+                        logger.bind(tag=TAG).info(
+                            f"模型工作进程已全部就绪: {self.factory_path}"
+                        )
+                    continue
+                break  # close() 发出的退出信号
+            with self._lock:
+                future, shm = self._pending.pop(request_id, (None, None))
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            if future is None or future.done():
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(result)
+
+    def _check_workers(self):
+        """工作进程异常退出时，让等待中的请求立即失败，避免调用方一直挂起"""
+        if all(p.is_alive() for p in self._processes):
+            return
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        if pending:
+            logger.bind(tag=TAG).error(
+                f"模型工作进程异常退出，{len(pending)} 个请求失败: {self.factory_path}"
+            )
+        for future, shm in pending:
+            shm.close()
+            shm.unlink()
+            if not future.done():
+                future.set_exception(RuntimeError("模型工作进程异常退出"))
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.num_workers,
+            "ready": self._ready,
+            "alive": sum(1 for p in self._processes if p.is_alive()),
+            "pending": len(self._pending),
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._processes:
+            self._request_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self._response_queue.put((None, "closed", None))
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future, shm in pending:
+            shm.close()
+            shm.unlink()
+            if not future.done():
+                future.set_exception(RuntimeError("模型工作进程池已关闭"))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_model_worker_pool(
+    name: str, factory_path: str, config: dict, num_workers: int
+) -> ModelWorkerPool:
+    """
+    按名称（如 "asr"、"vad"）返回进程级的模型工作进程池，更新配置重建提供者时参数未变化则复用；
+    参数变化时创建新的进程池，旧的在未完成的请求结束后关闭
+    """
+    key = (factory_path, repr(sorted(config.items())), max(int(num_workers), 1))
+    with _pools_lock:
+        current = _pools.get(name)
+        if current is not None and current[0] == key:
+            return current[1]
+        pool = ModelWorkerPool(factory_path, config, num_workers)
+        _pools[name] = (key, pool)
+    if current is not None:
+        threading.Thread(
+            target=_retire, args=(current[1],), name="model-worker-retire", daemon=True
+        ).start()
+    return pool
+
+
+def _retire(pool: ModelWorkerPool):
+    deadline = time.monotonic() + RETIRE_TIMEOUT_SECONDS
+    while pool._pending and time.monotonic() < deadline:
+        time.sleep(0.5)
+    pool.close()
+    logger.bind(tag=TAG).info(f"配置已更新，旧的模型工作进程池已关闭: {pool.factory_path}")
@@ -98,8 +98,9 @@ def initialize_modules(
     return modules
 
 
-def initialize_tts(config):
-    select_tts_module = config["selected_module"]["TTS"]
+def initialize_tts(config, select_tts_module=None):
+    """按 selected_module 创建TTS，指定 select_tts_module 时创建TTS下对应名称的配置"""
+    select_tts_module = select_tts_module or config["selected_module"]["TTS"]
     tts_type = (
         select_tts_module
         if "type" not in config["TTS"][select_tts_module]
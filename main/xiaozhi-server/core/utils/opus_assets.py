@@ -0,0 +1,168 @@
+"""
+预编译Opus提示音
+绑定码、超长提示、结束提示音、唤醒词回复等固定音频原本每次播放都要经ffmpeg解码再编码，
+这里把 config/assets 下的音频预先编码为60ms一帧的p3文件，按源文件的相对路径存放在缓存目录中
+（如 data/assets_cache/config/assets/bind_code.wav.p3），不改动 config/assets 本身，
+播放时通过内存映射直接读取Opus帧，运行期间不再启动ffmpeg子进程。
+源文件比p3文件新时（如唤醒词回复重新生成）视为过期，重新编码后覆盖。
+缓存目录不可写时（如只读镜像）跳过预编译，播放时仍按原方式调用ffmpeg。
+
+也可以单独执行：python -m core.utils.opus_assets [--force]
+"""
+
+import os
+import mmap
+import struct
+import argparse
+import threading
+
+from config.logger import setup_logging
+from core.utils import p3
+
+TAG = __name__
+logger = setup_logging()
+
+ASSETS_DIR = "config/assets"
+P3_CACHE_DIR = "data/assets_cache"
+SOURCE_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac", ".m4a", ".aac", ".opus")
+P3_SUFFIX = ".p3"
+
+
+def asset_p3_path(source_path: str) -> str:
+    source_path = os.path.abspath(source_path)
+    rel_path = os.path.relpath(source_path)
+    if rel_path.startswith(os.pardir):
+        rel_path = source_path.lstrip(os.sep)
+    return os.path.join(P3_CACHE_DIR, rel_path + P3_SUFFIX)
+
+
+def _is_fresh(source_path: str, p3_path: str) -> bool:
+    try:
+        return os.path.getmtime(p3_path) >= os.path.getmtime(source_path)
+    except OSError:
+        return False
+
+
+def compile_asset(source_path: str, frames: list = None) -> str:
+    """将一个音频文件编码为p3文件，已有编码结果时直接写入"""
+    if frames is None:
+        from core.utils.util import encode_audio_file
+
+        frames = encode_audio_file(source_path, is_opus=True)
+    p3_path = asset_p3_path(source_path)
+    os.makedirs(os.path.dirname(p3_path), exist_ok=True)
+    tmp_path = f"{p3_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(p3.encode_opus_to_bytes(frames))
+    os.replace(tmp_path, p3_path)
+    return p3_path
+
+
+def compile_assets(root: str = ASSETS_DIR, force: bool = False) -> dict:
+    """遍历目录，为缺少或过期的音频生成p3文件"""
+    result = {"compiled": 0, "skipped": 0, "failed": 0}
+    for dirpath, _, files in os.walk(root):
+        for name in sorted(files):
+            if not name.lower().endswith(SOURCE_EXTENSIONS):
+                continue
+            source_path = os.path.join(dirpath, name)
+            if not force and _is_fresh(source_path, asset_p3_path(source_path)):
+                result["skipped"] += 1
+                continue
+            try:
+                compile_asset(source_path)
+                result["compiled"] += 1
+            except OSError as e:
+                # 缓存目录不可写时其余文件也会失败，不再继续
+                logger.bind(tag=TAG).warning(f"无法写入提示音缓存目录 {P3_CACHE_DIR}，跳过预编译: {e}")
+                return result
+            except Exception as e:
+                result["failed"] += 1
+                logger.bind(tag=TAG).warning(f"预编译音频失败 {source_path}: {e}")
+    logger.bind(tag=TAG).info(
+        f"提示音预编译完成: 新编码{result['compiled']}个, "
+        f"已是最新{result['skipped']}个, 失败{result['failed']}个"
+    )
+    return result
+
+
+class OpusAssetPack:
+    """按源文件路径返回预编译的Opus帧，帧为p3文件内存映射上的 memoryview，不复制数据"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # 源文件路径 -> (p3修改时间, mmap, 帧列表)
+
+    def get(self, source_path: str):
+        """p3文件不存在或已过期时返回 None"""
+        p3_path = asset_p3_path(source_path)
+        try:
+            p3_mtime = os.path.getmtime(p3_path)
+            if p3_mtime < os.path.getmtime(source_path):
+                return None
+        except OSError:
+            return None
+
+        entry = self._entries.get(source_path)
+        if entry is not None and entry[0] == p3_mtime:
+            return entry[2]
+
+        with self._lock:
+            try:
+                with open(p3_path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                frames = self._parse(mapped)
+            except (OSError, ValueError) as e:
+                logger.bind(tag=TAG).warning(f"读取预编译音频失败 {p3_path}: {e}")
+                return None
+            # 旧的映射仍可能被正在发送的帧引用，交给垃圾回收释放
+            self._entries[source_path] = (p3_mtime, mapped, frames)
+        return frames
+
+    @staticmethod
+    def _parse(mapped) -> list:
+        view = memoryview(mapped)
+        frames = []
+        offset = 0
+        while offset < len(view):
+            _, _, data_len = struct.unpack_from(">BBH", view, offset)
+            offset += 4
+            if offset + data_len > len(view):
+                raise ValueError("p3文件不完整")
+            frames.append(view[offset : offset + data_len])
+            offset += data_len
+        return frames
+
+    def store(self, source_path: str, frames: list):
+        """运行时编码得到的帧写入p3文件，失败时只记录日志"""
+        try:
+            compile_asset(source_path, frames)
+        except OSError as e:
+            logger.bind(tag=TAG).warning(f"写入预编译音频失败 {source_path}: {e}")
+
+    def is_asset(self, source_path: str) -> bool:
+        """只有 config/assets 下的音频才会在运行时补编码"""
+        root = os.path.abspath(ASSETS_DIR)
+        return os.path.abspath(source_path).startswith(root + os.sep)
+
+
+_asset_pack = None
+
+
+def get_asset_pack() -> OpusAssetPack:
+    global _asset_pack
+    if _asset_pack is None:
+        _asset_pack = OpusAssetPack()
+    return _asset_pack
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预编译 config/assets 下的提示音为p3文件")
+    parser.add_argument("--root", default=ASSETS_DIR, help="音频目录")
+    parser.add_argument("--force", action="store_true", help="忽略已有p3文件，全部重新编码")
+    args = parser.parse_args()
+    compile_assets(args.root, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,136 @@
 """
 Opus编码工具类
 将PCM音频数据编码为Opus格式
+
+编码器按 (采样率, 通道数, 应用类型, 编码参数) 在进程内复用：
+- 非流式TTS每句话、每个设备连接都不再新建 opus 编码器，归还时重置状态即可给下一次使用
+- 不足一帧的样本保存在预先分配的定长缓冲区中，完整的帧直接从输入数据的内存编码，不做拼接和复制
 """
 
+import ctypes
 import logging
+import threading
 import traceback
+import weakref
+from contextlib import contextmanager
+
 import numpy as np
-from opuslib_next import Encoder
+from opuslib_next import Encoder, OpusError
 from opuslib_next import constants
+from opuslib_next.api import c_int16_pointer
+from opuslib_next.api.encoder import libopus_encode
 from typing import Optional, Callable, Any
 
+from core.utils.metrics import register_stats
+
+# libopus 建议的单个数据包最大字节数
+MAX_PACKET_SIZE = 4000
+# 每种编码参数最多保留的空闲编码器数
+MAX_IDLE_ENCODERS = 64
+
+
+class PooledEncoder:
+    """从编码器池取得的编码器，输出缓冲区随编码器一起复用"""
+
+    def __init__(self, key):
+        sample_rate, channels, application, bitrate, complexity, signal = key
+        self.key = key
+        self.encoder = Encoder(sample_rate, channels, application)
+        if bitrate is not None:
+            self.encoder.bitrate = bitrate
+        if complexity is not None:
+            self.encoder.complexity = complexity
+        if signal is not None:
+            self.encoder.signal = signal
+        self._state = self.encoder.encoder_state
+        self._output = (ctypes.c_char * MAX_PACKET_SIZE)()
+
+    def encode(self, frame: np.ndarray, frame_size: int) -> bytes:
+        """编码一帧，frame 为连续存放的 int16 数组，直接把它的内存地址传给 libopus"""
+        result = libopus_encode(
+            self._state,
+            frame.ctypes.data_as(c_int16_pointer),
+            frame_size,
+            self._output,
+            MAX_PACKET_SIZE,
+        )
+        if result < 0:
+            raise OpusError(result)
+        return ctypes.string_at(self._output, result)
+
+    def reset_state(self):
+        self.encoder.reset_state()
+
+
+class OpusEncoderPool:
+    def __init__(self, max_idle: int = MAX_IDLE_ENCODERS):
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(
+        self,
+        sample_rate: int,
+        channels: int,
+        application=constants.APPLICATION_AUDIO,
+        bitrate: int = None,
+        complexity: int = None,
+        signal: int = None,
+    ) -> PooledEncoder:
+        key = (sample_rate, channels, application, bitrate, complexity, signal)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop()
+            self.created += 1
+        return PooledEncoder(key)
+
+    def release(self, encoder: PooledEncoder):
+        """重置编码器状态后放回池中，超过上限时直接丢弃"""
+        try:
+            encoder.reset_state()
+        except Exception as e:
+            logging.error(f"重置Opus编码器失败: {e}")
+            return
+        with self._lock:
+            idle = self._idle.setdefault(encoder.key, [])
+            if len(idle) < self.max_idle:
+                idle.append(encoder)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            idle = sum(len(encoders) for encoders in self._idle.values())
+        return {"created": self.created, "reused": self.reused, "idle": idle}
+
+
+_encoder_pool = None
+_encoder_pool_lock = threading.Lock()
+
+
+def get_encoder_pool() -> OpusEncoderPool:
+    global _encoder_pool
+    if _encoder_pool is None:
+        with _encoder_pool_lock:
+            if _encoder_pool is None:
+                _encoder_pool = OpusEncoderPool()
+                register_stats("opus_encoder_pool", _encoder_pool.get_stats)
+    return _encoder_pool
+
+
+@contextmanager
+def pooled_encoder(sample_rate: int, channels: int, **kwargs):
+    """在 with 语句内独占一个编码器，退出时重置并归还"""
+    pool = get_encoder_pool()
+    encoder = pool.acquire(sample_rate, channels, **kwargs)
+    try:
+        yield encoder
+    finally:
+        pool.release(encoder)
+
+
 class OpusEncoderUtils:
     """PCM到Opus的编码器"""
 
@@ -34,17 +155,26 @@ class OpusEncoderUtils:
         self.bitrate = 24000  # bps
         self.complexity = 10  # 最高质量
 
-        # 缓冲区初始化为空
-        self.buffer = np.array([], dtype=np.int16)
+        # 不足一帧的样本暂存在定长缓冲区中
+        self.buffer = np.zeros(self.total_frame_size, dtype=np.int16)
+        self.buffered = 0
+        # 句首句尾静音裁剪，未设置时不裁剪
+        self.silence_trim = None
 
         try:
-            # 创建Opus编码器
-            self.encoder = Encoder(
-                sample_rate, channels, constants.APPLICATION_AUDIO  # 音频优化模式
+            # 从编码器池取得Opus编码器
+            pool = get_encoder_pool()
+            self.encoder = pool.acquire(
+                sample_rate,
+                channels,
+                constants.APPLICATION_AUDIO,  # 音频优化模式
+                bitrate=self.bitrate,
+                complexity=self.complexity,
+                signal=constants.SIGNAL_VOICE,  # 语音信号优化
             )
-            self.encoder.bitrate = self.bitrate
-            self.encoder.complexity = self.complexity
-            self.encoder.signal = constants.SIGNAL_VOICE  # 语音信号优化
+            # 没有调用 close 的实例被回收时同样归还编码器
+            self._finalizer = weakref.finalize(self, pool.release, self.encoder)
+            self._finalizer.atexit = False
         except Exception as e:
             logging.error(f"初始化Opus编码器失败: {e}")
             raise RuntimeError("初始化失败") from e
@@ -52,7 +182,26 @@ class OpusEncoderUtils:
     def reset_state(self):
         """重置编码器状态"""
         self.encoder.reset_state()
-        self.buffer = np.array([], dtype=np.int16)
+        self.buffered = 0
+        if self.silence_trim is not None:
+            self.silence_trim.reset()
+
+    def set_silence_trimmer(self, trimmer):
+        """编码前裁掉每句话首尾的静音，以 end_of_stream 为一句话的结束；trimmer 为 None 时不裁剪"""
+        if trimmer is None or self.channels != 1:
+            self.silence_trim = None
+            return
+        self.silence_trim = trimmer.stream(self.sample_rate)
+
+    def set_frame_size_ms(self, frame_size_ms: int):
+        """修改帧时长，尚未凑满一帧的样本会被丢弃，应在两句话之间调用"""
+        if frame_size_ms == self.frame_size_ms:
+            return
+        self.frame_size_ms = frame_size_ms
+        self.frame_size = (self.sample_rate * frame_size_ms) // 1000
+        self.total_frame_size = self.frame_size * self.channels
+        self.buffer = np.zeros(self.total_frame_size, dtype=np.int16)
+        self.buffered = 0
 
     def encode_pcm_to_opus_stream(self, pcm_data: bytes, end_of_stream: bool, callback: Callable[[Any], Any]):
         """
@@ -66,50 +215,56 @@ class OpusEncoderUtils:
         Returns:
             Opus数据包列表
         """
-        # 将字节数据转换为short数组
-        new_samples = self._convert_bytes_to_shorts(pcm_data)
-
-        # 校验PCM数据
-        self._validate_pcm_data(new_samples)
-
-        # 将新数据追加到缓冲区
-        self.buffer = np.append(self.buffer, new_samples)
-
+        # 将字节数据转换为short数组，与输入共享内存
+        samples = self._convert_bytes_to_shorts(pcm_data)
+        if self.silence_trim is not None:
+            samples = self.silence_trim.push(samples)
+            if end_of_stream:
+                samples = np.concatenate((samples, self.silence_trim.flush()))
+        frame_len = self.total_frame_size
         offset = 0
 
+        # 先补齐上次剩下的不完整帧
+        if self.buffered:
+            fill = min(frame_len - self.buffered, len(samples))
+            self.buffer[self.buffered : self.buffered + fill] = samples[:fill]
+            self.buffered += fill
+            offset = fill
+            if self.buffered == frame_len:
+                output = self._encode(self.buffer)
+                if output:
+                    callback(output)
+                self.buffered = 0
+
         # 处理所有完整帧
-        while offset <= len(self.buffer) - self.total_frame_size:
-            frame = self.buffer[offset : offset + self.total_frame_size]
-            output = self._encode(frame)
+        while offset <= len(samples) - frame_len:
+            output = self._encode(samples[offset : offset + frame_len])
             if output:
                 callback(output)
-            offset += self.total_frame_size
+            offset += frame_len
 
         # 保留未处理的样本
-        self.buffer = self.buffer[offset:]
+        remaining = len(samples) - offset
+        if remaining > 0:
+            self.buffer[self.buffered : self.buffered + remaining] = samples[offset:]
+            self.buffered += remaining
 
         # 流结束时处理剩余数据
-        if end_of_stream and len(self.buffer) > 0:
-            # 创建最后一帧并用0填充
-            last_frame = np.zeros(self.total_frame_size, dtype=np.int16)
-            last_frame[: len(self.buffer)] = self.buffer
-
-            output = self._encode(last_frame)
+        if end_of_stream and self.buffered > 0:
+            # 最后一帧用0填充
+            self.buffer[self.buffered :] = 0
+            output = self._encode(self.buffer)
             if output:
                 callback(output)
-            self.buffer = np.array([], dtype=np.int16)
+            self.buffered = 0
 
     def _encode(self, frame: np.ndarray) -> Optional[bytes]:
         """编码一帧音频数据"""
         try:
             # 编码器已释放，跳过编码
-            if not hasattr(self, 'encoder') or self.encoder is None:
+            if self.encoder is None:
                 return None
-            # 将numpy数组转换为bytes
-            frame_bytes = frame.tobytes()
-            # opuslib要求输入字节数必须是channels*2的倍数
-            encoded = self.encoder.encode(frame_bytes, self.frame_size)
-            return encoded
+            return self.encoder.encode(frame, self.frame_size)
         except Exception as e:
             logging.error(f"Opus编码失败: {e}")
             traceback.print_exc()
@@ -120,20 +275,11 @@ class OpusEncoderUtils:
         # 假设输入是小端字节序的16位PCM
         return np.frombuffer(bytes_data, dtype=np.int16)
 
-    def _validate_pcm_data(self, pcm_shorts: np.ndarray) -> None:
-        """验证PCM数据是否有效"""
-        # 16位PCM数据范围是 -32768 到 32767
-        if np.any((pcm_shorts < -32768) | (pcm_shorts > 32767)):
-            invalid_samples = pcm_shorts[(pcm_shorts < -32768) | (pcm_shorts > 32767)]
-            logging.warning(f"发现无效PCM样本: {invalid_samples[:5]}...")
-            # 在实际应用中可以选择裁剪而不是抛出异常
-            # np.clip(pcm_shorts, -32768, 32767, out=pcm_shorts)
-
     def close(self):
-        """关闭编码器并释放资源"""
-        if hasattr(self, 'encoder') and self.encoder:
+        """把编码器归还编码器池"""
+        if self.encoder is not None:
             try:
-                del self.encoder
+                self._finalizer()
                 self.encoder = None
             except Exception as e:
-                logging.error(f"Error releasing Opus encoder: {e}")
\ No newline at end of file
+                logging.error(f"Error releasing Opus encoder: {e}")
@@ -1,14 +1,12 @@
 import struct
 
+from core.utils.audio_frame import packet_duration_ms
+
 def decode_opus_from_file(input_file):
     """
     从p3文件中解码 Opus 数据，并返回一个 Opus 数据包的列表以及总时长。
     """
     opus_datas = []
-    total_frames = 0
-    sample_rate = 16000  # 文件采样率
-    frame_duration_ms = 60  # 帧时长
-    frame_size = int(sample_rate * frame_duration_ms / 1000)
 
     with open(input_file, 'rb') as f:
         while True:
@@ -26,10 +24,9 @@ def decode_opus_from_file(input_file):
                 raise ValueError(f"Data length({len(opus_data)}) mismatch({data_len}) in the file.")
 
             opus_datas.append(opus_data)
-            total_frames += 1
 
-    # 计算总时长
-    total_duration = (total_frames * frame_duration_ms) / 1000.0
+    # 按每个包TOC中的帧时长计算总时长，p3文件不限定帧时长
+    total_duration = sum(packet_duration_ms(d) for d in opus_datas) / 1000.0
     return opus_datas, total_duration
 
 def decode_opus_from_bytes(input_bytes):
@@ -38,10 +35,6 @@ def decode_opus_from_bytes(input_bytes):
     """
     import io
     opus_datas = []
-    total_frames = 0
-    sample_rate = 16000  # 文件采样率
-    frame_duration_ms = 60  # 帧时长
-    frame_size = int(sample_rate * frame_duration_ms / 1000)
 
     f = io.BytesIO(input_bytes)
     while True:
@@ -53,7 +46,34 @@ def decode_opus_from_bytes(input_bytes):
         if len(opus_data) != data_len:
             raise ValueError(f"Data length({len(opus_data)}) mismatch({data_len}) in the bytes.")
         opus_datas.append(opus_data)
-        total_frames += 1
 
-    total_duration = (total_frames * frame_duration_ms) / 1000.0
-    return opus_datas, total_duration
\ No newline at end of file
+    total_duration = sum(packet_duration_ms(d) for d in opus_datas) / 1000.0
+    return opus_datas, total_duration
+
+def decode_opus_from_file_stream(input_file, callback):
+    """
+    从p3文件中逐帧读取 Opus 数据，每读到一帧调用一次 callback
+    """
+    opus_datas, _ = decode_opus_from_file(input_file)
+    for opus_data in opus_datas:
+        callback(opus_data)
+
+
+def decode_opus_from_bytes_stream(input_bytes, callback):
+    """
+    从p3二进制数据中逐帧读取 Opus 数据，每读到一帧调用一次 callback
+    """
+    opus_datas, _ = decode_opus_from_bytes(input_bytes)
+    for opus_data in opus_datas:
+        callback(opus_data)
+
+
+def encode_opus_to_bytes(opus_datas):
+    """
+    将 Opus 数据包列表编码为p3格式：每帧前加4字节头部 [1字节类型，1字节保留，2字节长度]
+    """
+    parts = []
+    for opus_data in opus_datas:
+        parts.append(struct.pack('>BBH', 0, 0, len(opus_data)))
+        parts.append(opus_data)
+    return b''.join(parts)
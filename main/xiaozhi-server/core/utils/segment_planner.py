@@ -0,0 +1,234 @@
+"""
+非流式TTS分段合并
+分句器按标点切出的分段原先各自请求一次TTS，LLM回复中"好的，""嗯，"这类短句每个都要一次往返和一次转码。
+这里在分句器与合成之间按播放进度决定是否合并：
+- 每轮回复的第一段立即合成，尽快出声
+- 之后的分段先暂存，与后续分段合并，合并后不超过 max_chars 个字符
+- 估计的播放领先量（已合成未播放的音频，加上合成中的分段预计到达后的时长）
+  不足以覆盖下一次合成的耗时加 margin_ms 时，立即合成暂存的分段，避免断音；
+  LLM暂时没有输出时，由TTS文本任务按 poll_delay 定时检查
+合成耗时（提交到第一帧音频）和每个字符的音频时长都按已完成的分段平滑估计；
+播放进度按第一帧音频开始实时播放估算，音频跟不上时记为一次断音并顺延播放时钟
+"""
+
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from core.utils.metrics import Histogram, register_stats
+
+DEFAULT_SYNTHESIS_LATENCY_MS = 800  # 尚未测得合成耗时时的估计值
+DEFAULT_MS_PER_CHAR = 200  # 尚未测得语速时每个字符的音频时长
+
+
+class SegmentPlannerStats:
+    """每轮回复的TTS请求数与估计断音时长"""
+
+    def __init__(self):
+        self.replies = 0
+        self.requests = 0
+        self.merged_segments = 0
+        self.requests_per_reply_hist = Histogram([1, 2, 3, 5, 8, 13, 20])
+        self.gap_ms_hist = Histogram([100, 200, 500, 1000, 2000, 5000])
+
+    def snapshot(self) -> dict:
+        return {
+            "replies": self.replies,
+            "requests": self.requests,
+            "merged_segments": self.merged_segments,
+            "requests_per_reply_hist": self.requests_per_reply_hist.snapshot(),
+            "gap_ms_hist": self.gap_ms_hist.snapshot(),
+        }
+
+
+_planner_stats = None
+
+
+def get_planner_stats() -> SegmentPlannerStats:
+    global _planner_stats
+    if _planner_stats is None:
+        _planner_stats = SegmentPlannerStats()
+        register_stats("tts_segment_planner", _planner_stats.snapshot)
+    return _planner_stats
+
+
+def join_segments(left: str, right: str) -> str:
+    """合并两个已去除首尾标点的分段，补回停顿"""
+    if not left[-1].isalnum():
+        # 分句时保留的问号等本身就有停顿
+        return f"{left} {right}" if right[0].isascii() else left + right
+    if left[-1].isascii() and right[0].isascii():
+        return f"{left}, {right}"
+    return f"{left}，{right}"
+
+
+class _Segment:
+    __slots__ = ("chars", "submitted", "arrived")
+
+    def __init__(self, chars: int, submitted: float):
+        self.chars = chars
+        self.submitted = submitted  # 开始合成的时刻
+        self.arrived = False  # 已收到第一帧音频
+
+
+class SegmentPlanner:
+    """
+    每个TTS提供者一个，push/poll/flush 在TTS文本线程中调用，
+    track 包装的音频回调可能在合成线程池中并发执行
+    max_chars 为0时不合并，每个分段单独合成
+    """
+
+    def __init__(self, max_chars: int = 0, margin_ms: float = 300, clock=time.monotonic):
+        self.max_chars = max_chars
+        self.margin_ms = margin_ms
+        self.clock = clock
+        self.stats = get_planner_stats()
+        self.synthesis_latency_ms = DEFAULT_SYNTHESIS_LATENCY_MS
+        self.ms_per_char = DEFAULT_MS_PER_CHAR
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._requests = 0
+        self.reset()
+
+    def reset(self):
+        """新一轮回复开始，或打断后丢弃本轮状态"""
+        self.finish()
+        with self._lock:
+            self._generation += 1
+            self._pending = None  # 暂存的待合并文本
+            self._pending_count = 0
+            self._emitted = deque()  # 已交给合成、尚未开始合成的分段字数
+            self._inflight = []  # 合成中、尚未收到音频的分段
+            self._audio_ms = 0.0  # 本轮已合成的音频时长
+            self._play_start = None  # 估计的播放开始时刻（已顺延断音时长）
+
+    def finish(self):
+        """本轮回复结束，记录请求数"""
+        requests, self._requests = self._requests, 0
+        if requests:
+            self.stats.replies += 1
+            self.stats.requests_per_reply_hist.observe(requests)
+
+    def push(self, segment: str) -> list:
+        """加入分句器输出的一个分段，返回现在应合成的文本"""
+        if not self.max_chars:
+            return [self._emit(segment, 1)]
+        ready = []
+        if self._pending is not None:
+            if len(self._pending) + len(segment) + 1 <= self.max_chars:
+                self._pending = join_segments(self._pending, segment)
+                self._pending_count += 1
+                return self.poll()
+            ready.append(self._emit_pending())
+        self._pending = segment
+        self._pending_count = 1
+        ready.extend(self.poll())
+        return ready
+
+    def poll(self) -> list:
+        """播放领先量不足时合成暂存的文本，每收到一段LLM输出时调用"""
+        if self._pending is None:
+            return []
+        if (
+            self._requests == 0
+            or len(self._pending) >= self.max_chars
+            or self.lead_ms() < self.synthesis_latency_ms + self.margin_ms
+        ):
+            return [self._emit_pending()]
+        return []
+
+    def poll_delay(self):
+        """距离 poll 需要合成暂存文本还有多少秒，没有暂存文本时返回 None"""
+        if self._pending is None:
+            return None
+        lead_ms = self.lead_ms() - self.synthesis_latency_ms - self.margin_ms
+        return max(lead_ms, 0) / 1000
+
+    def flush(self) -> list:
+        """本轮文本结束或插入音频文件前，合成所有暂存的文本"""
+        if self._pending is None:
+            return []
+        return [self._emit_pending()]
+
+    def lead_ms(self) -> float:
+        """估计的播放领先量：从现在起到已提交的分段全部播放完的时长"""
+        now = self.clock()
+        with self._lock:
+            end = now
+            if self._play_start is not None:
+                end = max(end, self._play_start + self._audio_ms / 1000)
+            segments = [(s.chars, s.submitted) for s in self._inflight]
+            segments += [(chars, now) for chars in self._emitted]
+            for chars, submitted in segments:
+                arrival = max(now, submitted + self.synthesis_latency_ms / 1000)
+                end = max(end, arrival) + chars * self.ms_per_char / 1000
+        return (end - now) * 1000
+
+    @contextmanager
+    def track(self, opus_handler, frame_ms: float):
+        """
+        在合成一个分段期间使用，按提交顺序与 push/poll/flush 返回的文本对应
+        返回包装后的音频回调，统计合成耗时、语速和本轮已合成的音频时长
+        """
+        with self._lock:
+            generation = self._generation
+            chars = self._emitted.popleft() if self._emitted else 0
+            segment = _Segment(chars, self.clock())
+            self._inflight.append(segment)
+        frames = 0
+
+        def handler(frame):
+            nonlocal frames
+            frames += 1
+            self._on_audio(generation, segment, frame_ms)
+            opus_handler(frame)
+
+        try:
+            yield handler
+        finally:
+            with self._lock:
+                if segment in self._inflight:
+                    self._inflight.remove(segment)
+                if generation == self._generation and frames and chars:
+                    ms_per_char = frames * frame_ms / chars
+                    self.ms_per_char += (ms_per_char - self.ms_per_char) / 4
+
+    def _emit_pending(self) -> str:
+        text, count = self._pending, self._pending_count
+        self._pending = None
+        self._pending_count = 0
+        return self._emit(text, count)
+
+    def _emit(self, text: str, count: int) -> str:
+        with self._lock:
+            self._emitted.append(len(text))
+        self._requests += 1
+        self.stats.requests += 1
+        self.stats.merged_segments += count - 1
+        return text
+
+    def _on_audio(self, generation: int, segment: _Segment, frame_ms: float):
+        now = self.clock()
+        gap = 0.0
+        with self._lock:
+            if generation != self._generation:
+                return
+            if not segment.arrived:
+                segment.arrived = True
+                if segment in self._inflight:
+                    self._inflight.remove(segment)
+                latency = (now - segment.submitted) * 1000
+                self.synthesis_latency_ms += (latency - self.synthesis_latency_ms) / 4
+            if self._play_start is None:
+                self._play_start = now
+            else:
+                played = (now - self._play_start) * 1000
+                if played > self._audio_ms:
+                    # 之前的音频已播放完，设备等待这段时间后才继续播放
+                    gap = played - self._audio_ms
+                    self._play_start += gap / 1000
+            self._audio_ms += frame_ms
+        # 不足一帧的延迟由设备端的预缓冲吸收
+        if gap > frame_ms:
+            self.stats.gap_ms_hist.observe(gap)
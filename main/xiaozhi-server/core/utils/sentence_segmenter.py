@@ -0,0 +1,117 @@
+"""
+流式文本增量分句
+原先每收到一个LLM增量都要把整段回复重新拼接，再对每个标点做一次 rfind，回复越长越慢。
+这里只扫描新追加的字符，已输出的文本不再参与计算：
+- 第一句在遇到逗号等停顿符号时即可输出，尽快开始合成；可要求至少 first_min_chars 个字符
+- 超过 max_chars 仍没有句末标点时，在最后一个停顿处（没有则直接）截断
+- 数字中的小数点、千分位逗号（3.14、1,000）不作为分句点，英文句点后需跟空白才算句末
+- 句末标点后紧跟的右引号、右括号和连续标点归入当前句
+"""
+
+from core.utils import textUtils
+
+SENTENCE_END_PUNCTUATIONS = ("。", "？", "?", "！", "!", "；", ";", "：", "\n")
+FIRST_SENTENCE_PUNCTUATIONS = ("，", "~", "、", ",") + SENTENCE_END_PUNCTUATIONS
+# 超长截断时优先选择的停顿位置
+SOFT_BREAKS = ("，", ",", "、", " ", "~")
+# 归入上一句的句末字符
+TRAILING_CHARS = frozenset("”’\"'」』）)】]》…。？?！!~")
+# 前后都是数字时不分句的半角符号
+NUMERIC_SEPARATORS = (".", ",")
+
+
+class SentenceSegmenter:
+    def __init__(
+        self,
+        punctuations=SENTENCE_END_PUNCTUATIONS,
+        first_punctuations=FIRST_SENTENCE_PUNCTUATIONS,
+        first_min_chars: int = 0,
+        max_chars: int = 120,
+    ):
+        self.punctuations = frozenset(punctuations) | {"."}
+        self.first_punctuations = frozenset(first_punctuations) | {"."}
+        self.first_min_chars = first_min_chars
+        self.max_chars = max_chars
+        self.reset()
+
+    def reset(self):
+        self._pending = ""  # 尚未输出的文本
+        self._scan_pos = 0  # _pending 中下次开始扫描的位置
+        self.is_first_sentence = True
+
+    def push(self, text: str) -> list:
+        """追加一段增量文本，返回新完成的分段（已去除首尾标点和表情）"""
+        if not text:
+            return []
+        self._pending += text
+        segments = []
+        pending = self._pending
+        i = self._scan_pos
+        while i < len(pending):
+            cut = self._boundary_at(pending, i)
+            if cut is None:
+                # 需要后面的字符才能判断，等待下一段增量
+                break
+            if cut == 0 and self.max_chars and i + 1 >= self.max_chars:
+                cut = self._soft_break(pending, i + 1)
+            if cut:
+                self._emit(pending[:cut], segments)
+                pending = pending[cut:]
+                i = 0
+            else:
+                i += 1
+        self._pending = pending
+        self._scan_pos = i
+        return segments
+
+    def flush(self):
+        """输出剩余文本，没有可合成的内容时返回 None"""
+        segment = textUtils.get_string_no_punctuation_or_emoji(self._pending)
+        self._pending = ""
+        self._scan_pos = 0
+        return segment or None
+
+    def _boundary_at(self, pending: str, i: int):
+        """
+        返回在位置 i 处分句时的切分长度，不分句返回 0，
+        还需要等待后续字符才能判断时返回 None
+        """
+        ch = pending[i]
+        punctuations = (
+            self.first_punctuations
+            if self.is_first_sentence and i + 1 >= self.first_min_chars
+            else self.punctuations
+        )
+        if ch not in punctuations:
+            return 0
+
+        if ch in NUMERIC_SEPARATORS:
+            prev_ch = pending[i - 1] if i > 0 else ""
+            if ch == "." or prev_ch.isdigit():
+                if i + 1 >= len(pending):
+                    return None
+                next_ch = pending[i + 1]
+                if prev_ch.isdigit() and next_ch.isdigit():
+                    return 0
+                # 英文句点后需要空白，避免拆开 e.g. 、网址和文件名
+                if ch == "." and next_ch.isascii() and not next_ch.isspace():
+                    return 0
+
+        end = i + 1
+        while end < len(pending) and pending[end] in TRAILING_CHARS:
+            end += 1
+        return end
+
+    @staticmethod
+    def _soft_break(pending: str, length: int) -> int:
+        """在前 length 个字符中找最后一个停顿位置，太靠前时直接截断"""
+        for pos in range(length - 1, length // 2, -1):
+            if pending[pos] in SOFT_BREAKS:
+                return pos + 1
+        return length
+
+    def _emit(self, raw: str, segments: list):
+        segment = textUtils.get_string_no_punctuation_or_emoji(raw)
+        if segment:
+            segments.append(segment)
+            self.is_first_sentence = False
@@ -0,0 +1,188 @@
+"""
+TTS音频首尾静音裁剪
+很多TTS服务在每句话前后各加 100~400ms 静音，按分段合成时这些静音会出现在每两句之间，
+也占用发送节拍。这里在Opus编码前按 10ms 窗口的能量找到第一个和最后一个有声窗口，
+裁掉之外的静音，首尾各保留配置的余量，保证句间仍有自然停顿。
+整句音频用 trim，边收边编码的音频用 stream() 返回的 SilenceTrimStream
+"""
+
+import threading
+
+import numpy as np
+
+from core.utils.metrics import Histogram, register_stats
+
+SAMPLE_RATE = 16000
+WINDOW_MS = 10
+DEFAULT_THRESHOLD_DB = -50  # 窗口均方根低于该值(dBFS)视为静音
+
+_EMPTY = np.zeros(0, dtype=np.int16)
+
+
+class SilenceTrimStats:
+    """裁剪的句子数、裁掉的音频时长与每句裁掉的时长分布"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sentences = 0
+        self.input_ms = 0.0
+        self.trimmed_ms = 0.0
+        self.trimmed_ms_hist = Histogram([50, 100, 200, 400, 800, 1600])
+
+    def observe(self, input_samples: int, output_samples: int, sample_rate: int):
+        trimmed_ms = (input_samples - output_samples) * 1000 / sample_rate
+        with self._lock:
+            self.sentences += 1
+            self.input_ms += input_samples * 1000 / sample_rate
+            self.trimmed_ms += trimmed_ms
+            self.trimmed_ms_hist.observe(trimmed_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "sentences": self.sentences,
+                "input_ms": round(self.input_ms),
+                "trimmed_ms": round(self.trimmed_ms),
+                "trimmed_ms_hist": self.trimmed_ms_hist.snapshot(),
+            }
+
+
+_trim_stats = None
+
+
+def get_trim_stats() -> SilenceTrimStats:
+    global _trim_stats
+    if _trim_stats is None:
+        _trim_stats = SilenceTrimStats()
+        register_stats("tts_silence_trim", _trim_stats.snapshot)
+    return _trim_stats
+
+
+class SilenceTrimmer:
+    """
+    裁剪参数，本身不保存音频状态，可以在多个线程中共用
+    keep_head_ms/keep_tail_ms 为第一个有声窗口之前、最后一个有声窗口之后保留的静音时长
+    """
+
+    def __init__(
+        self,
+        keep_head_ms: float,
+        keep_tail_ms: float,
+        threshold_db: float = DEFAULT_THRESHOLD_DB,
+        sample_rate: int = SAMPLE_RATE,
+    ):
+        self.keep_head_ms = keep_head_ms
+        self.keep_tail_ms = keep_tail_ms
+        self.threshold_db = threshold_db
+        self.sample_rate = sample_rate
+        self.window = sample_rate * WINDOW_MS // 1000
+        self.keep_head = int(sample_rate * keep_head_ms / 1000)
+        self.keep_tail = int(sample_rate * keep_tail_ms / 1000)
+        # 与窗口内样本平方的均值比较，省去开方
+        self.threshold = (32768 * 10 ** (threshold_db / 20)) ** 2
+        self.stats = get_trim_stats()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """按TTS配置创建，没有配置 trim_silence_head_ms/trim_silence_tail_ms 时返回 None"""
+        head = config.get("trim_silence_head_ms")
+        tail = config.get("trim_silence_tail_ms")
+        if head is None and tail is None:
+            return None
+        threshold_db = config.get("trim_silence_threshold_db")
+        return cls(
+            float(head or 0),
+            float(tail or 0),
+            DEFAULT_THRESHOLD_DB if threshold_db is None else float(threshold_db),
+        )
+
+    def voiced(self, samples: np.ndarray) -> np.ndarray:
+        """按完整窗口判断是否有声，不足一个窗口的尾部不参与判断"""
+        count = len(samples) // self.window
+        if not count:
+            return np.zeros(0, dtype=bool)
+        windows = samples[: count * self.window].reshape(count, self.window)
+        windows = windows.astype(np.float32)
+        energy = np.einsum("ij,ij->i", windows, windows) / self.window
+        return energy > self.threshold
+
+    def trim(self, samples: np.ndarray) -> np.ndarray:
+        """裁剪一整句音频，没有有声窗口时原样返回"""
+        voiced = np.flatnonzero(self.voiced(samples))
+        if not len(voiced):
+            return samples
+        start = max(0, voiced[0] * self.window - self.keep_head)
+        end = min(len(samples), (voiced[-1] + 1) * self.window + self.keep_tail)
+        self.stats.observe(len(samples), end - start, self.sample_rate)
+        return samples[start:end]
+
+    def trim_bytes(self, pcm: bytes) -> bytes:
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        trimmed = self.trim(samples)
+        return pcm if len(trimmed) == len(samples) else trimmed.tobytes()
+
+    def stream(self, sample_rate: int = None) -> "SilenceTrimStream":
+        """创建一路流式裁剪，sample_rate 为该路音频的采样率，默认与本对象相同"""
+        trimmer = self
+        if sample_rate and sample_rate != self.sample_rate:
+            trimmer = SilenceTrimmer(
+                self.keep_head_ms, self.keep_tail_ms, self.threshold_db, sample_rate
+            )
+        return SilenceTrimStream(trimmer)
+
+
+class SilenceTrimStream:
+    """
+    边收边裁：句首的静音只保留最近 keep_head_ms，有声部分立即输出，
+    有声部分之后的静音先暂存，再次出现声音时一并输出，句子结束时只保留 keep_tail_ms
+    """
+
+    def __init__(self, trimmer: SilenceTrimmer):
+        self.trimmer = trimmer
+        self.reset()
+
+    def reset(self):
+        self._pending = _EMPTY
+        self._silent_windows = 0  # 暂存数据开头已判断为静音的窗口数，不再重复计算
+        self._started = False
+        self._input = 0
+        self._output = 0
+
+    def push(self, samples: np.ndarray) -> np.ndarray:
+        trimmer = self.trimmer
+        window = trimmer.window
+        self._input += len(samples)
+        pending = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+        scanned = self._silent_windows
+        voiced = np.flatnonzero(trimmer.voiced(pending[scanned * window :])) + scanned
+        count = len(pending) // window
+        if not len(voiced):
+            if not self._started:
+                # 仍在句首静音中，按窗口对齐保留余量，至少保留一个窗口
+                keep = max(-(-trimmer.keep_head // window), 1)
+                cut = max(0, count - keep)
+                pending = pending[cut * window :]
+                count -= cut
+            self._pending = pending
+            self._silent_windows = count
+            return _EMPTY
+        start = 0
+        if not self._started:
+            start = max(0, voiced[0] * window - trimmer.keep_head)
+            self._started = True
+        end = (voiced[-1] + 1) * window
+        self._pending = pending[end:]
+        self._silent_windows = count - voiced[-1] - 1
+        self._output += end - start
+        return pending[start:end]
+
+    def flush(self) -> np.ndarray:
+        """一句话结束，输出保留的句尾静音并重置状态，整句都是静音时输出保留的句首余量"""
+        tail = self._pending
+        if self._started:
+            tail = tail[: self.trimmer.keep_tail]
+        if self._input:
+            self._output += len(tail)
+            self.trimmer.stats.observe(self._input, self._output, self.trimmer.sample_rate)
+        self.reset()
+        return tail
@@ -0,0 +1,115 @@
+"""
+推测式回复
+VAD检测到短暂停顿时提前识别并启动LLM，LLM输出先缓存不送入TTS；
+静音达到完整阈值确认本轮结束后立即释放缓存，用户继续说话则取消并丢弃
+"""
+
+import time
+import threading
+
+from config.logger import setup_logging
+from core.utils.metrics import Histogram, register_stats
+
+TAG = __name__
+logger = setup_logging()
+
+HOLDING = "holding"
+RELEASED = "released"
+CANCELLED = "cancelled"
+
+
+class SpeculativeTurn:
+    """一次推测回复，在ASR识别、LLM线程和事件循环之间共享"""
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+        self.llm_start_time = None
+        self.asr_task = None  # 提前识别的任务，结果为 (enhanced_text, content)
+        self.query = None  # 推测启动LLM时使用的识别文本
+        self.state = HOLDING
+        self._held = []
+        self._lock = threading.Lock()
+        self._decided = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.state == CANCELLED
+
+    def put(self, tts_text_queue, message):
+        """缓存期间暂存TTS文本，确认后直接送入队列，取消后丢弃"""
+        with self._lock:
+            if self.state == HOLDING:
+                self._held.append(message)
+            elif self.state == RELEASED:
+                tts_text_queue.put(message)
+
+    def release(self, tts_text_queue) -> bool:
+        with self._lock:
+            if self.state != HOLDING:
+                return False
+            for message in self._held:
+                tts_text_queue.put(message)
+            self._held.clear()
+            self.state = RELEASED
+        self._decided.set()
+        return True
+
+    def cancel(self) -> bool:
+        with self._lock:
+            if self.state != HOLDING:
+                return False
+            self._held.clear()
+            self.state = CANCELLED
+        self._decided.set()
+        return True
+
+    def wait_decided(self, timeout: float) -> bool:
+        """等待本轮被确认或取消，返回是否已确认"""
+        self._decided.wait(timeout)
+        return self.state == RELEASED
+
+
+class SpeculationStats:
+    def __init__(self):
+        self.started = 0  # 提前识别次数
+        self.llm_started = 0  # 推测启动LLM次数
+        self.confirmed = 0  # 推测结果被采用
+        self.wasted = 0  # 推测启动了LLM但被丢弃
+        self.wasted_llm_seconds = 0.0
+        self.saved_ms_hist = Histogram([100, 200, 300, 500, 700, 1000, 1500, 2000])
+
+    def on_confirmed(self, turn: SpeculativeTurn):
+        self.confirmed += 1
+        # LLM提前开始的时长即为本轮节省的响应延迟
+        saved_ms = (time.monotonic() - (turn.llm_start_time or turn.start_time)) * 1000
+        self.saved_ms_hist.observe(saved_ms)
+        logger.bind(tag=TAG).info(f"推测回复已采用，节省约 {saved_ms:.0f}ms")
+
+    def on_cancelled(self, turn: SpeculativeTurn, reason: str):
+        if turn.llm_start_time is None:
+            return
+        self.wasted += 1
+        self.wasted_llm_seconds += time.monotonic() - turn.llm_start_time
+        logger.bind(tag=TAG).info(f"推测回复已丢弃: {reason}")
+
+    def snapshot(self) -> dict:
+        return {
+            "started": self.started,
+            "llm_started": self.llm_started,
+            "confirmed": self.confirmed,
+            "wasted": self.wasted,
+            "waste_rate": (self.wasted / self.llm_started) if self.llm_started else 0,
+            "wasted_llm_seconds": round(self.wasted_llm_seconds, 3),
+            "saved_ms_hist": self.saved_ms_hist.snapshot(),
+        }
+
+
+_speculation_stats = None
+
+
+def get_speculation_stats() -> SpeculationStats:
+    global _speculation_stats
+    if _speculation_stats is None:
+        _speculation_stats = SpeculationStats()
+        register_stats("speculation", _speculation_stats.snapshot)
+    return _speculation_stats
@@ -0,0 +1,228 @@
+"""
+TTS音频缓存
+绑定提示、“我在这里哦”、提醒话术、工具报错等固定语句每天会被合成成千上万次，
+这里按 (TTS提供者, 音色, 参数, 规范化文本, 帧时长) 缓存最终的Opus帧：
+- 磁盘上按内容哈希保存为p3文件，所有连接共享，重启后仍然有效
+- 按总字节数做LRU淘汰，命中时更新文件修改时间，重启后按修改时间恢复LRU顺序
+- 最近命中的条目同时保存在内存中，避免重复读盘
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config.logger import setup_logging
+from core.utils import p3
+from core.utils.metrics import register_stats
+from core.utils.audio_frame import DEFAULT_FRAME_DURATION
+
+TAG = __name__
+logger = setup_logging()
+
+# 不影响合成结果的配置项，不参与缓存键计算
+_PROFILE_IGNORED_KEYS = (
+    "output_dir",
+    "delete_audio_file",
+    "tts_lookahead",
+    "first_segment_min_chars",
+    "max_segment_chars",
+    "merge_segment_chars",
+    "merge_margin_ms",
+)
+
+
+def tts_profile(provider: str, config: dict) -> str:
+    """TTS提供者及其配置的指纹，配置中的音色、语速等参数变化后缓存自然失效"""
+    params = {k: v for k, v in config.items() if k not in _PROFILE_IGNORED_KEYS}
+    raw = json.dumps([provider, params], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTSAudioCache:
+    def __init__(self, cache_dir: str, max_bytes: int, hot_max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hot_max_bytes = hot_max_bytes
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> 文件字节数，按最近使用排序
+        self._total_bytes = 0
+        self._hot = OrderedDict()  # key -> Opus帧列表
+        self._hot_bytes = 0
+
+        self.hot_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def make_key(
+        self, profile: str, voice, text: str, frame_duration: int = DEFAULT_FRAME_DURATION
+    ) -> str:
+        parts = [profile, voice, normalize_text(text)]
+        # 默认帧时长不计入键，已有的缓存继续有效
+        if frame_duration != DEFAULT_FRAME_DURATION:
+            parts.append(frame_duration)
+        raw = json.dumps(parts, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.p3")
+
+    def _load_index(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".p3"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name[:-3], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+        self._evict()
+        if entries:
+            logger.bind(tag=TAG).info(
+                f"TTS缓存已加载: {len(self._index)} 条, {self._total_bytes / 1024 / 1024:.1f}MB"
+            )
+
+    def get(self, key: str):
+        """命中时返回Opus帧列表，未命中返回 None"""
+        with self._lock:
+            frames = self._hot.get(key)
+            if frames is not None:
+                self._hot.move_to_end(key)
+                self._index.move_to_end(key)
+                self.hot_hits += 1
+                return frames
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            frames, _ = p3.decode_opus_from_file(path)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logger.bind(tag=TAG).warning(f"读取TTS缓存失败，已移除: {e}")
+            with self._lock:
+                self._remove(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._put_hot(key, frames)
+        return frames
+
+    def put(self, key: str, frames: list):
+        if not frames:
+            return
+        data = p3.encode_opus_to_bytes(frames)
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            # 先写临时文件再重命名，其他连接不会读到写了一半的文件
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.bind(tag=TAG).warning(f"写入TTS缓存失败: {e}")
+            return
+
+        with self._lock:
+            old_size = self._index.pop(key, None)
+            if old_size is not None:
+                self._total_bytes -= old_size
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            self.stores += 1
+            self._put_hot(key, frames)
+            self._evict()
+
+    def _put_hot(self, key: str, frames: list):
+        size = sum(len(frame) for frame in frames)
+        if size > self.hot_max_bytes:
+            return
+        old = self._hot.pop(key, None)
+        if old is not None:
+            self._hot_bytes -= sum(len(frame) for frame in old)
+        self._hot[key] = frames
+        self._hot_bytes += size
+        while self._hot_bytes > self.hot_max_bytes:
+            _, evicted = self._hot.popitem(last=False)
+            self._hot_bytes -= sum(len(frame) for frame in evicted)
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+        frames = self._hot.pop(key, None)
+        if frames is not None:
+            self._hot_bytes -= sum(len(frame) for frame in frames)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get_stats(self) -> dict:
+        hits = self.hot_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "hot_entries": len(self._hot),
+            "hot_bytes": self._hot_bytes,
+            "hot_hits": self.hot_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (hits / lookups) if lookups else 0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+_tts_cache = None
+
+
+def init_tts_cache(config: dict):
+    """按全局配置创建TTS缓存，未启用时不创建"""
+    global _tts_cache
+    cache_config = config.get("tts_cache") or {}
+    if str(cache_config.get("enabled", False)).lower() != "true":
+        return None
+    if _tts_cache is None:
+        _tts_cache = TTSAudioCache(
+            cache_config.get("cache_dir") or "data/tts_cache",
+            int(cache_config.get("max_mb") or 512) * 1024 * 1024,
+            int(cache_config.get("hot_max_mb") or 32) * 1024 * 1024,
+        )
+        register_stats("tts_cache", _tts_cache.get_stats)
+    return _tts_cache
+
+
+def get_tts_cache():
+    """未启用缓存时返回 None"""
+    return _tts_cache
@@ -0,0 +1,196 @@
+"""
+每轮回复首句的TTS竞速
+一轮对话的首次出声时间主要取决于第一句的TTS请求，而TTS服务的耗时长尾明显。
+开启后第一句先请求主TTS，超过 delay_ms 仍没有收到音频（或主TTS已失败）时再请求备用TTS，
+先返回音频的一方胜出，另一方的请求被取消，本轮后续分段都由胜出的一方合成，保证音色一致。
+每个请求在竞速线程池中各自的常驻事件循环里执行，可以从其他线程取消。
+"""
+
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config.logger import setup_logging
+from core.utils.metrics import Histogram, register_stats
+from core.utils.tts_io import get_thread_loop
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_POOL_SIZE = 32
+
+_executor = None
+_executor_lock = threading.Lock()
+_pool_size = DEFAULT_POOL_SIZE
+
+
+class HedgeStats:
+    """竞速次数、备用TTS的请求和胜出次数，以及首句从请求到第一块音频的耗时"""
+
+    def __init__(self):
+        self.races = 0
+        self.hedged = 0
+        self.secondary_wins = 0
+        self.failures = 0
+        self.first_audio_ms_hist = Histogram([100, 200, 300, 500, 800, 1200, 2000, 5000])
+
+    def snapshot(self) -> dict:
+        return {
+            "races": self.races,
+            "hedged": self.hedged,
+            "secondary_wins": self.secondary_wins,
+            "failures": self.failures,
+            "first_audio_ms_hist": self.first_audio_ms_hist.snapshot(),
+        }
+
+
+_hedge_stats = None
+
+
+def get_hedge_stats() -> HedgeStats:
+    global _hedge_stats
+    if _hedge_stats is None:
+        _hedge_stats = HedgeStats()
+        register_stats("tts_hedge", _hedge_stats.snapshot)
+    return _hedge_stats
+
+
+def init_tts_hedge(config: dict):
+    """读取竞速线程池大小，需在首次竞速之前调用"""
+    global _pool_size
+    hedge_config = config.get("tts_hedge") or {}
+    _pool_size = int(hedge_config.get("pool_size") or DEFAULT_POOL_SIZE)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_pool_size, thread_name_prefix="tts-hedge"
+                )
+    return _executor
+
+
+class _Call:
+    """竞速中的一个请求，fetch(emit) 为协程函数，每收到一块音频数据调用一次 emit"""
+
+    def __init__(self, index: int, fetch, events: queue.Queue, timeout: float):
+        self.index = index
+        self._fetch = fetch
+        self._events = events
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._task = None
+        self.future = _get_executor().submit(self._run)
+
+    def _run(self):
+        loop = get_thread_loop()
+        with self._lock:
+            if self._cancelled:
+                return
+            self._task = loop.create_task(self._fetch(self._emit))
+        try:
+            loop.run_until_complete(asyncio.wait_for(self._task, self._timeout))
+            self._events.put((self.index, None))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self._events.put((self.index, e))
+
+    def _emit(self, chunk: bytes):
+        if chunk and not self._cancelled:
+            self._events.put((self.index, chunk))
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            task = self._task
+        self.future.cancel()
+        if task is not None and not task.done():
+            # 在请求所在线程的事件循环中取消，阻塞在同步调用中的请求会在调用返回后结束
+            task.get_loop().call_soon_threadsafe(task.cancel)
+
+
+class FirstAudioRace:
+    """
+    fetchers 依次为主、备用TTS的取数协程函数
+    chunks() 产出胜出一方的音频数据块，产出第一块时 winner 已确定
+    两方都没有返回音频时抛出最后一个错误
+    """
+
+    def __init__(self, fetchers, delay: float, timeout: float):
+        self.fetchers = fetchers
+        self.delay = delay
+        self.timeout = timeout
+        self.winner = None
+        self.hedged = False
+        self.stats = get_hedge_stats()
+
+    def chunks(self):
+        events = queue.Queue()
+        start = time.monotonic()
+        calls = [_Call(0, self.fetchers[0], events, self.timeout)]
+        finished = 0
+        error = None
+        self.stats.races += 1
+        try:
+            while True:
+                can_hedge = self.winner is None and len(calls) < len(self.fetchers)
+                wait = self.timeout
+                if can_hedge:
+                    wait = max(start + self.delay - time.monotonic(), 0)
+                try:
+                    index, item = events.get(timeout=wait)
+                except queue.Empty:
+                    if not can_hedge:
+                        raise TimeoutError("等待TTS音频超时")
+                    calls.append(self._hedge(events))
+                    continue
+
+                if self.winner is None:
+                    if isinstance(item, bytes):
+                        self._on_win(index, calls, start)
+                    else:
+                        # 没有返回音频就结束了，主TTS失败时立即请求备用TTS
+                        finished += 1
+                        error = item or error
+                        if len(calls) < len(self.fetchers):
+                            calls.append(self._hedge(events))
+                        elif finished == len(calls):
+                            self.stats.failures += 1
+                            raise error or RuntimeError("TTS没有返回音频")
+                        continue
+
+                if index != self.winner:
+                    continue
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for call in calls:
+                call.cancel()
+
+    def _hedge(self, events: queue.Queue) -> _Call:
+        self.hedged = True
+        self.stats.hedged += 1
+        return _Call(len(self.fetchers) - 1, self.fetchers[-1], events, self.timeout)
+
+    def _on_win(self, index: int, calls, start: float):
+        self.winner = index
+        if index:
+            self.stats.secondary_wins += 1
+        self.stats.first_audio_ms_hist.observe((time.monotonic() - start) * 1000)
+        for call in calls:
+            if call.index != index:
+                call.cancel()
+        logger.bind(tag=TAG).debug(
+            f"首句TTS竞速: {'备用' if index else '主'}TTS胜出，"
+            f"耗时{(time.monotonic() - start) * 1000:.0f}ms"
+        )
@@ -0,0 +1,157 @@
+"""
+TTS网络请求复用
+原先每句话都用 asyncio.run 新建并关闭一个事件循环，HTTP请求也每次新建连接，
+每句话的首包延迟都要多出一次TCP/TLS握手。这里：
+- 线程池中的每个线程持有一个常驻事件循环，text_to_speak 在其中执行，不再每句话创建和销毁
+- 每种TTS提供者共用一个保持长连接的 requests.Session，所有连接的请求复用同一个连接池
+- aiohttp 会话与事件循环绑定，每个常驻事件循环持有一个，同样复用连接
+- 共享会话可能被使用不同凭据的连接同时使用，均不保存服务端返回的Cookie
+"""
+
+import asyncio
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from contextlib import asynccontextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.logger import setup_logging
+from core.utils.metrics import register_stats
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_TTS_TIMEOUT = 10
+DEFAULT_POOL_SIZE = 16
+
+_tts_timeout = DEFAULT_TTS_TIMEOUT
+_pool_size = DEFAULT_POOL_SIZE
+_local = threading.local()
+_sessions = {}
+_sessions_lock = threading.Lock()
+_aiohttp_sessions = []  # (事件循环, aiohttp会话)
+
+
+def init_tts_io(config: dict):
+    """读取全局TTS超时与连接池大小，需在创建TTS会话之前调用"""
+    global _tts_timeout, _pool_size
+    _tts_timeout = float(config.get("tts_timeout") or DEFAULT_TTS_TIMEOUT)
+    _pool_size = int(config.get("tts_http_pool_size") or DEFAULT_POOL_SIZE)
+    register_stats("tts_http", get_http_stats)
+
+
+def get_tts_timeout() -> float:
+    return _tts_timeout
+
+
+def run_tts_coroutine(coro, timeout: float = None):
+    """
+    在当前线程的常驻事件循环中执行协程，用于替代 asyncio.run
+    timeout 为 None 时不限制总时长（流式合成）
+    """
+    loop = get_thread_loop()
+    if timeout is not None:
+        coro = asyncio.wait_for(coro, timeout)
+    return loop.run_until_complete(coro)
+
+
+def get_thread_loop() -> asyncio.AbstractEventLoop:
+    """当前线程的常驻事件循环，首次调用时创建"""
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+    return loop
+
+
+class _TimeoutSession(requests.Session):
+    """未指定 timeout 的请求使用全局TTS超时，避免阻塞线程池中的线程"""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", _tts_timeout)
+        return super().request(method, url, **kwargs)
+
+
+def get_http_session(name: str) -> requests.Session:
+    """按TTS提供者返回进程内共享的长连接会话，requests.Session 可以在多个线程中同时使用"""
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = _TimeoutSession()
+            # 不保存响应中的Cookie，避免一个凭据的会话Cookie被其他配置的请求带上
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=_pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[name] = session
+    return session
+
+
+async def get_aiohttp_session():
+    """当前事件循环的 aiohttp 会话，必须在 run_tts_coroutine 执行的协程中调用"""
+    import aiohttp
+
+    session = getattr(_local, "aiohttp_session", None)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=_pool_size),
+            cookie_jar=aiohttp.DummyCookieJar(),
+        )
+        _local.aiohttp_session = session
+        with _sessions_lock:
+            _aiohttp_sessions.append((asyncio.get_running_loop(), session))
+    return session
+
+
+@asynccontextmanager
+async def shared_aiohttp_session():
+    """用法与 async with aiohttp.ClientSession() 相同，但退出时不关闭会话，连接留给下一句复用"""
+    yield await get_aiohttp_session()
+
+
+def close_http_sessions():
+    """服务退出时关闭共享的HTTP会话，aiohttp 会话在其所属的事件循环中关闭"""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+        aiohttp_sessions = list(_aiohttp_sessions)
+        _aiohttp_sessions.clear()
+    for session in sessions:
+        session.close()
+    for loop, session in aiohttp_sessions:
+        if session.closed or loop.is_closed():
+            continue
+        try:
+            if loop.is_running():
+                # 所属线程仍在合成，交给该线程的事件循环关闭
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+            else:
+                # 空闲的常驻事件循环，在临时线程中运行一次完成关闭
+                closer = threading.Thread(
+                    target=loop.run_until_complete, args=(session.close(),), daemon=True
+                )
+                closer.start()
+                closer.join(timeout=2)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"关闭aiohttp会话失败: {e}")
+
+
+def get_http_stats() -> dict:
+    """requests: 发出的请求数；connections: 新建的连接数，两者之差即复用次数"""
+    stats = {}
+    for name, session in list(_sessions.items()):
+        requests_count = 0
+        connections = 0
+        for adapter in set(session.adapters.values()):
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                requests_count += pool.num_requests
+                connections += pool.num_connections
+        stats[name] = {"requests": requests_count, "connections": connections}
+    return stats
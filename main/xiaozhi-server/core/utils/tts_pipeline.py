@@ -0,0 +1,110 @@
+"""
+TTS分段合成流水线
+非流式TTS原先逐段合成：上一段转码入队后才开始请求下一段，合成慢于实时播放时句子之间会出现停顿。
+这里最多同时合成 lookahead 段，输出仍按提交顺序写入播放队列：
+- 队首的段边合成边输出，后面的段先缓存在各自的槽位中，轮到时一次性写入
+- 打断或新一轮对话开始时取消全部未完成的段，已在执行的请求结束后结果直接丢弃
+"""
+
+import threading
+from collections import deque
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class _Slot:
+    """一个分段的输出槽位，put 的用法与 tts_audio_queue.put 相同"""
+
+    def __init__(self, pipeline, generation: int):
+        self._pipeline = pipeline
+        self.generation = generation
+        self.items = []
+        self.done = False
+
+    def put(self, item):
+        self._pipeline._put(self, item)
+
+
+class OrderedSynthesisPipeline:
+    def __init__(self, audio_queue, executor, lookahead: int):
+        self._queue = audio_queue
+        self._executor = executor
+        self.lookahead = max(1, lookahead)
+        self._lock = threading.Lock()
+        self._slots = deque()  # 按提交顺序排列，队首为当前输出的段
+        self._pending = deque()  # 等待启动的 (槽位, 函数, 参数)
+        self._running = 0
+        self._generation = 0
+
+    def submit(self, fn, *args):
+        """提交一段合成任务，在线程池中执行 fn(output, *args)，不阻塞调用方"""
+        with self._lock:
+            slot = _Slot(self, self._generation)
+            self._slots.append(slot)
+            self._pending.append((slot, fn, args))
+            self._start_pending()
+
+    def put_ordered(self, item):
+        """排在已提交的所有段之后写入播放队列，如会话结束消息"""
+        with self._lock:
+            slot = _Slot(self, self._generation)
+            slot.items.append(item)
+            slot.done = True
+            self._slots.append(slot)
+            self._advance()
+
+    def cancel(self):
+        with self._lock:
+            cancelled = len(self._slots)
+            self._generation += 1
+            self._slots.clear()
+            self._pending.clear()
+            self._running = 0
+        if cancelled:
+            logger.bind(tag=TAG).debug(f"已取消{cancelled}个未完成的合成分段")
+
+    def _start_pending(self):
+        while self._pending and self._running < self.lookahead:
+            slot, fn, args = self._pending.popleft()
+            self._running += 1
+            self._executor.submit(self._run, slot, fn, args)
+
+    def _run(self, slot, fn, args):
+        try:
+            fn(slot, *args)
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"分段合成失败: {e}")
+        finally:
+            with self._lock:
+                slot.done = True
+                # 已取消的段不再占用当前一轮的并发名额
+                if slot.generation == self._generation:
+                    self._running -= 1
+                    self._advance()
+                    self._start_pending()
+
+    def _put(self, slot, item):
+        with self._lock:
+            if slot.generation != self._generation:
+                return
+            if self._slots and self._slots[0] is slot:
+                self._queue.put(item)
+            else:
+                slot.items.append(item)
+
+    def _advance(self):
+        while self._slots:
+            head = self._slots[0]
+            if head.items:
+                for item in head.items:
+                    self._queue.put(item)
+                head.items.clear()
+            if not head.done:
+                break
+            self._slots.popleft()
+
+    def in_flight(self) -> int:
+        return len(self._slots)
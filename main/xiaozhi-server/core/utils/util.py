@@ -11,6 +11,14 @@ import numpy as np
 import opuslib_next
 from io import BytesIO
 from core.utils import p3
+from core.utils.audio_decode import IN_PROCESS_TYPES, decode_to_pcm16k
+from core.utils.audio_frame import (
+    DEFAULT_FRAME_DURATION,
+    frame_samples,
+    max_decode_samples,
+    packet_duration_ms,
+)
+from core.utils.opus_encoder_utils import pooled_encoder
 from pydub import AudioSegment
 from typing import Callable, Any
 
@@ -226,28 +234,58 @@ def extract_json_from_string(input_string):
     return None
 
 
-def audio_to_data_stream(
-    audio_file_path, is_opus=True, callback: Callable[[Any], Any] = None
-) -> None:
+def file_to_pcm16k(audio_file_path: str) -> bytes:
+    """
+    将音频文件转换为16kHz单声道16位PCM，WAV在进程内解析，其余格式使用ffmpeg
+    """
     # 获取文件后缀名
     file_type = os.path.splitext(audio_file_path)[1]
     if file_type:
-        file_type = file_type.lstrip(".")
+        file_type = file_type.lstrip(".").lower()
+    if file_type in IN_PROCESS_TYPES:
+        with open(audio_file_path, "rb") as f:
+            return decode_to_pcm16k(f.read(), file_type)
+
     # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
     audio = AudioSegment.from_file(
         audio_file_path, format=file_type, parameters=["-nostdin"]
     )
-
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
     audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
+    return audio.raw_data
 
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
-    pcm_to_data_stream(raw_data, is_opus, callback)
+
+def audio_to_data_stream(
+    audio_file_path,
+    is_opus=True,
+    callback: Callable[[Any], Any] = None,
+    frame_duration: int = DEFAULT_FRAME_DURATION,
+    trimmer=None,
+) -> None:
+    # 获取原始PCM数据（单声道/16kHz采样率/16位小端，确保与编码器匹配）
+    raw_data = file_to_pcm16k(audio_file_path)
+    pcm_to_data_stream(raw_data, is_opus, callback, frame_duration, trimmer)
+
+
+def encode_audio_file(
+    audio_file_path: str,
+    is_opus: bool = True,
+    frame_duration: int = DEFAULT_FRAME_DURATION,
+) -> list[bytes]:
+    """
+    同步将音频文件转换为 frame_duration 毫秒一帧的Opus/PCM帧列表
+    """
+    # 获取原始PCM数据（单声道/16kHz采样率/16位小端，确保与编码器匹配）
+    raw_data = file_to_pcm16k(audio_file_path)
+    datas = []
+    pcm_to_data_stream(raw_data, is_opus, datas.append, frame_duration)
+    return datas
 
 
 async def audio_to_data(
-    audio_file_path: str, is_opus: bool = True, use_cache: bool = True
+    audio_file_path: str,
+    is_opus: bool = True,
+    use_cache: bool = True,
+    frame_duration: int = DEFAULT_FRAME_DURATION,
 ) -> list[bytes]:
     """
     将音频文件转换为Opus/PCM编码的帧列表
@@ -255,12 +293,24 @@ async def audio_to_data(
         audio_file_path: 音频文件路径
         is_opus: 是否进行Opus编码
         use_cache: 是否使用缓存
+        frame_duration: 帧时长（毫秒），与设备协商的值
     """
     from core.utils.cache.manager import cache_manager
     from core.utils.cache.config import CacheType
+    from core.utils.opus_assets import get_asset_pack
 
-    # 生成缓存键，包含文件路径和编码类型
+    # 优先使用预编译的p3文件，不需要启动ffmpeg；p3文件按默认帧时长编码
+    asset_pack = get_asset_pack()
+    use_asset = is_opus and frame_duration == DEFAULT_FRAME_DURATION
+    if use_asset:
+        frames = asset_pack.get(audio_file_path)
+        if frames is not None:
+            return frames
+
+    # 生成缓存键，包含文件路径、编码类型和帧时长
     cache_key = f"{audio_file_path}:{is_opus}"
+    if frame_duration != DEFAULT_FRAME_DURATION:
+        cache_key = f"{cache_key}:{frame_duration}"
 
     # 尝试从缓存获取结果
     if use_cache:
@@ -268,54 +318,14 @@ async def audio_to_data(
         if cached_result is not None:
             return cached_result
 
-    def _sync_audio_to_data():
-        # 获取文件后缀名
-        file_type = os.path.splitext(audio_file_path)[1]
-        if file_type:
-            file_type = file_type.lstrip(".")
-        # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-        audio = AudioSegment.from_file(
-            audio_file_path, format=file_type, parameters=["-nostdin"]
-        )
-
-        # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-        # 获取原始PCM数据（16位小端）
-        raw_data = audio.raw_data
-
-        # 初始化Opus编码器
-        encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
-
-        # 编码参数
-        frame_duration = 60  # 60ms per frame
-        frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
-
-        datas = []
-        # 按帧处理所有音频数据（包括最后一帧可能补零）
-        for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-            # 获取当前帧的二进制数据
-            chunk = raw_data[i : i + frame_size * 2]
-
-            # 如果最后一帧不足，补零
-            if len(chunk) < frame_size * 2:
-                chunk += b"\x00" * (frame_size * 2 - len(chunk))
-
-            if is_opus:
-                # 转换为numpy数组处理
-                np_frame = np.frombuffer(chunk, dtype=np.int16)
-                # 编码Opus数据
-                frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-            else:
-                frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-
-            datas.append(frame_data)
-
-        return datas
-
     loop = asyncio.get_running_loop()
     # 在单独的线程中执行同步的音频处理操作
-    result = await loop.run_in_executor(None, _sync_audio_to_data)
+    result = await loop.run_in_executor(
+        None, encode_audio_file, audio_file_path, is_opus, frame_duration
+    )
+    if use_asset and asset_pack.is_asset(audio_file_path):
+        # 提示音缺少或过期的p3文件在这里补上，下次直接读取
+        await loop.run_in_executor(None, asset_pack.store, audio_file_path, result)
 
     # 将结果存入缓存，使用配置中定义的TTL（10分钟）
     if use_cache:
@@ -325,50 +335,83 @@ async def audio_to_data(
 
 
 def audio_bytes_to_data_stream(
-    audio_bytes, file_type, is_opus, callback: Callable[[Any], Any]
+    audio_bytes,
+    file_type,
+    is_opus,
+    callback: Callable[[Any], Any],
+    frame_duration: int = DEFAULT_FRAME_DURATION,
+    trimmer=None,
 ) -> None:
     """
-    直接用音频二进制数据转为opus/pcm数据，支持wav、mp3、p3
+    直接用音频二进制数据转为opus/pcm数据，支持wav、pcm、mp3、p3
+    trimmer 为 SilenceTrimmer 时在编码前裁掉首尾静音，已编码的p3不裁剪
     """
     if file_type == "p3":
         # 直接用p3解码
-        return p3.decode_opus_from_bytes_stream(audio_bytes, callback)
+        opus_datas, _ = p3.decode_opus_from_bytes(audio_bytes)
+        opus_frames_to_data_stream(opus_datas, callback, frame_duration)
     else:
-        # 其他格式用pydub
-        audio = AudioSegment.from_file(
-            BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
-        )
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        raw_data = audio.raw_data
-        pcm_to_data_stream(raw_data, is_opus, callback)
+        # WAV/PCM在进程内转换，其他格式用ffmpeg
+        raw_data = decode_to_pcm16k(audio_bytes, file_type)
+        pcm_to_data_stream(raw_data, is_opus, callback, frame_duration, trimmer)
 
 
-def pcm_to_data_stream(raw_data, is_opus=True, callback: Callable[[Any], Any] = None):
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
+def opus_frames_to_data_stream(
+    opus_datas, callback: Callable[[Any], Any], frame_duration: int = DEFAULT_FRAME_DURATION
+) -> None:
+    """
+    输出已编码的Opus帧，帧时长与 frame_duration 一致时直接输出，
+    否则解码后按 frame_duration 重新编码
+    """
+    if not opus_datas or packet_duration_ms(opus_datas[0]) == frame_duration:
+        for opus_data in opus_datas:
+            callback(opus_data)
+        return
+    decoder = opuslib_next.Decoder(16000, 1)
+    pcm = bytearray()
+    for opus_data in opus_datas:
+        try:
+            pcm += decoder.decode(bytes(opus_data), max_decode_samples())
+        except opuslib_next.OpusError:
+            continue
+    pcm_to_data_stream(pcm, True, callback, frame_duration)
+
+
+def pcm_to_data_stream(
+    raw_data,
+    is_opus=True,
+    callback: Callable[[Any], Any] = None,
+    frame_duration: int = DEFAULT_FRAME_DURATION,
+    trimmer=None,
+):
+    if trimmer is not None:
+        # 句首句尾的静音不再编码和发送
+        raw_data = trimmer.trim_bytes(bytes(raw_data))
 
     # 编码参数
-    frame_duration = 60  # 60ms per frame
-    frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
-
-    # 按帧处理所有音频数据（包括最后一帧可能补零）
-    for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-        # 获取当前帧的二进制数据
-        chunk = raw_data[i : i + frame_size * 2]
-
-        # 如果最后一帧不足，补零
-        if len(chunk) < frame_size * 2:
-            chunk += b"\x00" * (frame_size * 2 - len(chunk))
-
-        if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-            callback(frame_data)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-            callback(frame_data)
+    frame_size = frame_samples(frame_duration)  # 60ms为960个采样点
+
+    if not is_opus:
+        # 按帧处理所有音频数据（包括最后一帧可能补零）
+        for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
+            chunk = bytes(raw_data[i : i + frame_size * 2])
+            if len(chunk) < frame_size * 2:
+                chunk += b"\x00" * (frame_size * 2 - len(chunk))
+            callback(chunk)
+        return
+
+    # 与原始数据共享内存，完整的帧直接编码，不复制
+    samples = np.frombuffer(raw_data, dtype=np.int16)
+    full_length = len(samples) - len(samples) % frame_size
+    # 从编码器池取用Opus编码器，不再每句话新建
+    with pooled_encoder(16000, 1) as encoder:
+        for i in range(0, full_length, frame_size):
+            callback(encoder.encode(samples[i : i + frame_size], frame_size))
+        # 最后一帧不足时补零
+        if full_length < len(samples):
+            last_frame = np.zeros(frame_size, dtype=np.int16)
+            last_frame[: len(samples) - full_length] = samples[full_length:]
+            callback(encoder.encode(last_frame, frame_size))
 
 
 def opus_datas_to_wav_bytes(opus_datas, sample_rate=16000, channels=1):
@@ -379,8 +422,8 @@ def opus_datas_to_wav_bytes(opus_datas, sample_rate=16000, channels=1):
     try:
         pcm_datas = []
 
-        frame_duration = 60  # ms
-        frame_size = int(sample_rate * frame_duration / 1000)  # 960
+        # Opus包自带时长，按最长帧分配解码缓冲区，任意帧时长都能解码
+        frame_size = max_decode_samples(sample_rate)
 
         for opus_frame in opus_datas:
             # 解码为PCM（返回bytes，2字节/采样点）
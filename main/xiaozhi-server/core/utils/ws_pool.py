@@ -0,0 +1,197 @@
+"""
+流式TTS厂商WebSocket连接池
+原先每个设备连接各自在 start_session 中建立厂商WebSocket（阿里云还要先刷新Token），
+握手耗时全部落在每轮对话第一句话的首包延迟上。这里按厂商配置在进程内共享一组已鉴权的连接：
+- 每轮对话在 SentenceType.FIRST 时租用一个连接，会话正常结束后归还，供其他设备的下一个会话复用
+- 厂商协议支持在一个连接上先后进行多个会话时（火山引擎的连接/会话分离、阿里云的task）归还后继续复用；
+  不支持时（讯飞）归还即关闭，连接池只负责提前建立连接
+- 租用后在后台补足 min_idle 个空闲连接，设备连接建立时也会预热，下一次租用无需等待握手
+- 空闲连接由 websockets 自带的 ping 保活，超过 max_idle_seconds 或已被服务端关闭的连接在租用时丢弃
+所有连接只在服务主事件循环中使用
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Awaitable, Callable
+
+from config.logger import setup_logging
+from core.utils.metrics import Histogram, register_stats
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_MIN_IDLE = 1
+DEFAULT_MAX_IDLE = 4
+
+_min_idle = DEFAULT_MIN_IDLE
+_max_idle = DEFAULT_MAX_IDLE
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def init_ws_pool(config: dict):
+    """读取连接池大小，需在创建TTS会话之前调用"""
+    global _min_idle, _max_idle
+    min_idle = config.get("tts_ws_pool_min_idle")
+    max_idle = config.get("tts_ws_pool_max_idle")
+    _min_idle = max(0, int(min_idle if min_idle is not None else DEFAULT_MIN_IDLE))
+    _max_idle = max(0, int(max_idle if max_idle is not None else DEFAULT_MAX_IDLE))
+    register_stats("tts_ws_pool", get_ws_pool_stats)
+
+
+def _is_open(ws) -> bool:
+    return ws is not None and ws.state.name == "OPEN"
+
+
+async def _close_quietly(ws):
+    try:
+        await ws.close()
+    except Exception:
+        pass
+
+
+class WebSocketPool:
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], Awaitable],
+        min_idle: int = DEFAULT_MIN_IDLE,
+        max_idle: int = DEFAULT_MAX_IDLE,
+        max_idle_seconds: float = 50,
+    ):
+        """
+        Args:
+            connect: 建立一个新连接的协程函数，不能引用具体的设备连接或TTS实例
+            max_idle_seconds: 空闲连接的最长保留时间，应小于厂商服务端的空闲断开时间
+        """
+        self.name = name
+        self._connect = connect
+        self.max_idle = max_idle
+        self.min_idle = min(min_idle, max_idle)
+        self.max_idle_seconds = max_idle_seconds
+        self._idle = deque()  # (连接, 归还时间)，队尾为最近归还的
+        self._connecting = 0
+        self._lost = 0  # 失效后尚未重新建立的连接数
+
+        self.leased = 0
+        self.leases = 0
+        self.connects = 0
+        self.reconnects = 0
+        self.connect_failures = 0
+        self.discarded = 0
+        self.lease_wait_ms_hist = Histogram([1, 5, 20, 50, 100, 200, 500, 1000, 3000])
+
+    async def lease(self):
+        """租用一个连接，优先使用最近归还的空闲连接，没有时新建"""
+        start = time.monotonic()
+        ws = self._take_idle()
+        if ws is None:
+            ws = await self._open()
+        self.leased += 1
+        self.leases += 1
+        self.lease_wait_ms_hist.observe((time.monotonic() - start) * 1000)
+        self.prewarm()
+        return ws
+
+    def release(self, ws, reusable: bool = True):
+        """
+        归还连接，reusable 为 False（会话异常、被打断或协议不支持复用）时直接关闭
+        """
+        if ws is None:
+            return
+        self.leased = max(0, self.leased - 1)
+        if reusable and _is_open(ws) and len(self._idle) < self.max_idle:
+            self._idle.append((ws, time.monotonic()))
+            return
+        self._discard(ws)
+
+    def prewarm(self):
+        """在后台补足 min_idle 个空闲连接，不阻塞调用方"""
+        missing = self.min_idle - len(self._idle) - self._connecting
+        for _ in range(max(0, missing)):
+            self._connecting += 1
+            asyncio.create_task(self._refill())
+
+    def get_stats(self) -> dict:
+        return {
+            "idle": len(self._idle),
+            "leased": self.leased,
+            "connecting": self._connecting,
+            "leases": self.leases,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "connect_failures": self.connect_failures,
+            "discarded": self.discarded,
+            "lease_wait_ms_hist": self.lease_wait_ms_hist.snapshot(),
+        }
+
+    def _take_idle(self):
+        now = time.monotonic()
+        while self._idle:
+            ws, since = self._idle.pop()
+            if _is_open(ws) and now - since < self.max_idle_seconds:
+                return ws
+            self._discard(ws)
+        return None
+
+    def _discard(self, ws):
+        self.discarded += 1
+        self._lost += 1
+        if ws.state.name != "CLOSED":
+            asyncio.create_task(_close_quietly(ws))
+
+    async def _open(self):
+        try:
+            ws = await self._connect()
+        except Exception:
+            self.connect_failures += 1
+            raise
+        self.connects += 1
+        if self._lost:
+            self._lost -= 1
+            self.reconnects += 1
+        return ws
+
+    async def _refill(self):
+        try:
+            ws = await self._open()
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"{self.name} 预热连接失败: {e}")
+            return
+        finally:
+            self._connecting -= 1
+        if len(self._idle) < self.max_idle:
+            self._idle.append((ws, time.monotonic()))
+        else:
+            await _close_quietly(ws)
+
+
+def get_ws_pool(
+    key, name: str, connect: Callable[[], Awaitable], max_idle_seconds: float = 50
+) -> WebSocketPool:
+    """
+    按 key（厂商、地址与鉴权信息）返回进程内共享的连接池，首次调用时创建
+    同一 key 的后续调用忽略 connect 参数，复用第一次传入的建连函数
+    """
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            same_name = sum(1 for p in _pools.values() if p.name.split("#")[0] == name)
+            pool = WebSocketPool(
+                f"{name}#{same_name + 1}" if same_name else name,
+                connect,
+                min_idle=_min_idle,
+                max_idle=_max_idle,
+                max_idle_seconds=max_idle_seconds,
+            )
+            _pools[key] = pool
+    return pool
+
+
+def get_ws_pool_stats() -> dict:
+    return {pool.name: pool.get_stats() for pool in list(_pools.values())}
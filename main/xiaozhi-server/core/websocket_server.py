@@ -34,6 +34,10 @@ from core.connection import ConnectionHandler
 from config.config_loader import get_config_from_api_async
 from core.auth import AuthManager, AuthenticationError
 from core.utils.modules_initialize import initialize_modules
+from core.utils.tts_cache import init_tts_cache
+from core.utils.tts_io import init_tts_io
+from core.utils.tts_hedge import init_tts_hedge
+from core.utils.ws_pool import init_ws_pool
 from core.utils.util import check_vad_update, check_asr_update
 
 TAG = __name__
@@ -58,6 +62,11 @@ class WebSocketServer:
         self._asr = modules["asr"] if "asr" in modules else None
         self._llm = modules["llm"] if "llm" in modules else None
         self._intent = modules["intent"] if "intent" in modules else None
+        # 所有连接共享的TTS音频缓存、HTTP连接池、首句竞速线程池与流式TTS的WebSocket连接池
+        init_tts_cache(self.config)
+        init_tts_io(self.config)
+        init_tts_hedge(self.config)
+        init_ws_pool(self.config)
         self._memory = modules["memory"] if "memory" in modules else None
 
         auth_config = self.config["server"].get("auth", {})
@@ -0,0 +1,98 @@
+import io
+import time
+import wave
+import argparse
+import resource
+import statistics
+
+import numpy as np
+from tabulate import tabulate
+
+from core.utils.audio_decode import _decode_with_ffmpeg, decode_to_pcm16k
+
+description = "TTS音频转16kHz PCM耗时测试（ffmpeg子进程 vs 进程内解析与重采样）"
+
+SAMPLE_RATES = (16000, 22050, 24000, 44100, 48000)
+
+
+def _make_wav(sample_rate: int, seconds: float) -> bytes:
+    """生成一句话长度的合成语音信号（多个谐波叠加噪声）"""
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    signal = sum(0.1 * np.sin(2 * np.pi * f * t) for f in (180, 360, 720, 1500, 3100))
+    signal += 0.01 * np.random.default_rng(0).standard_normal(len(t))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((signal * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def _cpu_seconds() -> float:
+    """本进程与已结束子进程(ffmpeg)的CPU时间之和"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class AudioDecodePerformanceTester:
+    def __init__(self, seconds, rounds):
+        self.seconds = seconds
+        self.rounds = rounds
+        self.results = []
+
+    def _measure(self, convert, wav_bytes):
+        convert(wav_bytes)  # 预热，排除首次加载的耗时
+        latencies = []
+        cpu_start = _cpu_seconds()
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            convert(wav_bytes)
+            latencies.append((time.perf_counter() - start) * 1000)
+        cpu = (_cpu_seconds() - cpu_start) * 1000 / self.rounds
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return statistics.mean(latencies), p95, cpu
+
+    def run(self):
+        paths = (
+            ("ffmpeg子进程(原实现)", lambda data: _decode_with_ffmpeg(data, "wav")),
+            ("进程内解析+重采样", lambda data: decode_to_pcm16k(data, "wav")),
+        )
+        for sample_rate in SAMPLE_RATES:
+            wav_bytes = _make_wav(sample_rate, self.seconds)
+            for label, convert in paths:
+                try:
+                    avg, p95, cpu = self._measure(convert, wav_bytes)
+                except Exception as e:
+                    print(f"{label} @ {sample_rate}Hz 无法测试: {e}")
+                    continue
+                self.results.append(
+                    [label, sample_rate, f"{avg:.2f}", f"{p95:.2f}", f"{cpu:.2f}"]
+                )
+            print(f"{sample_rate}Hz 测试完成")
+        self._print_results()
+
+    def _print_results(self):
+        headers = [
+            "转换方式",
+            "源采样率(Hz)",
+            "平均耗时(ms/句)",
+            "P95耗时(ms/句)",
+            "CPU时间(ms/句)",
+        ]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        print(f"\n每句音频时长{self.seconds}秒，CPU时间包含ffmpeg子进程")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--seconds", type=float, default=3.0, help="每句音频时长（秒）")
+    parser.add_argument("--rounds", type=int, default=50, help="每种情况的转换次数")
+    args = parser.parse_args()
+    AudioDecodePerformanceTester(args.seconds, args.rounds).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import time
+import random
+import asyncio
+import argparse
+from collections import deque
+
+from tabulate import tabulate
+
+from core.utils.audioRateController import AudioRateController, close_pacing_schedulers
+
+description = "音频发送节拍测试（每连接一个发送任务 vs 全局节拍调度器）"
+
+FRAME_DURATION = 60
+
+
+class LegacyAudioRateController:
+    """原实现：每个连接一个发送任务，每个包 asyncio.sleep 到发送时间"""
+
+    def __init__(self, frame_duration=FRAME_DURATION):
+        self.frame_duration = frame_duration
+        self.queue = deque()
+        self.play_position = 0
+        self.start_timestamp = None
+        self.pending_send_task = None
+        self.queue_empty_event = asyncio.Event()
+        self.queue_empty_event.set()
+        self.queue_has_data_event = asyncio.Event()
+
+    def add_audio(self, opus_packet):
+        self.queue.append(("audio", opus_packet))
+        self.queue_empty_event.clear()
+        self.queue_has_data_event.set()
+
+    def add_message(self, message_callback):
+        self.queue.append(("message", message_callback))
+        self.queue_empty_event.clear()
+        self.queue_has_data_event.set()
+
+    async def check_queue(self, send_audio_callback):
+        while self.queue:
+            item_type, payload = self.queue[0]
+            if item_type == "message":
+                self.queue.popleft()
+                await payload()
+            else:
+                if self.start_timestamp is None:
+                    self.start_timestamp = time.monotonic()
+                while True:
+                    elapsed_ms = (time.monotonic() - self.start_timestamp) * 1000
+                    if elapsed_ms < self.play_position:
+                        await asyncio.sleep((self.play_position - elapsed_ms) / 1000)
+                    else:
+                        break
+                self.queue.popleft()
+                self.play_position += self.frame_duration
+                await send_audio_callback(payload)
+        self.queue_empty_event.set()
+        self.queue_has_data_event.clear()
+
+    def start_sending(self, send_audio_callback):
+        async def _send_loop():
+            try:
+                while True:
+                    await self.queue_has_data_event.wait()
+                    await self.check_queue(send_audio_callback)
+            except asyncio.CancelledError:
+                pass
+
+        self.pending_send_task = asyncio.create_task(_send_loop())
+
+    def stop_sending(self):
+        if self.pending_send_task and not self.pending_send_task.done():
+            self.pending_send_task.cancel()
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+class AudioPacingPerformanceTester:
+    def __init__(self, streams, packets, ramp_seconds):
+        self.streams = streams
+        self.packets = packets
+        self.ramp_seconds = ramp_seconds
+        self.results = []
+
+    async def _run_one(self, factory):
+        rng = random.Random(0)
+        send_times = [[] for _ in range(self.streams)]
+        controllers = []
+
+        async def start_stream(index):
+            # 设备陆续开始播放
+            await asyncio.sleep(rng.random() * self.ramp_seconds)
+            controller = factory()
+            controllers.append(controller)
+            times = send_times[index]
+
+            async def send(packet):
+                times.append(time.monotonic())
+
+            async def sentence_start():
+                pass
+
+            controller.start_sending(send)
+            controller.add_message(sentence_start)
+            for _ in range(self.packets):
+                controller.add_audio(b"\x00" * 120)
+            await controller.queue_empty_event.wait()
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(start_stream(i) for i in range(self.streams)))
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        for controller in controllers:
+            controller.stop_sending()
+        close_pacing_schedulers()
+
+        # 相邻两个包的发送间隔与帧时长的偏差
+        # 调度器把连接对齐到节拍，首个间隔可能不足一帧，另外统计不含首个间隔的抖动
+        jitter, steady = [], []
+        for times in send_times:
+            for i, (prev, cur) in enumerate(zip(times, times[1:])):
+                deviation = abs((cur - prev) * 1000 - FRAME_DURATION)
+                jitter.append(deviation)
+                if i > 0:
+                    steady.append(deviation)
+        return cpu, wall, jitter, steady
+
+    def run(self):
+        for label, factory in (
+            ("每连接发送任务(原实现)", LegacyAudioRateController),
+            ("全局节拍调度器", lambda: AudioRateController(FRAME_DURATION)),
+        ):
+            cpu, wall, jitter, steady = asyncio.run(self._run_one(factory))
+            self.results.append(
+                [
+                    label,
+                    self.streams,
+                    f"{wall:.2f}",
+                    f"{cpu:.2f}",
+                    f"{cpu / wall * 100:.1f}",
+                    f"{_percentile(jitter, 0.5):.2f}",
+                    f"{_percentile(jitter, 0.99):.2f}",
+                    f"{_percentile(steady, 0.99):.2f}",
+                    f"{max(jitter) if jitter else 0:.2f}",
+                ]
+            )
+            print(f"{label} 测试完成")
+        self._print_results()
+
+    def _print_results(self):
+        headers = [
+            "发送方式",
+            "连接数",
+            "耗时(s)",
+            "事件循环CPU(s)",
+            "CPU占用(%)",
+            "间隔抖动P50(ms)",
+            "间隔抖动P99(ms)",
+            "不含首个间隔P99(ms)",
+            "最大抖动(ms)",
+        ]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        print(
+            f"\n每个连接发送{self.packets}个{FRAME_DURATION}ms音频包，"
+            f"各连接在{self.ramp_seconds}秒内陆续开始；抖动为相邻包发送间隔与帧时长之差"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--streams", type=int, default=1000, help="同时播放的连接数")
+    parser.add_argument("--packets", type=int, default=100, help="每个连接发送的音频包数")
+    parser.add_argument("--ramp", type=float, default=1.0, help="连接开始播放的时间分布（秒）")
+    args = parser.parse_args()
+    AudioPacingPerformanceTester(args.streams, args.packets, args.ramp).run()
+
+
+if __name__ == "__main__":
+    main()
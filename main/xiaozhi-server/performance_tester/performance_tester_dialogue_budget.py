@@ -0,0 +1,195 @@
+import json
+import time
+import random
+import argparse
+import statistics
+
+from tabulate import tabulate
+
+from core.utils.dialogue import Dialogue, Message
+from core.utils.dialogue_budget import DialogueBudget, estimate_tokens
+
+description = "对话上下文预算测试（每次发送全部历史 vs 最近几轮+滚动摘要）"
+
+SYSTEM_PROMPT = (
+    "你是小智，一个温柔、耐心的语音助手。回答口语化，简短，不使用markdown。\n"
+    "<memory>\n</memory>\n当前时间：{{current_time}}\n"
+) + "请遵守以下规则：" + "回答要准确，遇到不确定的问题先调用工具查询。" * 20
+
+QUESTIONS = [
+    "今天天气怎么样？",
+    "帮我放一首周杰伦的歌",
+    "给我讲个笑话吧",
+    "明天早上七点叫我起床",
+    "北京到上海的高铁要多久？",
+    "What's the difference between a list and a tuple in Python?",
+    "我最近睡眠不太好，有什么建议吗？",
+    "帮我查一下苹果公司的股价",
+]
+ANSWER = "好的，" + "这个问题我来给你详细说一说，其实没有那么复杂，你听我慢慢讲。" * 3
+TOOL_RESULT = json.dumps(
+    {"city": "北京", "weather": "晴", "temp": "25℃", "forecast": ["晴", "多云", "小雨"] * 5},
+    ensure_ascii=False,
+)
+
+
+def _play_turn(dialogue: Dialogue, rng: random.Random, tool_rate: float, turn: int):
+    """模拟一轮对话，返回本轮每次请求LLM时的消息列表"""
+    requests = []
+    dialogue.put(Message(role="user", content=rng.choice(QUESTIONS)))
+    requests.append(dialogue.get_llm_dialogue_with_memory(None, {}))
+    if rng.random() < tool_rate:
+        call_id = f"call_{turn}"
+        dialogue.put(
+            Message(
+                role="assistant",
+                tool_calls=[
+                    {
+                        "id": call_id,
+                        "type": "function",
+                        "function": {"name": "get_weather", "arguments": '{"city": "北京"}'},
+                    }
+                ],
+            )
+        )
+        dialogue.put(Message(role="tool", content=TOOL_RESULT, tool_call_id=call_id))
+        requests.append(dialogue.get_llm_dialogue_with_memory(None, {}))
+    dialogue.put(Message(role="assistant", content=ANSWER))
+    return requests
+
+
+def _request_tokens(messages) -> int:
+    tokens = 0
+    for message in messages:
+        tokens += 4 + estimate_tokens(message.get("content"))
+        if message.get("tool_calls"):
+            tokens += estimate_tokens(json.dumps(message["tool_calls"], ensure_ascii=False))
+    return tokens
+
+
+def _pairs_intact(messages) -> bool:
+    """每条工具结果之前都有对应的工具调用"""
+    call_ids = set()
+    for message in messages:
+        for call in message.get("tool_calls") or []:
+            call_ids.add(call["id"])
+        if message["role"] == "tool" and message["tool_call_id"] not in call_ids:
+            return False
+    return True
+
+
+def _fake_summary(previous, transcript, max_chars):
+    """按字数截断代替LLM摘要，只用于估计摘要占用的token"""
+    return (previous + transcript)[-max_chars:]
+
+
+class DialogueBudgetPerformanceTester:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+        self.curves = {}
+        self.jobs = []  # 待执行的摘要任务，每轮结束后执行，模拟后台摘要在下一轮之前完成
+
+    def _run_session(self, budget):
+        a = self.args
+        rng = random.Random(a.seed)
+        dialogue = Dialogue()
+        dialogue.update_system_message(SYSTEM_PROMPT)
+        dialogue.budget = budget
+        tokens, build_us, intact = [], [], True
+        for turn in range(a.turns):
+            start = time.perf_counter()
+            requests = _play_turn(dialogue, rng, a.tool_rate, turn)
+            build_us.append((time.perf_counter() - start) * 1e6 / len(requests))
+            for messages in requests:
+                tokens.append(_request_tokens(messages))
+                intact = intact and _pairs_intact(messages)
+            while self.jobs:
+                fn, args = self.jobs.pop()
+                fn(*args)
+        return tokens, build_us, intact
+
+    def run(self):
+        a = self.args
+        for label, budget in (
+            ("发送全部历史(原实现)", None),
+            (
+                f"预算{a.max_tokens} tokens，保留最近{a.keep}轮+摘要",
+                DialogueBudget(
+                    a.max_tokens,
+                    keep_turns=a.keep,
+                    summary_batch_turns=a.batch,
+                    summary_max_chars=a.summary_chars,
+                    summarize=_fake_summary,
+                    submit=lambda fn, *args: self.jobs.append((fn, args)),
+                ),
+            ),
+        ):
+            tokens, build_us, intact = self._run_session(budget)
+            self.curves[label] = tokens
+            self.results.append(
+                [
+                    label,
+                    f"{statistics.mean(tokens):.0f}",
+                    f"{max(tokens)}",
+                    f"{sum(tokens) / 1000:.0f}k",
+                    f"{statistics.mean(build_us):.0f}",
+                    "是" if intact else "否",
+                ]
+            )
+        self._print_results()
+
+    def _print_results(self):
+        headers = [
+            "上下文构造方式",
+            "每次请求平均tokens",
+            "最大tokens",
+            "整个会话累计tokens",
+            "每次构造耗时(us)",
+            "工具调用与结果完整",
+        ]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        # 每隔若干轮的请求token数，看增长趋势
+        step = max(self.args.turns // 6, 1)
+        rows = []
+        for label, tokens in self.curves.items():
+            rows.append([label] + [tokens[min(i, len(tokens) - 1)] for i in range(0, len(tokens), step)])
+        print()
+        print(tabulate(rows, tablefmt="github"))
+        a = self.args
+        print(
+            f"\n模拟{a.turns}轮对话，{a.tool_rate:.0%}的轮次调用一次工具（每次工具调用多一次LLM请求），"
+            f"token为本地估计值，摘要用截断代替LLM"
+        )
+        self._print_estimate_accuracy()
+
+    @staticmethod
+    def _print_estimate_accuracy():
+        """安装了 tiktoken 时对比本地估计与实际分词结果"""
+        try:
+            import tiktoken
+        except ImportError:
+            return
+        encoding = tiktoken.get_encoding("cl100k_base")
+        samples = QUESTIONS + [ANSWER, TOOL_RESULT, SYSTEM_PROMPT]
+        rows = [
+            [text[:20], estimate_tokens(text), len(encoding.encode(text))] for text in samples
+        ]
+        print(tabulate(rows, headers=["文本", "本地估计", "cl100k实际"], tablefmt="github"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--turns", type=int, default=60, help="对话轮数")
+    parser.add_argument("--tool-rate", type=float, default=0.3, help="调用工具的轮次比例")
+    parser.add_argument("--max-tokens", type=int, default=4000, help="每次请求的token上限")
+    parser.add_argument("--keep", type=int, default=6, help="原样保留的最近轮数")
+    parser.add_argument("--batch", type=int, default=4, help="累计多少轮旧对话后生成摘要")
+    parser.add_argument("--summary-chars", type=int, default=300, help="摘要最大字数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+    DialogueBudgetPerformanceTester(args).run()
+
+
+if __name__ == "__main__":
+    main()
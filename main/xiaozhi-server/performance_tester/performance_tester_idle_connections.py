@@ -0,0 +1,139 @@
+import time
+import queue
+import asyncio
+import argparse
+import threading
+import multiprocessing
+
+from tabulate import tabulate
+
+from core.utils.async_pipeline import LoopQueue, get_shared_executor
+
+description = "空闲连接资源占用测试（每连接常驻线程 vs 事件循环任务）"
+
+# 原实现每个连接的常驻线程及其队列轮询超时（秒）：
+# ASR音频、TTS文本、聊天记录上报各1秒，音频播放0.1秒
+THREAD_POLL_TIMEOUTS = (1, 1, 0.1, 1)
+QUEUES_PER_CONNECTION = len(THREAD_POLL_TIMEOUTS)
+
+
+def _rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _poll_worker(q, timeout, stop_event):
+    """与原先 asr/tts/音频播放/上报线程相同的空闲轮询方式"""
+    while not stop_event.is_set():
+        try:
+            q.get(timeout=timeout)
+        except queue.Empty:
+            continue
+
+
+async def _loop_queue_consumer(q, stop_event):
+    while not stop_event.is_set():
+        await q.get()
+
+
+def _run_mode(mode, connections, seconds):
+    return asyncio.run(_measure(mode, connections, seconds))
+
+
+async def _measure(mode, connections, seconds):
+    loop = asyncio.get_running_loop()
+    stop_event = threading.Event()
+    base_rss = _rss_kb()
+    workers = []
+
+    if mode == "threads":
+        for _ in range(connections):
+            for timeout in THREAD_POLL_TIMEOUTS:
+                t = threading.Thread(
+                    target=_poll_worker,
+                    args=(queue.Queue(), timeout, stop_event),
+                    daemon=True,
+                )
+                t.start()
+                workers.append(t)
+    else:
+        # 共享线程池只会按需创建线程，空闲时不占用资源
+        get_shared_executor()
+        for _ in range(connections):
+            for _ in range(QUEUES_PER_CONNECTION):
+                q = LoopQueue()
+                q.bind(loop)
+                task = asyncio.create_task(_loop_queue_consumer(q, stop_event))
+                workers.append(task)
+
+    # 等待启动阶段结束，只统计空闲期间的CPU
+    await asyncio.sleep(1)
+    rss = _rss_kb()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    stop_event.set()
+    return {
+        "mode": mode,
+        "threads": threading.active_count(),
+        "cpu_percent": cpu / wall * 100,
+        "rss_mb": (rss - base_rss) / 1024,
+    }
+
+
+class IdleConnectionPerformanceTester:
+    def __init__(self, connections, seconds):
+        self.connections = connections
+        self.seconds = seconds
+        self.results = []
+
+    def _run_child(self, mode):
+        # 每种方式在独立进程中测量，避免互相影响RSS
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(1) as pool:
+            return pool.apply(_run_mode, (mode, self.connections, self.seconds))
+
+    def run(self):
+        per_k = 1000 / self.connections
+        for label, mode in (("每连接常驻线程(原实现)", "threads"), ("事件循环任务", "asyncio")):
+            result = self._run_child(mode)
+            self.results.append(
+                [
+                    label,
+                    self.connections,
+                    result["threads"],
+                    f"{result['cpu_percent'] * per_k:.2f}",
+                    f"{result['rss_mb'] * per_k:.1f}",
+                ]
+            )
+            print(f"{label} 测试完成")
+        self._print_results()
+
+    def _print_results(self):
+        headers = [
+            "实现方式",
+            "连接数",
+            "线程数",
+            "空闲CPU(%/千连接)",
+            "RSS(MB/千连接)",
+        ]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        print(f"\n空闲CPU为{self.seconds}秒内进程CPU时间占墙钟时间的比例，按1000个连接折算")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--connections", type=int, default=1000, help="模拟的空闲连接数")
+    parser.add_argument("--seconds", type=int, default=10, help="空闲统计时长（秒）")
+    args = parser.parse_args()
+    IdleConnectionPerformanceTester(args.connections, args.seconds).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import time
+import wave
+import asyncio
+import argparse
+import statistics
+
+from tabulate import tabulate
+
+from config.settings import load_config
+from core.utils.asr import create_instance as create_stt_instance
+from core.utils.model_worker_pool import ModelWorkerPool
+
+description = "本地识别并发时的事件循环延迟测试（线程执行 vs 模型工作进程池）"
+
+TICK_MS = 10  # 探测间隔，音频发送按60ms节奏，延迟超过一帧即可能出现卡顿
+# 以脚本方式运行时为 "__main__"，spawn 启动的工作进程中同样指向本脚本
+BURN_FACTORY = f"{__name__}:create_burn_model"
+
+
+def create_burn_model(config: dict):
+    """模拟识别：纯Python计算，执行期间持有GIL"""
+    iterations = int(config.get("iterations", 2_000_000))
+
+    def recognize(pcm_view):
+        total = 0
+        for i in range(iterations):
+            total += i * i
+        return str(total % 1000)
+
+    return recognize
+
+
+class LoopLagMonitor:
+    """以固定间隔sleep，记录实际唤醒时间比预期晚了多少"""
+
+    def __init__(self):
+        self.lags = []
+        self._stop = False
+
+    async def run(self):
+        interval = TICK_MS / 1000
+        while not self._stop:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.lags.append((time.perf_counter() - start - interval) * 1000)
+
+    def stop(self):
+        self._stop = True
+
+    def summary(self):
+        lags = sorted(self.lags) or [0]
+        p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+        return statistics.mean(lags), p99, lags[-1]
+
+
+class LoopLagPerformanceTester:
+    def __init__(self, asr_name, concurrency, rounds, workers, wav_path):
+        self.asr_name = asr_name
+        self.concurrency = concurrency
+        self.rounds = rounds
+        self.workers = workers
+        self.pcm = self._load_pcm(wav_path) if asr_name else b"\x00" * 32000
+        self.results = []
+
+    @staticmethod
+    def _load_pcm(wav_path):
+        with wave.open(wav_path, "rb") as f:
+            if f.getframerate() != 16000 or f.getnchannels() != 1:
+                raise ValueError("测试音频需为16kHz单声道WAV")
+            return f.readframes(f.getnframes())
+
+    def _create_asr(self, process_workers):
+        config = dict(load_config()["ASR"][self.asr_name])
+        config["process_workers"] = process_workers
+        config["batch_enabled"] = False
+        stt = create_stt_instance(config.get("type", self.asr_name), config, True)
+        if stt.worker_pool is not None:
+            # 等待工作进程加载完模型，避免把加载耗时计入测试
+            stt.worker_pool.submit(self.pcm[:32000]).result()
+        return lambda: stt.speech_to_text([self.pcm], "loop_lag", "pcm")
+
+    def _create_burn(self, process_workers):
+        if process_workers > 0:
+            pool = ModelWorkerPool(BURN_FACTORY, {}, process_workers)
+            pool.submit(b"\x00").result()
+            return lambda: pool.run(self.pcm), pool
+        recognize = create_burn_model({})
+        return lambda: asyncio.to_thread(recognize, memoryview(self.pcm)), None
+
+    async def _run_mode(self, name, recognize):
+        monitor = LoopLagMonitor()
+        monitor_task = asyncio.create_task(monitor.run())
+        start = time.perf_counter()
+        for _ in range(self.rounds):
+            await asyncio.gather(*[recognize() for _ in range(self.concurrency)])
+        elapsed = time.perf_counter() - start
+        monitor.stop()
+        await monitor_task
+        avg, p99, worst = monitor.summary()
+        total = self.concurrency * self.rounds
+        self.results.append(
+            [
+                name,
+                self.concurrency,
+                f"{total / elapsed:.2f}",
+                f"{avg:.1f}",
+                f"{p99:.1f}",
+                f"{worst:.1f}",
+            ]
+        )
+
+    async def run(self):
+        workload = self.asr_name or "模拟识别"
+        for label, process_workers in (
+            ("线程执行(当前实现)", 0),
+            (f"工作进程池x{self.workers}", self.workers),
+        ):
+            pool = None
+            if self.asr_name:
+                recognize = self._create_asr(process_workers)
+            else:
+                recognize, pool = self._create_burn(process_workers)
+            await self._run_mode(f"{workload} {label}", recognize)
+            if pool is not None:
+                pool.close()
+            print(f"{label} 测试完成")
+        self._print_results()
+
+    def _print_results(self):
+        headers = [
+            "执行方式",
+            "并发数",
+            "识别次数/秒",
+            "平均循环延迟(ms)",
+            "P99循环延迟(ms)",
+            "最大循环延迟(ms)",
+        ]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        print(f"\n循环延迟为{TICK_MS}ms定时器的实际唤醒滞后，超过60ms即会影响音频发送节奏")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--asr",
+        default="",
+        help="config.yaml中的本地ASR名称（如FunASR、SherpaASR），为空时使用模拟识别负载",
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="同时识别的请求数")
+    parser.add_argument("--rounds", type=int, default=5, help="测试轮数")
+    parser.add_argument("--workers", type=int, default=2, help="工作进程数")
+    parser.add_argument(
+        "--wav", default="config/assets/test_local.wav", help="测试音频(16kHz单声道)"
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        LoopLagPerformanceTester(
+            args.asr, args.concurrency, args.rounds, args.workers, args.wav
+        ).run()
+    )
+
+
+if __name__ == "__main__":
+    main()
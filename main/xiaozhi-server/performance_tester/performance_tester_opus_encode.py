@@ -0,0 +1,150 @@
+import time
+import argparse
+
+import numpy as np
+import opuslib_next
+from tabulate import tabulate
+
+from core.utils.opus_encoder_utils import OpusEncoderUtils
+from core.utils.util import pcm_to_data_stream
+
+description = "TTS音频Opus编码吞吐测试（每句新建编码器+np.append vs 编码器池+定长缓冲区）"
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 960  # 60ms
+
+
+def legacy_pcm_to_data_stream(raw_data, callback):
+    """原实现：每句话新建编码器，逐帧切片并复制为bytes"""
+    encoder = opuslib_next.Encoder(SAMPLE_RATE, 1, opuslib_next.APPLICATION_AUDIO)
+    for i in range(0, len(raw_data), FRAME_SIZE * 2):
+        chunk = raw_data[i : i + FRAME_SIZE * 2]
+        if len(chunk) < FRAME_SIZE * 2:
+            chunk += b"\x00" * (FRAME_SIZE * 2 - len(chunk))
+        np_frame = np.frombuffer(chunk, dtype=np.int16)
+        callback(encoder.encode(np_frame.tobytes(), FRAME_SIZE))
+
+
+class LegacyStreamEncoder:
+    """原实现：每个分片用 np.append 追加到缓冲区，每个连接新建编码器"""
+
+    def __init__(self):
+        self.encoder = opuslib_next.Encoder(
+            SAMPLE_RATE, 1, opuslib_next.APPLICATION_AUDIO
+        )
+        self.encoder.bitrate = 24000
+        self.encoder.complexity = 10
+        self.encoder.signal = opuslib_next.SIGNAL_VOICE
+        self.buffer = np.array([], dtype=np.int16)
+
+    def encode_pcm_to_opus_stream(self, pcm_data, end_of_stream, callback):
+        new_samples = np.frombuffer(pcm_data, dtype=np.int16)
+        # 原实现中对 int16 数据做的范围校验
+        np.any((new_samples < -32768) | (new_samples > 32767))
+        self.buffer = np.append(self.buffer, new_samples)
+        offset = 0
+        while offset <= len(self.buffer) - FRAME_SIZE:
+            frame = self.buffer[offset : offset + FRAME_SIZE]
+            callback(self.encoder.encode(frame.tobytes(), FRAME_SIZE))
+            offset += FRAME_SIZE
+        self.buffer = self.buffer[offset:]
+        if end_of_stream and len(self.buffer) > 0:
+            last_frame = np.zeros(FRAME_SIZE, dtype=np.int16)
+            last_frame[: len(self.buffer)] = self.buffer
+            callback(self.encoder.encode(last_frame.tobytes(), FRAME_SIZE))
+            self.buffer = np.array([], dtype=np.int16)
+
+
+def _make_pcm(seconds: float, seed: int = 0) -> bytes:
+    """生成一句话长度的合成语音信号（多个谐波叠加噪声）"""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    signal = sum(0.1 * np.sin(2 * np.pi * f * t) for f in (180, 360, 720, 1500, 3100))
+    signal += 0.01 * np.random.default_rng(seed).standard_normal(len(t))
+    return (signal * 32767).astype("<i2").tobytes()
+
+
+def _split(data: bytes, chunk_bytes: int) -> list:
+    """模拟流式TTS厂商的下行分片，分片大小不按帧对齐"""
+    return [data[i : i + chunk_bytes] for i in range(0, len(data), chunk_bytes)]
+
+
+class OpusEncodePerformanceTester:
+    def __init__(self, seconds, sentences, chunk_bytes):
+        self.seconds = seconds
+        self.sentences = sentences
+        self.chunk_bytes = chunk_bytes
+        self.results = []
+
+    def _measure(self, label, run):
+        frames = []
+        run(frames.append)  # 预热
+        frames.clear()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        run(frames.append)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        self.results.append(
+            [
+                label,
+                len(frames),
+                f"{wall * 1000:.1f}",
+                f"{cpu * 1e6 / len(frames):.1f}",
+                f"{len(frames) / cpu:.0f}",
+            ]
+        )
+
+    def run(self):
+        pcm = _make_pcm(self.seconds)
+        chunks = _split(pcm, self.chunk_bytes)
+
+        def sentence_legacy(callback):
+            for _ in range(self.sentences):
+                legacy_pcm_to_data_stream(pcm, callback)
+
+        def sentence_pooled(callback):
+            for _ in range(self.sentences):
+                pcm_to_data_stream(pcm, True, callback)
+
+        def stream_legacy(callback):
+            for _ in range(self.sentences):
+                encoder = LegacyStreamEncoder()
+                for chunk in chunks:
+                    encoder.encode_pcm_to_opus_stream(chunk, False, callback)
+                encoder.encode_pcm_to_opus_stream(b"", True, callback)
+
+        def stream_pooled(callback):
+            for _ in range(self.sentences):
+                encoder = OpusEncoderUtils(SAMPLE_RATE, 1, 60)
+                for chunk in chunks:
+                    encoder.encode_pcm_to_opus_stream(chunk, False, callback)
+                encoder.encode_pcm_to_opus_stream(b"", True, callback)
+                encoder.close()
+
+        self._measure("整句编码-每句新建编码器(原实现)", sentence_legacy)
+        self._measure("整句编码-编码器池", sentence_pooled)
+        self._measure("流式分片-np.append(原实现)", stream_legacy)
+        self._measure("流式分片-定长缓冲区+编码器池", stream_pooled)
+        self._print_results()
+
+    def _print_results(self):
+        headers = ["编码方式", "帧数", "耗时(ms)", "CPU时间(us/帧)", "单核吞吐(帧/秒)"]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        print(
+            f"\n共{self.sentences}句，每句{self.seconds}秒，流式分片大小{self.chunk_bytes}字节"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--seconds", type=float, default=3.0, help="每句音频时长（秒）")
+    parser.add_argument("--sentences", type=int, default=50, help="编码的句子数")
+    parser.add_argument(
+        "--chunk-bytes", type=int, default=3200, help="流式TTS每个下行分片的字节数"
+    )
+    args = parser.parse_args()
+    OpusEncodePerformanceTester(args.seconds, args.sentences, args.chunk_bytes).run()
+
+
+if __name__ == "__main__":
+    main()
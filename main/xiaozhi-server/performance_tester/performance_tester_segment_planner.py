@@ -0,0 +1,212 @@
+import heapq
+import math
+import random
+import argparse
+import statistics
+
+from tabulate import tabulate
+
+from core.utils.sentence_segmenter import SentenceSegmenter
+from core.utils.segment_planner import SegmentPlanner
+
+description = "非流式TTS分段合并测试（每个分段一次请求 vs 按播放进度合并短分段）"
+
+FRAME_DURATION = 60
+
+# 多短句的LLM回复
+REPLIES = [
+    "好的，没问题。嗯，我来帮你查一下。明天北京晴，最高气温二十五度，最低十五度。早晚有点凉，记得带件外套哦！",
+    "哈哈，你说得对。其实呢，我也这么觉得。不过，事情没有那么简单，我们还是先看看具体情况吧。",
+    "嗯嗯，收到！已经帮你把闹钟设在早上七点了。还有别的需要吗？比如，提醒你吃早饭？",
+    "哇，这个问题好有意思。简单来说，天空是蓝色的，是因为阳光里的蓝光更容易被空气散射。所以，白天抬头看，天就是蓝的啦。",
+    "好呀，那我给你讲个故事吧。从前，有一只小兔子，它很喜欢胡萝卜。有一天，它在森林里迷路了。别担心，最后它找到了回家的路。",
+    "对，对。没错。就是这样。你真聪明！下次有问题，随时问我就好啦。",
+]
+
+
+def _token_stream(text, token_ms, rng):
+    """把回复切成1~3个字符的增量，按固定间隔到达"""
+    t, i = 0.0, 0
+    while i < len(text):
+        n = rng.randint(1, 3)
+        yield t, text[i : i + n]
+        i += n
+        t += token_ms / 1000
+
+
+class SimulatedTTS:
+    """按字数估计一次非流式TTS请求的耗时和音频时长"""
+
+    def __init__(self, rtt_ms, synth_ms_per_char, ms_per_char, pad_ms):
+        self.rtt_ms = rtt_ms
+        self.synth_ms_per_char = synth_ms_per_char
+        self.ms_per_char = ms_per_char
+        self.pad_ms = pad_ms  # 每次请求的音频首尾静音
+
+    def latency(self, text) -> float:
+        return (self.rtt_ms + len(text) * self.synth_ms_per_char) / 1000
+
+    def frames(self, text) -> int:
+        return math.ceil((self.pad_ms + len(text) * self.ms_per_char) / FRAME_DURATION)
+
+
+def simulate_reply(text, merge_chars, lookahead, tts, token_ms, seed):
+    """
+    按事件时间顺序模拟一轮回复：LLM增量到达、分句、规划、合成和设备播放
+    lookahead 为1时合成阻塞文本处理（与逐句合成一致），大于1时最多同时合成 lookahead 段
+    返回 (请求数, 首次出声时间, 各次断音时长)
+    """
+    now = [0.0]
+    planner = SegmentPlanner(max_chars=merge_chars, clock=lambda: now[0])
+    segmenter = SentenceSegmenter()
+    rng = random.Random(seed)
+
+    events = []  # (时间, 序号, 类型, 数据)
+    seq = 0
+
+    def schedule(t, kind, data=None):
+        nonlocal seq
+        heapq.heappush(events, (t, seq, kind, data))
+        seq += 1
+
+    for t, delta in _token_stream(text, token_ms, rng):
+        schedule(t, "token", delta)
+    tokens_left = sum(1 for e in events if e[2] == "token")
+
+    segments = []  # 每段: [文本, 到达时间]
+    waiting = []  # 等待合成槽位的分段序号
+    running = 0
+    text_busy_until = 0.0  # 逐句合成时文本处理被合成阻塞
+
+    def start(index):
+        nonlocal running
+        running += 1
+        context = planner.track(lambda frame: None, FRAME_DURATION)
+        handler = context.__enter__()
+        schedule(now[0] + tts.latency(segments[index][0]), "done", (index, context, handler))
+
+    def submit(texts):
+        for item in texts:
+            segments.append([item, None])
+            waiting.append(len(segments) - 1)
+        while waiting and running < lookahead:
+            start(waiting.pop(0))
+
+    while events:
+        t, _, kind, data = heapq.heappop(events)
+        if kind == "token" and lookahead == 1 and t < text_busy_until:
+            # 文本线程正在合成，增量排队等待
+            schedule(text_busy_until, kind, data)
+            continue
+        now[0] = t
+        if kind == "token":
+            tokens_left -= 1
+            texts = []
+            for segment in segmenter.push(data):
+                texts += planner.push(segment)
+            texts += planner.poll()
+            if tokens_left == 0:
+                remaining = segmenter.flush()
+                if remaining:
+                    texts += planner.push(remaining)
+                texts += planner.flush()
+            submit(texts)
+            if lookahead == 1 and running:
+                text_busy_until = max(e[0] for e in events if e[2] == "done")
+        else:
+            index, context, handler = data
+            for _ in range(tts.frames(segments[index][0])):
+                handler(b"")
+            context.__exit__(None, None, None)
+            segments[index][1] = t
+            running -= 1
+            submit([])
+    planner.finish()
+
+    # 设备按顺序播放，每段在到达且上一段播完后开始
+    gaps = []
+    play_end = None
+    first_audio = None
+    for item, arrival in segments:
+        start_time = arrival if play_end is None else max(arrival, play_end)
+        if play_end is None:
+            first_audio = start_time
+        elif start_time > play_end:
+            gaps.append((start_time - play_end) * 1000)
+        play_end = start_time + tts.frames(item) * FRAME_DURATION / 1000
+    return len(segments), first_audio * 1000, gaps
+
+
+class SegmentPlannerPerformanceTester:
+    def __init__(self, args):
+        self.args = args
+        self.tts = SimulatedTTS(args.rtt, args.synth_ms, args.char_ms, args.pad)
+        self.results = []
+
+    def run(self):
+        for label, merge_chars in (
+            ("每个分段一次请求(原实现)", 0),
+            (f"按播放进度合并(≤{self.args.merge}字)", self.args.merge),
+        ):
+            requests, first_audio, gaps, gap_totals = [], [], [], []
+            for round_index in range(self.args.rounds):
+                for i, text in enumerate(REPLIES):
+                    n, first, reply_gaps = simulate_reply(
+                        text,
+                        merge_chars,
+                        self.args.lookahead,
+                        self.tts,
+                        self.args.token_ms,
+                        seed=round_index * len(REPLIES) + i,
+                    )
+                    requests.append(n)
+                    first_audio.append(first)
+                    gaps += reply_gaps
+                    gap_totals.append(sum(reply_gaps))
+            audible = [g for g in gaps if g >= 100]
+            self.results.append(
+                [
+                    label,
+                    f"{statistics.mean(requests):.2f}",
+                    f"{statistics.mean(first_audio):.0f}",
+                    f"{len(audible) / len(requests):.2f}",
+                    f"{statistics.mean(gap_totals):.0f}",
+                    f"{max(gaps) if gaps else 0:.0f}",
+                ]
+            )
+        self._print_results()
+
+    def _print_results(self):
+        headers = [
+            "分段方式",
+            "每轮请求数",
+            "首次出声(ms)",
+            "每轮断音次数(≥100ms)",
+            "每轮断音总时长(ms)",
+            "最长断音(ms)",
+        ]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        a = self.args
+        print(
+            f"\n模拟{len(REPLIES)}条多短句回复×{a.rounds}轮：LLM每{a.token_ms}ms输出1~3个字符，"
+            f"TTS每次请求耗时{a.rtt}ms+{a.synth_ms}ms/字，音频{a.char_ms}ms/字+首尾静音{a.pad}ms，"
+            f"同时合成{a.lookahead}段"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--merge", type=int, default=40, help="合并后的最大字数")
+    parser.add_argument("--lookahead", type=int, default=1, help="同时合成的分段数")
+    parser.add_argument("--token-ms", type=float, default=40, help="LLM增量间隔(ms)")
+    parser.add_argument("--rtt", type=float, default=400, help="每次TTS请求的固定耗时(ms)")
+    parser.add_argument("--synth-ms", type=float, default=10, help="每个字的合成耗时(ms)")
+    parser.add_argument("--char-ms", type=float, default=220, help="每个字的音频时长(ms)")
+    parser.add_argument("--pad", type=float, default=150, help="每次请求音频的首尾静音(ms)")
+    parser.add_argument("--rounds", type=int, default=20, help="重复轮数（增量切分随机）")
+    args = parser.parse_args()
+    SegmentPlannerPerformanceTester(args).run()
+
+
+if __name__ == "__main__":
+    main()
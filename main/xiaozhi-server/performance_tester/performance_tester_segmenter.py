@@ -0,0 +1,150 @@
+import time
+import random
+import argparse
+
+from tabulate import tabulate
+
+from core.utils import textUtils
+from core.utils.sentence_segmenter import SentenceSegmenter
+
+description = "流式分句耗时测试（整段拼接+rfind vs 增量分句）"
+
+SAMPLE_SENTENCES = (
+    "好的，我来帮你查一下今天的天气。",
+    "北京今天晴，最高气温23.5度，最低气温12度，空气质量良好。",
+    "出门记得带上外套，早晚温差比较大哦！",
+    "另外，明天可能会有小雨，湿度大约在60%左右；",
+    "如果要出远门的话，建议提前看看路况：",
+    "你还有什么想问的吗？",
+)
+
+
+class LegacySegmenter:
+    """原实现：每个增量都拼接整段回复，并对每个标点 rfind 一次"""
+
+    punctuations = ("。", "？", "?", "！", "!", "；", ";", "：")
+    first_sentence_punctuations = ("，", "~", "、", ",") + punctuations
+
+    def __init__(self):
+        self.tts_text_buff = []
+        self.processed_chars = 0
+        self.is_first_sentence = True
+
+    def push(self, text):
+        self.tts_text_buff.append(text)
+        full_text = "".join(self.tts_text_buff)
+        current_text = full_text[self.processed_chars :]
+        last_punct_pos = -1
+        punctuations_to_use = (
+            self.first_sentence_punctuations
+            if self.is_first_sentence
+            else self.punctuations
+        )
+        for punct in punctuations_to_use:
+            pos = current_text.rfind(punct)
+            if (pos != -1 and last_punct_pos == -1) or (
+                pos != -1 and pos < last_punct_pos
+            ):
+                last_punct_pos = pos
+        if last_punct_pos == -1:
+            return []
+        segment_text_raw = current_text[: last_punct_pos + 1]
+        self.processed_chars += len(segment_text_raw)
+        self.is_first_sentence = False
+        segment = textUtils.get_string_no_punctuation_or_emoji(segment_text_raw)
+        return [segment] if segment else []
+
+
+def _make_reply(length: int, seed: int = 0) -> list:
+    """生成指定长度的回复，并按1~4个字符切成LLM增量"""
+    rng = random.Random(seed)
+    text = ""
+    while len(text) < length:
+        text += rng.choice(SAMPLE_SENTENCES)
+    text = text[:length]
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 4)
+        tokens.append(text[pos : pos + step])
+        pos += step
+    return tokens
+
+
+class SegmenterPerformanceTester:
+    def __init__(self, lengths, rounds):
+        self.lengths = lengths
+        self.rounds = rounds
+        self.results = []
+
+    def _measure(self, factory, tokens):
+        total = 0.0
+        worst = 0.0
+        segments = 0
+        for _ in range(self.rounds):
+            segmenter = factory()
+            for token in tokens:
+                start = time.perf_counter()
+                segments += len(segmenter.push(token))
+                elapsed = time.perf_counter() - start
+                total += elapsed
+                worst = max(worst, elapsed)
+        return (
+            total * 1000 / self.rounds,
+            worst * 1e6,
+            total * 1e6 / (self.rounds * len(tokens)),
+            segments // self.rounds,
+        )
+
+    def run(self):
+        for length in self.lengths:
+            tokens = _make_reply(length)
+            for label, factory in (
+                ("整段拼接+rfind(原实现)", LegacySegmenter),
+                ("增量分句", SentenceSegmenter),
+            ):
+                total_ms, worst_us, per_token_us, segments = self._measure(
+                    factory, tokens
+                )
+                self.results.append(
+                    [
+                        label,
+                        length,
+                        len(tokens),
+                        segments,
+                        f"{total_ms:.2f}",
+                        f"{per_token_us:.1f}",
+                        f"{worst_us:.1f}",
+                    ]
+                )
+            print(f"{length}字回复 测试完成")
+        self._print_results()
+
+    def _print_results(self):
+        headers = [
+            "分句方式",
+            "回复字数",
+            "增量数",
+            "分段数",
+            "整段耗时(ms)",
+            "平均每增量(us)",
+            "最慢增量(us)",
+        ]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--lengths",
+        default="500,1000,2000,4000",
+        help="回复字数，逗号分隔",
+    )
+    parser.add_argument("--rounds", type=int, default=20, help="每种长度重复次数")
+    args = parser.parse_args()
+    lengths = [int(x) for x in args.lengths.split(",") if x]
+    SegmenterPerformanceTester(lengths, args.rounds).run()
+
+
+if __name__ == "__main__":
+    main()
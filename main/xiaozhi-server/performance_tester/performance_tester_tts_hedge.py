@@ -0,0 +1,157 @@
+import io
+import time
+import wave
+import queue
+import random
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from tabulate import tabulate
+
+from core.providers.tts.base import TTSProviderBase
+from core.utils.tts_hedge import get_hedge_stats
+
+description = "首句TTS竞速测试（只请求主TTS vs 超过延迟后同时请求备用TTS）"
+
+TEXT = "好的，我来帮你查一下明天的天气。"
+
+
+def _make_wav(seconds: float) -> bytes:
+    t = np.arange(int(16000 * seconds)) / 16000
+    samples = (0.2 * np.sin(2 * np.pi * 440 * t) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+class FakeTTSProvider(TTSProviderBase):
+    """
+    按注入的延迟分布返回固定音频的TTS
+    耗时为对数正态分布，另有 tail_rate 的概率额外增加 tail_ms，模拟服务的长尾
+    """
+
+    def __init__(self, median_ms, sigma, tail_rate, tail_ms, audio, seed):
+        super().__init__({}, delete_audio_file=True)
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+        self.audio = audio
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def latency(self) -> float:
+        ms = self.median_ms * self.rng.lognormvariate(0, self.sigma)
+        if self.rng.random() < self.tail_rate:
+            ms += self.tail_ms
+        return ms / 1000
+
+    async def text_to_speak(self, text, output_file):
+        self.calls += 1
+        await asyncio.sleep(self.latency())
+        return self.audio
+
+
+class TTSHedgePerformanceTester:
+    def __init__(self, args):
+        self.args = args
+        self.audio = _make_wav(2.0)
+        self.results = []
+
+    def _first_audio(self, seed, hedge):
+        a = self.args
+        primary = FakeTTSProvider(
+            a.median, a.sigma, a.tail_rate, a.tail, self.audio, seed
+        )
+        secondary = FakeTTSProvider(
+            a.secondary_median, a.sigma, a.tail_rate, a.tail, self.audio, seed + 1
+        )
+        if hedge:
+            primary.set_hedge_provider(secondary, a.delay)
+        first = None
+        start = time.perf_counter()
+
+        def on_frame(opus):
+            nonlocal first
+            if first is None:
+                first = time.perf_counter()
+
+        primary.to_tts_stream(TEXT, on_frame, output=queue.Queue(), hedge=hedge)
+        return (first - start) * 1000, primary.calls + secondary.calls
+
+    def run(self):
+        stats = get_hedge_stats()
+        for label, hedge in (
+            ("只请求主TTS(原实现)", False),
+            (f"超过{self.args.delay:.0f}ms请求备用TTS", True),
+        ):
+            hedged, wins = stats.hedged, stats.secondary_wins
+            with ThreadPoolExecutor(self.args.concurrency) as pool:
+                results = list(
+                    pool.map(
+                        lambda seed: self._first_audio(seed * 2, hedge),
+                        range(self.args.rounds),
+                    )
+                )
+            latencies = sorted(ms for ms, _ in results)
+            calls = sum(n for _, n in results)
+            rounds = len(results)
+            self.results.append(
+                [
+                    label,
+                    f"{self._percentile(latencies, 0.5):.0f}",
+                    f"{self._percentile(latencies, 0.95):.0f}",
+                    f"{self._percentile(latencies, 0.99):.0f}",
+                    f"{calls / rounds:.2f}",
+                    f"{(stats.hedged - hedged) / rounds:.1%}",
+                    f"{(stats.secondary_wins - wins) / rounds:.1%}",
+                ]
+            )
+            print(f"{label} 测试完成")
+        self._print_results()
+
+    @staticmethod
+    def _percentile(values, q):
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+    def _print_results(self):
+        headers = [
+            "请求方式",
+            "首帧P50(ms)",
+            "首帧P95(ms)",
+            "首帧P99(ms)",
+            "每句请求数",
+            "备用请求比例",
+            "备用胜出比例",
+        ]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        a = self.args
+        print(
+            f"\n{a.rounds}次首句合成，{a.concurrency}路并发；TTS耗时中位数 主{a.median:.0f}ms/"
+            f"备用{a.secondary_median:.0f}ms，对数正态σ={a.sigma}，"
+            f"{a.tail_rate:.0%}的请求额外增加{a.tail:.0f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--median", type=float, default=300, help="主TTS耗时中位数(ms)")
+    parser.add_argument("--secondary-median", type=float, default=400, help="备用TTS耗时中位数(ms)")
+    parser.add_argument("--sigma", type=float, default=0.4, help="对数正态分布的σ")
+    parser.add_argument("--tail-rate", type=float, default=0.08, help="长尾请求的比例")
+    parser.add_argument("--tail", type=float, default=2000, help="长尾请求额外增加的耗时(ms)")
+    parser.add_argument("--delay", type=float, default=500, help="请求备用TTS前的等待时间(ms)")
+    parser.add_argument("--rounds", type=int, default=300, help="测试次数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发合成数")
+    args = parser.parse_args()
+    TTSHedgePerformanceTester(args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import time
+import argparse
+import statistics
+
+import numpy as np
+from tabulate import tabulate
+
+from core.utils.opus_encoder_utils import OpusEncoderUtils
+from core.utils.silence_trim import SilenceTrimmer
+from core.utils.util import pcm_to_data_stream
+
+description = "TTS首尾静音裁剪测试（每轮回复的播放时长、发送包数与裁剪耗时）"
+
+SAMPLE_RATE = 16000
+
+
+def _syllable(rng, ms):
+    """一个音节：带包络的谐波，开头有一段弱辅音噪声"""
+    n = SAMPLE_RATE * ms // 1000
+    t = np.arange(n) / SAMPLE_RATE
+    f0 = rng.uniform(120, 260)
+    voice = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+    voice *= np.hanning(n) * rng.uniform(0.15, 0.4)
+    onset = min(n, SAMPLE_RATE * 30 // 1000)
+    voice[:onset] += rng.normal(0, 0.01, onset)
+    return voice
+
+
+def make_sentence(rng, syllables, head_ms, tail_ms, noise_db):
+    """模拟TTS返回的一句话：首尾静音 + 音节，音节之间有短停顿，全程带底噪"""
+    parts = [np.zeros(SAMPLE_RATE * head_ms // 1000)]
+    for i in range(syllables):
+        parts.append(_syllable(rng, int(rng.uniform(150, 260))))
+        if i + 1 < syllables:
+            parts.append(np.zeros(SAMPLE_RATE * int(rng.uniform(20, 80)) // 1000))
+    parts.append(np.zeros(SAMPLE_RATE * tail_ms // 1000))
+    signal = np.concatenate(parts)
+    signal += rng.normal(0, 10 ** (noise_db / 20), len(signal))
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+class TTSSilenceTrimPerformanceTester:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+        rng = np.random.default_rng(args.seed)
+        # 每轮回复若干句，每句4~12个音节，首尾静音在给定范围内随机
+        self.replies = [
+            [
+                make_sentence(
+                    rng,
+                    int(rng.integers(4, 13)),
+                    int(rng.integers(args.pad_min, args.pad_max + 1)),
+                    int(rng.integers(args.pad_min, args.pad_max + 1)),
+                    args.noise_db,
+                )
+                for _ in range(args.sentences)
+            ]
+            for _ in range(args.replies)
+        ]
+
+    def _whole(self, pcm, trimmer, frames):
+        pcm_to_data_stream(pcm, True, frames.append, self.args.frame, trimmer)
+
+    def _streaming(self, pcm, trimmer, frames):
+        encoder = OpusEncoderUtils(SAMPLE_RATE, 1, self.args.frame)
+        encoder.set_silence_trimmer(trimmer)
+        try:
+            chunk = self.args.chunk
+            for i in range(0, len(pcm), chunk):
+                encoder.encode_pcm_to_opus_stream(
+                    pcm[i : i + chunk], i + chunk >= len(pcm), frames.append
+                )
+        finally:
+            encoder.close()
+
+    def _trim_cost_us(self, trimmer, streaming):
+        """只计裁剪本身的耗时（每句）"""
+        if trimmer is None:
+            return 0.0
+        chunk = self.args.chunk // 2
+        sentences = [np.frombuffer(p, dtype=np.int16) for r in self.replies for p in r]
+        start = time.perf_counter()
+        for samples in sentences:
+            if not streaming:
+                trimmer.trim(samples)
+                continue
+            stream = trimmer.stream()
+            for i in range(0, len(samples), chunk):
+                stream.push(samples[i : i + chunk])
+            stream.flush()
+        return (time.perf_counter() - start) * 1e6 / len(sentences)
+
+    def run(self):
+        a = self.args
+        trimmer = SilenceTrimmer(a.head, a.tail, a.threshold)
+        for label, method, trim in (
+            ("不裁剪(原实现)", self._whole, None),
+            ("整句裁剪", self._whole, trimmer),
+            ("流式裁剪(边收边编码)", self._streaming, trimmer),
+        ):
+            playback_s, packets = [], []
+            for reply in self.replies:
+                frames = []
+                for pcm in reply:
+                    method(pcm, trim, frames)
+                packets.append(len(frames))
+                playback_s.append(len(frames) * a.frame / 1000)
+            self.results.append(
+                [
+                    label,
+                    f"{statistics.mean(playback_s):.2f}",
+                    f"{statistics.mean(packets):.1f}",
+                    f"{self._trim_cost_us(trim, method == self._streaming):.0f}",
+                ]
+            )
+            print(f"{label} 测试完成")
+        self._print_results()
+
+    def _print_results(self):
+        headers = ["方式", "每轮播放时长(s)", "每轮发送包数", "每句裁剪耗时(us)"]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        a = self.args
+        print(
+            f"\n{a.replies}轮回复，每轮{a.sentences}句，每句首尾静音各{a.pad_min}~{a.pad_max}ms，"
+            f"底噪{a.noise_db}dBFS；保留句首{a.head}ms、句尾{a.tail}ms，阈值{a.threshold}dBFS，"
+            f"帧时长{a.frame}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--replies", type=int, default=50, help="回复轮数")
+    parser.add_argument("--sentences", type=int, default=5, help="每轮回复的句数")
+    parser.add_argument("--pad-min", type=int, default=100, help="每句首尾静音下限(ms)")
+    parser.add_argument("--pad-max", type=int, default=400, help="每句首尾静音上限(ms)")
+    parser.add_argument("--noise-db", type=float, default=-70, help="底噪(dBFS)")
+    parser.add_argument("--head", type=float, default=50, help="保留的句首静音(ms)")
+    parser.add_argument("--tail", type=float, default=100, help="保留的句尾静音(ms)")
+    parser.add_argument("--threshold", type=float, default=-50, help="静音阈值(dBFS)")
+    parser.add_argument("--frame", type=int, default=60, help="帧时长(ms)")
+    parser.add_argument("--chunk", type=int, default=4096, help="流式时每块的字节数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+    TTSSilenceTrimPerformanceTester(args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import io
+import time
+import asyncio
+import argparse
+import statistics
+
+import numpy as np
+from tabulate import tabulate
+
+from core.utils.audio_decode import StreamingAudioDecoder, supports_streaming
+from core.utils.opus_encoder_utils import OpusEncoderUtils
+from core.utils.util import audio_bytes_to_data_stream
+
+description = "流式mp3 TTS首帧延迟测试（整句下载后ffmpeg解码 vs 进程内逐帧解码）"
+
+FRAME_DURATION = 60
+
+
+def _make_mp3(seconds: float, sample_rate: int, bitrate: int) -> bytes:
+    """生成一句话长度的合成语音信号并编码为mp3（与Edge TTS默认的24kHz单声道一致）"""
+    import av
+
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    signal = sum(0.1 * np.sin(2 * np.pi * f * t) for f in (180, 360, 720, 1500, 3100))
+    samples = (signal * 32767).astype(np.int16)
+
+    buffer = io.BytesIO()
+    with av.open(buffer, "w", format="mp3") as container:
+        stream = container.add_stream("libmp3lame", rate=sample_rate, layout="mono")
+        stream.bit_rate = bitrate
+        frame = av.AudioFrame.from_ndarray(samples[None, :], format="s16", layout="mono")
+        frame.sample_rate = sample_rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+async def _http_stream(data: bytes, chunk_size: int, bytes_per_second: float):
+    """模拟TTS服务分块返回音频，按给定速率到达"""
+    for i in range(0, len(data), chunk_size):
+        if i:
+            await asyncio.sleep(chunk_size / bytes_per_second)
+        yield data[i : i + chunk_size]
+
+
+async def _legacy(chunks):
+    """原实现：收齐整句后交给 pydub/ffmpeg 解码，再分帧编码"""
+    first_byte = None
+    first_frame = None
+    audio_bytes = b""
+    async for chunk in chunks:
+        if first_byte is None:
+            first_byte = time.perf_counter()
+        audio_bytes += chunk
+
+    def on_frame(opus):
+        nonlocal first_frame
+        if first_frame is None:
+            first_frame = time.perf_counter()
+
+    audio_bytes_to_data_stream(
+        audio_bytes, file_type="mp3", is_opus=True, callback=on_frame
+    )
+    return first_byte, first_frame, time.perf_counter()
+
+
+async def _incremental(chunks):
+    """新实现：每个数据块到达就解码，凑满一帧即编码送出"""
+    first_byte = None
+    first_frame = None
+
+    def on_frame(opus):
+        nonlocal first_frame
+        if first_frame is None:
+            first_frame = time.perf_counter()
+
+    decoder = StreamingAudioDecoder("mp3")
+    encoder = OpusEncoderUtils(16000, 1, FRAME_DURATION)
+    try:
+        async for chunk in chunks:
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            pcm = decoder.push(chunk)
+            if pcm:
+                encoder.encode_pcm_to_opus_stream(pcm, False, on_frame)
+        encoder.encode_pcm_to_opus_stream(decoder.flush(), True, on_frame)
+    finally:
+        encoder.close()
+    return first_byte, first_frame, time.perf_counter()
+
+
+class TTSStreamDecodePerformanceTester:
+    def __init__(self, seconds, speed, chunk_size, bitrate, rounds):
+        self.seconds = seconds
+        self.speed = speed
+        self.chunk_size = chunk_size
+        self.bitrate = bitrate
+        self.rounds = rounds
+        self.results = []
+
+    def _measure(self, method, data):
+        bytes_per_second = self.bitrate / 8 * self.speed
+        first_frame_ms, last_frame_ms = [], []
+        for _ in range(self.rounds):
+            chunks = _http_stream(data, self.chunk_size, bytes_per_second)
+            first_byte, first_frame, end = asyncio.run(method(chunks))
+            first_frame_ms.append((first_frame - first_byte) * 1000)
+            last_frame_ms.append((end - first_byte) * 1000)
+        return first_frame_ms, last_frame_ms
+
+    def run(self):
+        if not supports_streaming("mp3"):
+            print("未安装PyAV，无法测试流式解码")
+            return
+        data = _make_mp3(self.seconds, 24000, self.bitrate)
+        for label, method in (
+            ("整句下载后ffmpeg解码(原实现)", _legacy),
+            ("进程内逐帧解码", _incremental),
+        ):
+            try:
+                first_frame_ms, last_frame_ms = self._measure(method, data)
+            except Exception as e:
+                print(f"{label} 无法测试: {e}")
+                continue
+            first_frame_ms.sort()
+            self.results.append(
+                [
+                    label,
+                    f"{statistics.mean(first_frame_ms):.1f}",
+                    f"{first_frame_ms[min(len(first_frame_ms) - 1, int(len(first_frame_ms) * 0.95))]:.1f}",
+                    f"{statistics.mean(last_frame_ms):.1f}",
+                ]
+            )
+            print(f"{label} 测试完成")
+        self._print_results(len(data))
+
+    def _print_results(self, size):
+        headers = [
+            "解码方式",
+            "首字节到首帧Opus平均(ms)",
+            "首字节到首帧Opus P95(ms)",
+            "首字节到最后一帧平均(ms)",
+        ]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        print(
+            f"\n{self.seconds}秒语音，mp3 {self.bitrate // 1000}kbps 共{size}字节，"
+            f"每块{self.chunk_size}字节，以{self.speed}倍实时速度到达"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--seconds", type=float, default=3.0, help="每句音频时长（秒）")
+    parser.add_argument("--speed", type=float, default=4.0, help="音频数据到达速度（实时的倍数）")
+    parser.add_argument("--chunk", type=int, default=1024, help="每个数据块的字节数")
+    parser.add_argument("--bitrate", type=int, default=48000, help="mp3码率(bps)")
+    parser.add_argument("--rounds", type=int, default=20, help="每种方式的测试次数")
+    args = parser.parse_args()
+    TTSStreamDecodePerformanceTester(
+        args.seconds, args.speed, args.chunk, args.bitrate, args.rounds
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
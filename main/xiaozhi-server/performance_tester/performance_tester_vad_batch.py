@@ -0,0 +1,134 @@
+import os
+import time
+import argparse
+
+import numpy as np
+from tabulate import tabulate
+
+from core.providers.vad.silero_batch_engine import (
+    SileroOnnxBatchModel,
+    FRAME_SAMPLES,
+    CONTEXT_SAMPLES,
+    STATE_SIZE,
+)
+
+description = "Silero VAD逐帧推理与跨连接批量推理吞吐对比"
+
+MODEL_DIR = "models/snakers4_silero-vad"
+ONNX_PATH = os.path.join(MODEL_DIR, "src", "silero_vad", "data", "silero_vad.onnx")
+
+
+class VADBatchPerformanceTester:
+    def __init__(self, stream_counts, ticks, max_batch_size):
+        self.stream_counts = stream_counts
+        self.ticks = ticks  # 每路连接模拟的帧数
+        self.max_batch_size = max_batch_size
+        self.model = SileroOnnxBatchModel(ONNX_PATH)
+        self.torch_model = self._load_torch_model()
+        self.results = []
+
+    def _load_torch_model(self):
+        try:
+            import torch
+
+            model, _ = torch.hub.load(
+                repo_or_dir=MODEL_DIR,
+                source="local",
+                model="silero_vad",
+                force_reload=False,
+            )
+            return model
+        except Exception as e:
+            print(f"加载torch模型失败，跳过当前实现的对比: {e}")
+            return None
+
+    @staticmethod
+    def _make_frames(streams):
+        rng = np.random.default_rng(0)
+        return (rng.standard_normal((streams, FRAME_SAMPLES)) * 0.1).astype(
+            np.float32
+        )
+
+    def _run_torch_per_frame(self, streams):
+        """当前实现：每个连接每帧一次torch前向计算"""
+        import torch
+
+        frames = self._make_frames(streams)
+        start = time.perf_counter()
+        with torch.no_grad():
+            for _ in range(self.ticks):
+                for i in range(streams):
+                    self.torch_model(torch.from_numpy(frames[i]), 16000).item()
+        return time.perf_counter() - start
+
+    def _run_onnx_per_frame(self, streams):
+        """逐帧推理：每个连接保存自己的状态，但每帧单独计算"""
+        frames = self._make_frames(streams)
+        states = np.zeros((streams, 2, 1, STATE_SIZE), dtype=np.float32)
+        contexts = np.zeros((streams, 1, CONTEXT_SAMPLES), dtype=np.float32)
+        start = time.perf_counter()
+        for _ in range(self.ticks):
+            for i in range(streams):
+                _, states[i], contexts[i] = self.model.forward(
+                    frames[i : i + 1], contexts[i], states[i]
+                )
+        return time.perf_counter() - start
+
+    def _run_onnx_batched(self, streams):
+        """批量推理：同一时刻所有连接的帧按max_batch_size合并计算"""
+        frames = self._make_frames(streams)
+        states = np.zeros((2, streams, STATE_SIZE), dtype=np.float32)
+        contexts = np.zeros((streams, CONTEXT_SAMPLES), dtype=np.float32)
+        start = time.perf_counter()
+        for _ in range(self.ticks):
+            for begin in range(0, streams, self.max_batch_size):
+                end = min(begin + self.max_batch_size, streams)
+                _, states[:, begin:end], contexts[begin:end] = self.model.forward(
+                    frames[begin:end], contexts[begin:end], states[:, begin:end]
+                )
+        return time.perf_counter() - start
+
+    def run(self):
+        for streams in self.stream_counts:
+            total_frames = streams * self.ticks
+            modes = [
+                ("onnx逐帧", self._run_onnx_per_frame),
+                ("onnx批量", self._run_onnx_batched),
+            ]
+            if self.torch_model is not None:
+                modes.insert(0, ("torch逐帧(当前实现)", self._run_torch_per_frame))
+            for name, func in modes:
+                elapsed = func(streams)
+                self.results.append(
+                    [
+                        streams,
+                        name,
+                        f"{total_frames / elapsed:.0f}",
+                        f"{elapsed / total_frames * 1e6:.1f}",
+                        # 32ms一帧，实时所需吞吐 = 路数 / 0.032
+                        f"{(total_frames / elapsed) / (streams / 0.032):.2f}x",
+                    ]
+                )
+            print(f"{streams} 路测试完成")
+        self._print_results()
+
+    def _print_results(self):
+        headers = ["并发路数", "推理方式", "帧/秒", "单帧耗时(μs)", "实时倍数"]
+        print(tabulate(self.results, headers=headers, tablefmt="github"))
+        print("\n实时倍数 >= 1x 表示单核即可跟上该并发下的实时音频输入")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--streams", default="100,500,1000", help="模拟的并发连接数，逗号分隔"
+    )
+    parser.add_argument("--ticks", type=int, default=20, help="每路模拟的帧数")
+    parser.add_argument("--batch", type=int, default=64, help="单批最大连接数")
+    args = parser.parse_args()
+    stream_counts = [int(x) for x in args.streams.split(",") if x.strip()]
+    VADBatchPerformanceTester(stream_counts, args.ticks, args.batch).run()
+
+
+if __name__ == "__main__":
+    main()